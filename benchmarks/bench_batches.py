@@ -0,0 +1,25 @@
+from utils import bench
+
+from sqlcommon import get_parser
+from sqlcommon.template import render_batches
+
+SHAPES = [
+    "select a, b from users where id = {i} and name = 'user {i}' limit 10",
+    "select count(*) from orders where user_id = {i} and total > {i}.5",
+    "select a from t where a in ({i}, {j}, 3) and b like 'x{i}%'",
+]
+
+
+def main():
+    parse = get_parser(parser_type="native")
+    stmts = [parse(shape.format(i=i, j=i + 1)) for i in range(1000) for shape in SHAPES]
+
+    batches = render_batches(stmts)
+    print(f"statements: {len(stmts)}, batches: {len(batches)}")
+    bench("to_sql each", lambda: [x.to_sql() for x in stmts], 5)
+    bench("render_batches qmark", lambda: render_batches(stmts), 5)
+    bench("render_batches named", lambda: render_batches(stmts, "named"), 5)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+from utils import bench
+
+from sqlcommon import get_parser
+from sqlcommon.builder import LeftJoin, Select, op
+
+SQL = (
+    "select u.id, u.name as n from users u"
+    " left join orders o on u.id = o.user_id"
+    " where u.id = {} limit 10 order by u.name"
+)
+
+
+def build(user_id):
+    return (
+        Select("u.id", n="u.name")
+        .From(u="users")
+        .Join(LeftJoin(o="orders").On(op("=", "u.id", "o.user_id")))
+        .Where(op("=", "u.id", user_id))
+        .Limit(10)
+        .OrderBy("u.name")
+        .build()
+    )
+
+
+def main():
+    parse = get_parser()
+    assert build(1).to_sql() == parse(SQL.format(1)).to_sql()
+
+    parse_sec = bench("format string + parse", lambda: parse(SQL.format(1)), 200)
+    build_sec = bench("builder", lambda: build(1))
+    print(f"speedup: x{parse_sec / build_sec:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+from utils import bench
+
+from sqlcommon import get_parser
+from sqlcommon.complexity import AdmissionGate, Thresholds, analyze
+from sqlcommon.splice import iter_nodes
+
+SQLS = {
+    "small": "select a, b from t where a = 1 limit 10",
+    "joins": (
+        "select u.id, count(*) from users u"
+        " join orders o on u.id = o.user_id"
+        " left join items i on o.id = i.order_id"
+        " group by u.id"
+        " where u.id in (select user_id from vip where level > 3)"
+        " and o.status in (1, 2, 3) limit 100"
+    ),
+    "large": "select a from t where "
+    + " and ".join(f"c{i} in ({i}, {i + 1})" for i in range(1000)),
+}
+
+
+def main():
+    parse = get_parser(parser_type="native")
+    gate = AdmissionGate(reject=Thresholds(max_cost=1000, require_limit=True))
+
+    for name, sql in SQLS.items():
+        stmt = parse(sql)
+        nodes = sum(1 for _ in iter_nodes(stmt))
+        number = max(10, 100_000 // nodes)
+        sec = bench(f"analyze {name} ({nodes} nodes)", lambda: analyze(stmt), number)
+        print(f"{'  per node':<40} {sec / nodes * 1e6:12.3f} us/op")
+        bench(f"gate.decide {name}", lambda: gate.decide(stmt), number)
+        bench(f"parse {name}", lambda: parse(sql), max(10, number // 10))
+
+
+if __name__ == "__main__":
+    main()
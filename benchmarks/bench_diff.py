@@ -0,0 +1,64 @@
+from utils import bench
+
+from sqlcommon import get_parser
+from sqlcommon.diff import diff, subtree_hashes
+
+
+def generate(n: int, changed: int = None, limit: bool = False):
+    predicates = " and ".join(
+        f"(o.c{i} = {i + 1 if i == changed else i}"
+        f" or o.d{i} in (select x from t{i} where y > {i}))"
+        for i in range(n)
+    )
+    sql = (
+        "select u.id, u.name, count(*) from users u"
+        " join orders o on u.id = o.user_id"
+        " where " + predicates
+    )
+    return sql + " limit 10" if limit else sql
+
+
+def naive_diff(a, b, path=(), edits=None):
+    # 部分木のハッシュを使わず、すべての節点を比較する
+    edits = [] if edits is None else edits
+    if isinstance(a, dict) and isinstance(b, dict):
+        for key in {*a, *b}:
+            naive_diff(a.get(key, None), b.get(key, None), path + (key,), edits)
+    elif isinstance(a, list) and isinstance(b, list) and len(a) == len(b):
+        for i, (x, y) in enumerate(zip(a, b)):
+            naive_diff(x, y, path + (i,), edits)
+    elif a != b:
+        edits.append(path)
+    return edits
+
+
+def main():
+    parse = get_parser(parser_type="native")
+    n = 100
+    base = parse(generate(n))
+    pairs = {
+        "identical": parse(generate(n)),
+        "literal changed": parse(generate(n, changed=n // 2)),
+        "clause added": parse(generate(n, limit=True)),
+    }
+    print(f"statement: {len(generate(n))} chars")
+
+    bench("subtree_hashes (one tree)", lambda: subtree_hashes(base), 20)
+    for name, other in pairs.items():
+        print(f"{name}: {[str(x) for x in diff(base, other)]}")
+        bench(f"diff ({name})", lambda: diff(base, other), 20)
+        bench(f"naive walk ({name})", lambda: naive_diff(base, other), 20)
+        bench(f"to_sql == ({name})", lambda: base.to_sql() == other.to_sql(), 20)
+
+    # 同じ木と何度も比較する場合は、その木のハッシュを再利用できる
+    hashes = subtree_hashes(base)
+    other = pairs["literal changed"]
+    bench(
+        "diff (literal changed, hashes reused)",
+        lambda: diff(base, other, dict(hashes)),
+        20,
+    )
+
+
+if __name__ == "__main__":
+    main()
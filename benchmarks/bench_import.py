@@ -0,0 +1,53 @@
+import subprocess
+import sys
+
+MODULES = [
+    "sqlcommon",
+    "sqlcommon.tokens",
+    "sqlcommon.builder",
+    "sqlcommon.native",
+    "sqlcommon.kvjson",
+    "sqlcommon.transformer",
+    "lark",
+]
+
+
+def import_time(code: str, repeat: int = 5):
+    # 新しいインタプリタで計測し、最小値を採用する
+    script = (
+        "import time; start = time.perf_counter();"
+        f" {code};"
+        " print(time.perf_counter() - start)"
+    )
+    return min(
+        float(subprocess.check_output([sys.executable, "-c", script]))
+        for _ in range(repeat)
+    )
+
+
+def bench_import(name: str, code: str):
+    sec = import_time(code)
+    print(f"{name:<40} {sec * 1e3:12.1f} ms")
+    return sec
+
+
+def main():
+    for module in MODULES:
+        bench_import(f"import {module}", f"import {module}")
+
+    bench_import(
+        "first parse (earley)",
+        "from sqlcommon import get_parser; get_parser()('select 1')",
+    )
+    bench_import(
+        "first parse (native)",
+        "from sqlcommon.native import parse; parse('select 1')",
+    )
+    bench_import(
+        "first parse (kvjson)",
+        "from sqlcommon.kvjson import parse; parse('1')",
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+import json
+
+from lark import Lark
+from utils import bench
+
+from sqlcommon.kvjson import (
+    TreeToJson,
+    iter_array,
+    json_grammar,
+    load_json_lark,
+    parse,
+    parse_many,
+)
+
+DOC = json.dumps(
+    {
+        "id": 1,
+        "name": "config",
+        "enabled": True,
+        "tags": ["a", "b", "c"],
+        "limits": {"max_length": 100000, "timeout": 1.5, "max_steps": None},
+        "rules": [
+            {"table": f"t{i}", "columns": ["a", "b"], "weight": i} for i in range(10)
+        ],
+    }
+)
+KV = '<"config": ' + DOC + ">"
+DOCS = [DOC] * 100
+ARRAY = "[" + ", ".join([DOC] * 1000) + "]"
+
+
+def main():
+    earley = Lark(json_grammar, start="value")
+    transformer = TreeToJson()
+    load_json_lark()
+    assert parse(DOC) == json.loads(DOC)
+
+    earley_sec = bench(
+        "earley + TreeToJson", lambda: transformer.transform(earley.parse(DOC)), 20
+    )
+    lalr = load_json_lark()
+    lalr_sec = bench("lalr (inline transformer)", lambda: lalr.parse(DOC), 200)
+    parse_sec = bench("parse (json fast path)", lambda: parse(DOC))
+    kv_sec = bench("parse (KeyValue, lalr)", lambda: parse(KV), 200)
+    json_sec = bench("json.loads", lambda: json.loads(DOC))
+    print(f"lalr vs earley: x{earley_sec / lalr_sec:.1f}")
+    print(f"lalr vs json: x{lalr_sec / json_sec:.0f} slower")
+    print(f"parse vs json: x{parse_sec / json_sec:.1f} slower")
+    print(f"KeyValue vs json fast path: x{kv_sec / parse_sec:.0f} slower")
+
+    bench("parse_many 100 docs", lambda: parse_many(DOCS), 5)
+    bench("json.loads 100 docs", lambda: [json.loads(x) for x in DOCS], 100)
+
+    bench("parse array of 1000 docs", lambda: parse(ARRAY), 1, 3)
+    bench("iter_array 1000 docs", lambda: sum(1 for _ in iter_array(ARRAY)), 1, 3)
+    bench("json.loads array of 1000 docs", lambda: json.loads(ARRAY), 10)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+from utils import bench
+
+from sqlcommon import get_parser
+from sqlcommon.memory import AllocationProfiler, memory_usage
+
+SQLS = {
+    "small": "select a, b from t where a = 1 limit 10",
+    "joins": (
+        "select u.id, count(*) from users u"
+        " join orders o on u.id = o.user_id"
+        " left join items i on o.id = i.order_id"
+        " group by u.id"
+        " where u.id in (select user_id from vip where level > 3)"
+        " and o.status in (1, 2, 3) limit 100"
+    ),
+    "wide": "select "
+    + ", ".join(f"t.c{i} as a{i}" for i in range(200))
+    + " from t where "
+    + " and ".join(f"c{i} = {i}" for i in range(100)),
+}
+
+
+def main():
+    earley = get_parser()
+    native = get_parser(parser_type="native")
+    profiler = AllocationProfiler()
+
+    for name, sql in SQLS.items():
+        stmt = earley(sql)
+        usage = memory_usage(stmt)
+        spans = memory_usage(native(sql))
+        print(
+            f"{name}: {len(sql)} chars, {usage.count} nodes,"
+            f" {usage.size} bytes (native with spans: {spans.size} bytes)"
+        )
+        for type, x in list(usage.by_type.items())[:3]:
+            print(f"  {type:<38} {x.count:>6} {x.size:>10} bytes")
+
+        number = max(10, 20_000 // usage.count)
+        bench(f"memory_usage {name}", lambda: memory_usage(stmt), number)
+        # Earley の解析は遅いため回数を減らす
+        number = max(1, number // 100)
+        bench(f"parse {name}", lambda: earley(sql), number, repeat=2)
+        bench(f"profiled parse {name}", lambda: profiler.parse(sql), number, repeat=2)
+
+    print(profiler.report(top=5))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+from utils import bench
+
+from sqlcommon import get_parser
+
+QUERIES = {
+    "simple": "select a, b from t where a = 1",
+    "join": (
+        "select u.id, u.name as n, count(*) from users u"
+        " left join orders o on u.id = o.user_id"
+        " group by u.id, u.name"
+        " where u.id in (1, 2, 3) and o.total between 10 and 100"
+        " having count(*) > 1"
+        " order by u.name desc"
+    ),
+    "where 100 terms": "select a from t where "
+    + " and ".join(f"c{i} = {i}" for i in range(100)),
+}
+
+
+def main():
+    earley = get_parser()
+    native = get_parser(parser_type="native")
+
+    for name, sql in QUERIES.items():
+        assert earley(sql) == native(sql)
+        earley_sec = bench(f"earley {name}", lambda: earley(sql), 10, 3)
+        native_sec = bench(f"native {name}", lambda: native(sql))
+        print(f"speedup: x{earley_sec / native_sec:.0f}")
+
+
+if __name__ == "__main__":
+    main()
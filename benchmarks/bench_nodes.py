@@ -0,0 +1,63 @@
+import copy
+import tracemalloc
+
+from utils import bench
+
+from sqlcommon import get_parser
+from sqlcommon.nodes import Expr, wrap
+
+SQL = (
+    "select u.id, u.name, count(*) from users u"
+    " join orders o on u.id = o.user_id"
+    " where "
+    + " and ".join(
+        f"(o.c{i} = {i} or o.d{i} in (select x from t{i}))" for i in range(200)
+    )
+    + " limit 10"
+)
+
+
+def eager(select):
+    # すべての子の view を作る（木を複製して変換する場合に相当）
+    stack = [select]
+    while stack:
+        view = stack.pop()
+        if isinstance(view, Expr):
+            stack.extend(view.nodes)
+    return select
+
+
+def allocated(func):
+    tracemalloc.start()
+    result = func()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def main():
+    stmt = get_parser(parser_type="native")(SQL)
+    print(f"statement: {len(SQL)} chars")
+
+    size = allocated(lambda: copy.deepcopy(stmt))
+    print(f"{'tokens tree (deepcopy)':<40} {size:>12} bytes")
+    print(f"{'lazy view (wrap)':<40} {allocated(lambda: wrap(stmt)):>12} bytes")
+    size = allocated(lambda: eager(wrap(stmt)))
+    print(f"{'eager view (all nodes)':<40} {size:>12} bytes")
+    print(
+        f"{'lazy view + get_tables':<40}"
+        f" {allocated(lambda: (lambda s: (s, s.get_tables()))(wrap(stmt))):>12} bytes"
+    )
+
+    bench("wrap", lambda: wrap(stmt), 10000)
+    bench("eager conversion", lambda: eager(wrap(stmt)), 20)
+    bench("lazy get_tables", lambda: wrap(stmt).get_tables(), 50)
+    bench("eager conversion + get_tables", lambda: eager(wrap(stmt)).get_tables(), 20)
+    bench(
+        "lazy nodes[1].nodes[-1] (limit)", lambda: wrap(stmt).nodes[1].nodes[-1], 10000
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+import argparse
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlcommon import ParserPool, get_parser
+
+QUERIES = [
+    "select a, b from t where a = 1",
+    "select u.id, count(*) from users u join orders o on u.id = o.uid group by u.id",
+    "select a from t where b in (1, 2, 3) and c between 1 and 2 limit 10",
+]
+
+
+def throughput(parse, threads: int, per_thread: int) -> float:
+    barrier = threading.Barrier(threads + 1)
+
+    def work(i):
+        barrier.wait()
+        for j in range(per_thread):
+            parse(QUERIES[(i + j) % len(QUERIES)])
+
+    with ThreadPoolExecutor(threads) as executor:
+        futures = [executor.submit(work, i) for i in range(threads)]
+        barrier.wait()
+        start = time.perf_counter()
+        for f in futures:
+            f.result()
+        sec = time.perf_counter() - start
+    return threads * per_thread / sec
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", default="1,2,4,8")
+    parser.add_argument("--parser", default="earley", choices=["earley", "native"])
+    parser.add_argument("--per-thread", type=int, default=None)
+    args = parser.parse_args()
+
+    per_thread = args.per_thread or (10 if args.parser == "earley" else 2000)
+    shared = get_parser(parser_type=args.parser)
+    pool = ParserPool(parser_type=args.parser)
+
+    print(f"parser: {args.parser}, cpus: {os.cpu_count()}")
+    print(f"{'threads':>7} {'shared get_parser':>20} {'ParserPool':>20}")
+    for threads in map(int, args.threads.split(",")):
+        # 各スレッドの解析器は最初の呼び出しで作られるため、計測の前に作っておく
+        throughput(pool.parse, threads, 1)
+        a = throughput(shared, threads, per_thread)
+        b = throughput(pool.parse, threads, per_thread)
+        print(f"{threads:>7} {a:>14.0f} stmt/s {b:>14.0f} stmt/s")
+
+
+if __name__ == "__main__":
+    main()
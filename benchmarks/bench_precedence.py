@@ -0,0 +1,39 @@
+import sys
+import time
+
+from utils import bench
+
+from sqlcommon import get_parser
+from sqlcommon.precedence import Operator, parse_expression
+
+
+def where(n: int):
+    return "select a from t where " + " and ".join(f"c{i} = {i}" for i in range(n))
+
+
+def elements(n: int):
+    result = ["c0", Operator("infix", "="), 0]
+    for i in range(1, n):
+        result += [Operator("infix", "AND"), f"c{i}", Operator("infix", "="), i]
+    return result
+
+
+def main(full: bool = False):
+    for n in (1000, 10000):
+        items = elements(n)
+        bench(f"precedence climbing {n} terms", lambda: parse_expression(items), 10)
+
+    # Earley + transformer の全体。項数に対して線形に増えることを確認する
+    parse = get_parser()
+    parse("select 1")
+    for n in (10, 100, 1000, 10000) if full else (10, 100, 1000):
+        sql = where(n)
+        start = time.perf_counter()
+        parse(sql)
+        sec = time.perf_counter() - start
+        label = f"parse WHERE {n} terms"
+        print(f"{label:<40} {sec * 1e3:12.1f} ms ({sec / n * 1e6:.0f} us/term)")
+
+
+if __name__ == "__main__":
+    main(full="--full" in sys.argv)
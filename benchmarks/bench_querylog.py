@@ -0,0 +1,81 @@
+import argparse
+import os
+import random
+import resource
+import tempfile
+import time
+
+from sqlcommon.querylog import Report, iter_statements, run
+
+TEMPLATES = [
+    "select id, name from users where id = {i}",
+    "select u.id, o.total from users u join orders o on u.id = o.user_id"
+    " where o.total > {i}",
+    "select count(*) from orders where status in ('new', 'paid') and created_at > {i}",
+    "select p.name, sum(l.qty) from products p join lines l on p.id = l.product_id"
+    " group by p.name having sum(l.qty) > {i}",
+    "select a from t{t} where b = {i} and c like 'x%'",
+    "select * from logs where id > {i} limit 100",
+]
+
+
+def generate(path: str, size: int, seed: int = 0):
+    # 表名の一部に乱数を使い、distinct count の推定が意味を持つようにする
+    rng = random.Random(seed)
+    written = 0
+    with open(path, "w") as f:
+        while written < size:
+            lines = [
+                rng.choice(TEMPLATES).format(
+                    i=rng.randrange(10 ** 6), t=rng.randrange(5000)
+                )
+                for _ in range(1000)
+            ]
+            text = "\n".join(lines) + "\n"
+            f.write(text)
+            written += len(text)
+
+
+def parse_size(text: str):
+    units = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30}
+    if text[-1].upper() in units:
+        return int(float(text[:-1]) * units[text[-1].upper()])
+    return int(text)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", default="10M", help="log size, e.g. 10M or 2G")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    size = parse_size(args.size)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "queries.log")
+        generate(path, size)
+        size = os.path.getsize(path)
+
+        start = time.perf_counter()
+        report = Report()
+        with open(path) as fp:
+            for result in run(iter_statements(fp), workers=args.workers):
+                report.add(result)
+        sec = time.perf_counter() - start
+
+    result = report.to_dict(top=3)
+    self_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    child_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    print(f"log size                 {size / (1 << 20):10.1f} MB")
+    statements = result["statements"]
+    print(f"statements               {statements:10d} ({result['errors']} errors)")
+    print(f"workers                  {args.workers:10d}")
+    print(f"throughput               {size / (1 << 20) / sec:10.1f} MB/s")
+    print(f"throughput               {result['statements'] / sec:10.0f} statements/s")
+    print(f"max rss (main)           {self_rss / 1024:10.1f} MB")
+    print(f"max rss (worker)         {child_rss / 1024:10.1f} MB")
+    print(f"distinct tables (est.)   {result['distinct']['tables']:10d}")
+    print(f"distinct shapes (est.)   {result['distinct']['shapes']:10d}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+import io
+import json
+
+from utils import bench
+
+from sqlcommon import get_parser
+from sqlcommon.serializer import dump_many, dumps, load_many, loads
+
+SQL = (
+    "select u.id, u.name as n, count(*) from users u"
+    " left join orders o on u.id = o.user_id"
+    " group by u.id, u.name"
+    " where u.id in (1, 2, 3) and o.total between 10 and 100"
+    " having count(*) > 1"
+    " order by u.name desc"
+)
+
+
+def main():
+    parse = get_parser(parser_type="native")
+    tree = parse(SQL)
+    large = parse(
+        "select a from t where " + " and ".join(f"c{i} = {i}" for i in range(200))
+    )
+
+    for name, obj in (("statement", tree), ("where 200 terms", large)):
+        plain = json.dumps(obj)
+        compact = dumps(obj, compact=True)
+        print(
+            f"{f'size {name}':<40} json {len(plain)} / compact {len(compact)}"
+            f" ({len(compact) / len(plain):.0%})"
+        )
+        bench(f"json.dumps {name}", lambda: json.dumps(obj), 200)
+        bench(f"dumps {name}", lambda: dumps(obj), 200)
+        bench(f"dumps compact {name}", lambda: dumps(obj, compact=True), 200)
+        bench(f"json.loads {name}", lambda: json.loads(plain), 200)
+        bench(f"loads compact {name}", lambda: loads(compact, compact=True), 200)
+
+    trees = [tree] * 1000
+
+    def write():
+        fp = io.StringIO()
+        dump_many(trees, fp, compact=True)
+        return fp
+
+    fp = write()
+    print(f"{'size batch 1000':<40} {len(fp.getvalue())} chars")
+    bench("dump_many compact 1000", write, 3)
+    bench(
+        "load_many compact 1000",
+        lambda: list(load_many(io.StringIO(fp.getvalue()), True)),
+        3,
+    )
+
+
+if __name__ == "__main__":
+    main()
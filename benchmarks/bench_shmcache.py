@@ -0,0 +1,32 @@
+import os
+import tempfile
+
+from utils import bench
+
+from sqlcommon import get_parser
+from sqlcommon.shmcache import SharedParseCache
+
+SQL = (
+    "select u.id, u.name, count(*) from users u"
+    " join orders o on u.id = o.user_id"
+    " where u.created_at > '2020-01-01' and o.status in (1, 2, 3)"
+    " limit 100"
+)
+
+
+def main():
+    native = get_parser(parser_type="native")
+    earley = get_parser()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        with SharedParseCache(os.path.join(tmp, "parse.cache")) as cache:
+            cache.put(SQL, native(SQL))
+            bench("earley parse", lambda: earley(SQL), 20)
+            bench("native parse", lambda: native(SQL), 1000)
+            bench("shared cache hit", lambda: cache.get(SQL), 1000)
+            bench("shared cache miss", lambda: cache.get(SQL + " "), 10000)
+            bench("shared cache put", lambda: cache.put(SQL, native(SQL)), 1000)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+from utils import bench
+
+from sqlcommon import get_parser
+from sqlcommon.splice import Rewriter, rename_tables
+
+SQL = (
+    "select u.id, u.name,\n  count(*) -- total\nfrom users u\n"
+    "  left join orders o on u.id = o.user_id\nwhere "
+    + "\n  and ".join(f"o.c{i} = {i}" for i in range(1000))
+)
+
+
+def main():
+    parse = get_parser(parser_type="native")
+    stmt = parse(SQL)
+    table = stmt["from_"][0]
+
+    def render():
+        table["name"] = "accounts"
+        try:
+            return stmt.to_sql()
+        finally:
+            table["name"] = "users"
+
+    def splice():
+        return Rewriter(SQL).replace(table, "accounts").to_sql()
+
+    assert parse(render()).to_sql() == parse(splice()).to_sql()
+
+    print(f"statement: {len(SQL)} chars")
+    render_sec = bench("edit 1 identifier + to_sql", render, 100)
+    splice_sec = bench("edit 1 identifier + splice", splice, 1000)
+    print(f"speedup: x{render_sec / splice_sec:.0f}")
+    bench(
+        "rename_tables (walk + splice)",
+        lambda: rename_tables(stmt, SQL, {"users": "a"}),
+        20,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+from utils import bench
+
+from sqlcommon import get_parser
+from sqlcommon.complexity import CostWeights, analyze
+from sqlcommon.references import get_references
+from sqlcommon.subqueries import SubqueryAnalyzer
+
+# 同じ CTE と派生表を何度も参照する集計クエリ
+TOTALS = (
+    "select o.user_id, sum(o.price) total, count(*) n from orders o"
+    " join items i on o.id = i.order_id"
+    " group by o.user_id where o.status in ('paid', 'shipped') and i.qty > 0"
+)
+
+
+def report(n: int, region: int = 0):
+    metrics = ", ".join(
+        f"(select max(total) from ({TOTALS}) m{i} where m{i}.user_id = u.id) c{i}"
+        for i in range(n)
+    )
+    return (
+        f"with totals as ({TOTALS}), top as (select user_id from totals where n > 10)"
+        f" select u.id, {metrics} from users u join totals t on u.id = t.user_id"
+        f" where u.region = {region} and u.id in (select user_id from top)"
+        " union all select u.id, " + ", ".join("0" for _ in range(n)) + " from users u"
+        " where u.id not in (select user_id from top) limit 100"
+    )
+
+
+def separate(stmt, weights=CostWeights()):
+    # 単位ごとに記憶せずに解析する
+    return stmt.to_sql(), get_references(stmt), weights.score(analyze(stmt))
+
+
+def main():
+    parse = get_parser(parser_type="native")
+    stmt = parse(report(20))
+    others = [parse(report(20, region=i)) for i in range(1, 21)]
+    print(f"statement: {len(report(20))} chars")
+
+    analyzer = SubqueryAnalyzer()
+    result = analyzer.analyze(stmt)
+    assert (result.sql, result.references, result.cost) == separate(stmt)
+    print(f"units: {analyzer.misses} computed, {analyzer.hits} reused")
+
+    bench("separate (to_sql, references, cost)", lambda: separate(stmt), 20)
+    bench("SubqueryAnalyzer (cold)", lambda: SubqueryAnalyzer().analyze(stmt), 20)
+    bench("SubqueryAnalyzer (same statement)", lambda: analyzer.analyze(stmt), 20)
+
+    # 別の文でも、共通の CTE と副問合せは記憶した結果を使う
+    it = iter(others * 1000)
+    bench(
+        "SubqueryAnalyzer (warm, other region)",
+        lambda: analyzer.analyze(next(it)),
+        20,
+    )
+    bench("separate (other region)", lambda: separate(others[0]), 20)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,7 @@
+import timeit
+
+
+def bench(name: str, func, number: int = 1000, repeat: int = 5):
+    sec = min(timeit.repeat(func, number=number, repeat=repeat)) / number
+    print(f"{name:<40} {sec * 1e6:12.1f} us/op")
+    return sec
@@ -1 +1,22 @@
-from .transformer import get_parser
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .pool import ParserPool
+    from .transformer import get_parser
+
+__all__ = ["get_parser", "ParserPool"]
+
+
+def __getattr__(name):
+    # transformer は lark を読み込むため、初回参照時まで import を遅延する
+    if name == "get_parser":
+        from .transformer import get_parser
+
+        globals()[name] = get_parser
+        return get_parser
+    elif name == "ParserPool":
+        from .pool import ParserPool
+
+        globals()[name] = ParserPool
+        return ParserPool
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,50 +1,290 @@
+import copy
+
+from .tokens import (
+    BinaryOperator,
+    Expressions,
+    Func,
+    Identifier,
+    JoinStatement,
+    SelectStatement,
+    UnionStatement,
+    Value,
+)
+
+
 class Alias:
+    def __init__(self, obj, name: str = None):
+        self.obj = obj
+        self.name = name
+
+
+class Asc:
+    is_asc = True
+
     def __init__(self, obj):
         self.obj = obj
 
 
+class Desc(Asc):
+    is_asc = False
+
+
+def to_expr(obj):
+    # 文字列は識別子として扱う。文字列リテラルは Value("...") で渡す
+    if isinstance(obj, str):
+        parent, _, name = obj.rpartition(".")
+        return Identifier(name=name, parent=parent or None)
+    elif isinstance(obj, Select):
+        return obj.build()
+    else:
+        return obj
+
+
+def to_item(obj, alias: str = None):
+    if isinstance(obj, Alias):
+        return to_item(obj.obj, obj.name)
+
+    obj = to_expr(obj)
+    if isinstance(obj, dict):
+        obj = copy.copy(obj)
+        obj["is_item"] = True
+        obj["alias"] = alias
+    else:
+        obj = Value(obj, alias=alias)
+        obj["is_item"] = True
+    return obj
+
+
 def merge_items(args: tuple, kwargs: dict):
-    yield from args
-    for k, v in kwargs:
-        if isinstance(v, Alias):
-            yield v
-        else:
-            yield Alias(v)
+    for v in args:
+        yield to_item(v)
+    for k, v in kwargs.items():
+        yield to_item(v, alias=k)
+
+
+def op(op: str, left, right):
+    return BinaryOperator(op=op, expr=Expressions(to_expr(left), to_expr(right)))
+
+
+def _fold(op_name: str, exprs):
+    if not exprs:
+        raise ValueError(f"{op_name.lower()}_() requires at least one expression.")
+    exprs = iter(exprs)
+    result = to_expr(next(exprs))
+    for expr in exprs:
+        result = op(op_name, result, expr)
+    return result
+
+
+def and_(*exprs):
+    return _fold("AND", exprs)
+
+
+def or_(*exprs):
+    return _fold("OR", exprs)
+
+
+def func(name: str, *args):
+    parent, _, name = name.rpartition(".")
+    return Func(
+        name=name,
+        parent=parent or None,
+        args=Expressions(*(to_expr(x) for x in args)),
+    )
 
 
 class Returning:
     def __init__(self, *args, **kwargs):
         self.obj = [x for x in merge_items(args, kwargs)]
 
+    def build(self):
+        return Expressions(*self.obj)
 
-class From:
-    def __init__(self, *args, **kwargs):
-        self.obj = [x for x in merge_items(args, kwargs)]
+
+class From(Returning):
+    ...
+
+
+class GroupBy(Returning):
+    ...
+
+
+class OrderBy:
+    def __init__(self, *args):
+        self.obj = [self.create_order_item(x) for x in args]
+
+    @staticmethod
+    def create_order_item(obj):
+        is_asc = None
+        if isinstance(obj, Asc):
+            obj, is_asc = obj.obj, obj.is_asc
+
+        obj = copy.copy(to_expr(obj))
+        if not isinstance(obj, dict):
+            obj = Value(obj)
+        obj["is_asc"] = is_asc
+        return obj
+
+    def build(self):
+        return Expressions(*self.obj)
 
 
 class Join:
+    join_type = None
+
     def __init__(self, *args, **kwargs):
         self.obj = [x for x in merge_items(args, kwargs)]
+        self.on = None
+        self.using = None
+
+    def On(self, *exprs):
+        self.on = Expressions(*(to_expr(x) for x in exprs))
+        return self
+
+    def Using(self, *names):
+        def create_identifier(name):
+            obj = Identifier(name=name, parent=None)
+            obj["is_item"] = True
+            return obj
 
-    def On(self):
-        ...
+        self.using = Expressions(*(create_identifier(x) for x in names))
+        return self
 
-    def Using(self):
-        ...
+    def build(self):
+        if self.on is None and self.using is None:
+            raise ValueError("Join requires On() or Using().")
+
+        return JoinStatement(
+            self.join_type,
+            from_=Expressions(*self.obj),
+            on=self.on,
+            using=self.using,
+        )
 
 
 class InnerJoin(Join):
-    ...
+    join_type = "INNER"
 
 
 class RightJoin(Join):
-    ...
+    join_type = "RIGHT"
 
 
 class LeftJoin(Join):
-    ...
+    join_type = "LEFT"
+
+
+class FullJoin(Join):
+    join_type = "FULL"
+
+
+class CrossJoin(Join):
+    join_type = "CROSS"
 
 
 class Where:
     def __init__(self, *args):
-        ...
+        if not args:
+            raise ValueError(
+                f"{self.__class__.__name__}() requires at least one condition."
+            )
+        self.obj = and_(*args)
+
+    def build(self):
+        return self.obj
+
+
+class Having(Where):
+    ...
+
+
+class Select:
+    """Build a SelectStatement without parsing.
+
+    Strings are identifiers (``"u.id"``); pass string literals as ``Value``.
+    Keyword arguments are aliases::
+
+        Select("u.id", total=func("sum", "o.price"))
+        .From(u="users")
+        .Join(LeftJoin(o="orders").On(op("=", "u.id", "o.user_id")))
+        .Where(op(">", "o.price", 0))
+        .GroupBy("u.id")
+        .Limit(10)
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.clauses = {"returning": Returning(*args, **kwargs)}
+        self.joins = []
+        self.unions = []
+
+    def From(self, *args, **kwargs):
+        self.clauses["from_"] = From(*args, **kwargs)
+        return self
+
+    def Join(self, *joins: Join):
+        self.joins.extend(joins)
+        return self
+
+    def Where(self, *exprs):
+        self.clauses["where"] = Where(*exprs)
+        return self
+
+    def GroupBy(self, *args, **kwargs):
+        self.clauses["groupby"] = GroupBy(*args, **kwargs)
+        return self
+
+    def Having(self, *exprs):
+        self.clauses["having"] = Having(*exprs)
+        return self
+
+    def OrderBy(self, *args):
+        self.clauses["orderby"] = OrderBy(*args)
+        return self
+
+    def Limit(self, value):
+        self.clauses["limit"] = to_expr(value)
+        return self
+
+    def Offset(self, value):
+        self.clauses["offset"] = to_expr(value)
+        return self
+
+    def Union(self, select: "Select", union_all: bool = False):
+        self.unions.append(("UNION ALL" if union_all else "UNION", select))
+        return self
+
+    def Intersect(self, select: "Select"):
+        self.unions.append(("INTERSECT", select))
+        return self
+
+    def Except(self, select: "Select"):
+        self.unions.append(("EXCEPT", select))
+        return self
+
+    def build(self) -> SelectStatement:
+        stmt = {}
+        for key, clause in self.clauses.items():
+            stmt[key] = clause.build() if hasattr(clause, "build") else clause
+
+        if "from_" in stmt:
+            stmt["joins"] = Expressions(*(x.build() for x in self.joins))
+        elif self.joins:
+            raise ValueError("Join requires From().")
+
+        # 後続の集合演算は直前の SELECT の unions に連結する
+        parent = stmt
+        for union_type, select in self.unions:
+            # 渡された SELECT は変更せず、連結する節点を複製する
+            select = copy.copy(to_expr(select))
+            parent["unions"] = UnionStatement(union_type, Expressions(select))
+            # 渡された SELECT が持つ集合演算は残し、その末尾に連結する
+            parent = select
+            while parent.get("unions", None):
+                unions = parent["unions"] = copy.copy(parent["unions"])
+                selects = unions["select"] = Expressions(*unions["select"])
+                parent = selects[-1] = copy.copy(selects[-1])
+
+        return SelectStatement(**stmt)
+
+    def to_sql(self):
+        return self.build().to_sql()
@@ -0,0 +1,247 @@
+from dataclasses import dataclass, field, replace
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+from .tokens import AstBase
+
+# 述語として数える二項演算子（比較、パターン照合、IN, IS）
+PREDICATES = frozenset(
+    (
+        "=",
+        "!=",
+        "<>",
+        ">",
+        "<",
+        ">=",
+        "<=",
+        "IS",
+        "IS NOT",
+        "IN",
+        "NOT IN",
+        "LIKE",
+        "NOT LIKE",
+        "ILIKE",
+        "~~",
+        "!~~",
+        "~",
+        "~*",
+        "!~",
+        "!~*",
+    )
+)
+
+
+@dataclass
+class Complexity:
+    joins: int = 0
+    unions: int = 0
+    subqueries: int = 0
+    subquery_depth: int = 0
+    predicates: int = 0
+    in_lists: List[int] = field(default_factory=list)
+    missing_limit: bool = False
+    nodes: int = 0
+
+    @property
+    def max_in_list(self):
+        return max(self.in_lists, default=0)
+
+
+def _get_limit(stmt):
+    # 末尾の LIMIT は最後の UNION の分岐に付くが、UNION 全体を制限する
+    while stmt.get("limit", None) is None and stmt.get("unions", None):
+        stmt = stmt["unions"]["select"][-1]
+    return stmt.get("limit", None)
+
+
+def measure(select) -> Tuple[Complexity, list]:
+    """Measure one SELECT without its subqueries.
+
+    Return the counts of the nodes outside the subqueries and the directly
+    nested subqueries (bracketed SELECTs and the queries of CTEs), which are
+    counted in ``subqueries``. ``missing_limit`` is for the SELECT itself.
+    """
+    joins = unions = predicates = nodes = 0
+    in_lists = []
+    children = []
+
+    stack = [select]
+    pop = stack.pop
+    push = stack.append
+
+    while stack:
+        obj = pop()
+        if not isinstance(obj, AstBase):
+            for x in obj:
+                if isinstance(x, (dict, list)):
+                    push(x)
+            continue
+
+        nodes += 1
+        type = obj["type"]
+
+        if type == "SELECT":
+            from_ = obj.get("from_", None)
+            if from_:
+                joins += len(from_) - 1
+            joins += len(obj.get("joins", None) or ())
+        elif type == "union":
+            unions += 1
+        elif type == "bo":
+            op = obj["op"]
+            if op in PREDICATES:
+                predicates += 1
+                if op == "IN" or op == "NOT IN":
+                    values = obj["expr"][1]["expr"]
+                    if not (
+                        len(values) == 1
+                        and isinstance(values[0], AstBase)
+                        and values[0]["type"] == "SELECT"
+                    ):
+                        in_lists.append(len(values))
+        elif type == "between":
+            predicates += 1
+        elif type == "bracket":
+            for x in obj["expr"]:
+                if isinstance(x, AstBase) and x["type"] == "SELECT":
+                    children.append(x)
+                elif isinstance(x, (dict, list)):
+                    push(x)
+            continue
+        elif type == "cte":
+            children.append(obj["select"])
+            continue
+
+        for value in obj.values():
+            if isinstance(value, (dict, list)):
+                push(value)
+
+    complexity = Complexity(
+        joins=joins,
+        unions=unions,
+        subqueries=len(children),
+        predicates=predicates,
+        in_lists=in_lists,
+        missing_limit=_get_limit(select) is None,
+        nodes=nodes,
+    )
+    return complexity, children
+
+
+def _add(result: Complexity, c: Complexity):
+    result.joins += c.joins
+    result.unions += c.unions
+    result.subqueries += c.subqueries
+    result.predicates += c.predicates
+    result.in_lists.extend(c.in_lists)
+    result.nodes += c.nodes
+
+
+def combine(own: Complexity, subqueries: Iterable[Complexity]) -> Complexity:
+    """Complexity of a SELECT from ``measure`` and those of its subqueries."""
+    result = replace(own, in_lists=list(own.in_lists))
+    for c in subqueries:
+        _add(result, c)
+        result.subquery_depth = max(result.subquery_depth, c.subquery_depth + 1)
+    return result
+
+
+def analyze(stmt) -> Complexity:
+    """Measure a statement in one pass over its nodes.
+
+    ``joins`` counts JOIN clauses and comma-separated FROM items, ``unions``
+    the UNION/INTERSECT/EXCEPT branches, ``subqueries`` the bracketed SELECTs
+    and CTEs, and ``subquery_depth`` the deepest nesting of them (the
+    statement itself is depth 0).
+    """
+    result = Complexity()
+
+    # 副問合せは深さと共に selects に積む
+    selects = [(stmt, 0)]
+    while selects:
+        select, depth = selects.pop()
+        c, children = measure(select)
+        _add(result, c)
+        result.subquery_depth = max(result.subquery_depth, depth)
+        selects.extend((x, depth + 1) for x in children)
+
+    result.missing_limit = _get_limit(stmt) is None
+    return result
+
+
+@dataclass(frozen=True)
+class CostWeights:
+    joins: float = 10
+    unions: float = 5
+    subqueries: float = 5
+    subquery_depth: float = 10
+    predicates: float = 1
+    in_list_items: float = 0.1
+    missing_limit: float = 20
+
+    def score(self, c: Complexity) -> float:
+        return (
+            self.joins * c.joins
+            + self.unions * c.unions
+            + self.subqueries * c.subqueries
+            + self.subquery_depth * c.subquery_depth
+            + self.predicates * c.predicates
+            + self.in_list_items * sum(c.in_lists)
+            + self.missing_limit * c.missing_limit
+        )
+
+
+@dataclass(frozen=True)
+class Thresholds:
+    max_cost: Optional[float] = None
+    max_joins: Optional[int] = None
+    max_unions: Optional[int] = None
+    max_subquery_depth: Optional[int] = None
+    max_predicates: Optional[int] = None
+    max_in_list: Optional[int] = None
+    require_limit: bool = False
+
+    def exceeded(self, c: Complexity, cost: float) -> List[str]:
+        reasons = []
+        for name, value in (
+            ("max_cost", cost),
+            ("max_joins", c.joins),
+            ("max_unions", c.unions),
+            ("max_subquery_depth", c.subquery_depth),
+            ("max_predicates", c.predicates),
+            ("max_in_list", c.max_in_list),
+        ):
+            limit = getattr(self, name)
+            if limit is not None and value > limit:
+                reasons.append(f"{name} exceeded: {value} > {limit}")
+        if self.require_limit and c.missing_limit:
+            reasons.append("LIMIT is required")
+        return reasons
+
+
+class Decision(NamedTuple):
+    action: str  # accept, queue, reject
+    reasons: List[str]
+    cost: float
+    complexity: Complexity
+
+
+@dataclass(frozen=True)
+class AdmissionGate:
+    """Accept, queue or reject a statement by its complexity.
+
+    ``reject`` is checked before ``queue``; a statement that exceeds neither
+    is accepted.
+    """
+
+    queue: Thresholds = Thresholds()
+    reject: Thresholds = Thresholds()
+    weights: CostWeights = CostWeights()
+
+    def decide(self, stmt) -> Decision:
+        complexity = analyze(stmt)
+        cost = self.weights.score(complexity)
+        for action, thresholds in (("reject", self.reject), ("queue", self.queue)):
+            reasons = thresholds.exceeded(complexity, cost)
+            if reasons:
+                return Decision(action, reasons, cost, complexity)
+        return Decision("accept", [], cost, complexity)
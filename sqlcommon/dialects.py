@@ -0,0 +1,76 @@
+import csv
+import os
+from functools import lru_cache
+from typing import FrozenSet, Literal, Optional
+
+from .operators import BOPS, SIGN, get_operators
+
+path = os.path.dirname(__file__)
+
+Dialect = Literal["postgresql", "sql2016", "sql2011", "sql92"]
+
+# dialect -> column of reserved_words.csv
+DIALECTS = {
+    "postgresql": "PostgreSQL",
+    "sql2016": "SQL:2016",
+    "sql2011": "SQL:2011",
+    "sql92": "SQL-92",
+}
+
+
+def validate_dialect(dialect: Optional[str]):
+    if dialect is not None and dialect not in DIALECTS:
+        raise ValueError(
+            f"Unknown dialect: {dialect}. Choose from {', '.join(DIALECTS)}."
+        )
+    return dialect
+
+
+@lru_cache(maxsize=None)
+def get_reserved_words(dialect: Dialect) -> FrozenSet[str]:
+    column = DIALECTS[validate_dialect(dialect)]
+    with open(path + "/reserved_words.csv", newline="") as f:
+        return frozenset(
+            row["Key Word"]
+            for row in csv.DictReader(f)
+            # "reserved (can be function or type)" も予約語として扱う
+            if row[column].startswith("reserved")
+        )
+
+
+def _literal(word: str):
+    escaped = word.replace("\\", "\\\\").replace('"', '\\"')
+    if word.isalpha():
+        return f'"{escaped}"i'
+    else:
+        return f'"{escaped}"'
+
+
+def _terminal(name: str, words):
+    # 最長一致させるため長い順に並べる
+    words = sorted(words, key=lambda x: (-len(x), x))
+    return f"%override {name}: " + "\n    | ".join(_literal(x) for x in words)
+
+
+@lru_cache(maxsize=None)
+def get_grammar(dialect: Optional[Dialect] = None) -> str:
+    validate_dialect(dialect)
+
+    with open(path + "/grammer2.lark") as grammer:
+        text = grammer.read()
+
+    if dialect is None:
+        return text
+
+    bops = [x["op"] for x in get_operators(BOPS, dialect)]
+    signs = [x["op"] for x in get_operators(SIGN, dialect)]
+
+    overrides = [
+        _terminal("RESERVED_WORDS", get_reserved_words(dialect)),
+        _terminal("BOPS", bops),
+        _terminal("SIGN", signs),
+        # 関数呼び出しは予約語（count, sum 等）を関数名として許容する
+        '%override func: [name "."] FUNC_NAME "(" (expr ("," expr)*)? ")"',
+        "FUNC_NAME: NAME",
+    ]
+    return text + "\n\n" + "\n\n".join(overrides) + "\n"
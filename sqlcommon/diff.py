@@ -0,0 +1,237 @@
+from difflib import SequenceMatcher
+from functools import lru_cache
+from hashlib import blake2b
+from typing import Any, Dict, List, NamedTuple, Tuple, Union
+
+from .nodes import SELECT_KEYS
+from .tokens import Identifier, to_sql
+
+
+class Edit(NamedTuple):
+    # added, removed, changed（値）, renamed（識別子）, replaced（節点の種類）
+    kind: str
+    path: Tuple[Union[str, int], ...]
+    old: Any
+    new: Any
+
+    def __str__(self):
+        def show(x):
+            return to_sql(x) if isinstance(x, (dict, list)) else repr(x)
+
+        path = ".".join(str(x) for x in self.path) or "."
+        if self.kind == "added":
+            return f"added {path}: {show(self.new)}"
+        elif self.kind == "removed":
+            return f"removed {path}: {show(self.old)}"
+        return f"{self.kind} {path}: {show(self.old)} -> {show(self.new)}"
+
+
+# 128 bit。n 個の部分木のどれかが衝突する確率は n * n / 2 ** 129 以下
+DIGEST_SIZE = 16
+
+# 共通の先頭と末尾を除いた要素数の積がこれを超える list は位置で対応付ける
+MAX_ALIGNMENT = 1 << 16
+
+
+@lru_cache(maxsize=4096)
+def _digest(cls: type, value) -> bytes:
+    text = f"{cls.__name__}:{value!r}"
+    return blake2b(text.encode("utf-8"), digest_size=DIGEST_SIZE).digest()
+
+
+def _scalar_digest(value) -> bytes:
+    # 1, 1.0, True を区別する（lru_cache の key にも型を含める）
+    return _digest(value.__class__, value)
+
+
+@lru_cache(maxsize=1024)
+def _key_prefix(key: str) -> bytes:
+    return key.encode("utf-8") + b"\0"
+
+
+def subtree_hashes(tree, memo: Dict[int, bytes] = None) -> Dict[int, bytes]:
+    """Digest of every node and list in ``tree``, keyed by ``id``.
+
+    Equal subtrees have equal digests regardless of the order of their keys,
+    so trees from different parsers can be compared. Digests are 128-bit
+    ``blake2b`` of the digests of the children, so among ``n`` subtrees the
+    chance of any collision is below ``n * n / 2 ** 129``. The walk is
+    iterative. Pass the result of a previous call as ``memo`` to reuse it
+    while its trees are alive (ids of freed objects are reused).
+    """
+    memo = {} if memo is None else memo
+    if not isinstance(tree, (dict, list)):
+        return memo
+    stack: list = [tree]
+    push = stack.append
+    pop = stack.pop
+    while stack:
+        obj = pop()
+        if obj is None:
+            # 子の計算が済んだ節点
+            obj = pop()
+            if isinstance(obj, dict):
+                # key は NUL を含まず digest は固定長なので、連結は一意に戻せる
+                h = blake2b(b"d", digest_size=DIGEST_SIZE)
+                for entry in sorted(
+                    [
+                        _key_prefix(k)
+                        + (
+                            memo[id(v)]
+                            if isinstance(v, (dict, list))
+                            else _scalar_digest(v)
+                        )
+                        for k, v in obj.items()
+                    ]
+                ):
+                    h.update(entry)
+            else:
+                h = blake2b(b"l", digest_size=DIGEST_SIZE)
+                for v in obj:
+                    h.update(
+                        memo[id(v)]
+                        if isinstance(v, (dict, list))
+                        else _scalar_digest(v)
+                    )
+            memo[id(obj)] = h.digest()
+        elif id(obj) not in memo:
+            push(obj)
+            push(None)
+            for v in obj.values() if isinstance(obj, dict) else obj:
+                if isinstance(v, (dict, list)):
+                    push(v)
+    return memo
+
+
+def _select_order(key):
+    try:
+        return SELECT_KEYS.index(key)
+    except ValueError:
+        return len(SELECT_KEYS)
+
+
+def _absent(value):
+    return value is None or (isinstance(value, list) and not value)
+
+
+def _materialize(path) -> tuple:
+    # path は (親, key) の連結リスト
+    keys = []
+    while path is not None:
+        path, key = path
+        keys.append(key)
+    keys.reverse()
+    return tuple(keys)
+
+
+def diff(old, new, hashes: Dict[int, bytes] = None) -> List[Edit]:
+    """Edits that turn the ``old`` tree into the ``new`` one.
+
+    Subtrees with equal digests are skipped without being visited, so the
+    cost is the hashing of both trees plus the size of the changed parts.
+    Elements of lists are aligned by their digests, so an inserted item is
+    reported as one addition. The alignment (``SequenceMatcher``) is
+    quadratic in the worst case, so when the differing middles of two lists
+    are larger than ``MAX_ALIGNMENT`` allows, their elements are paired by
+    position. ``hashes`` may hold the digests of ``old`` from
+    ``subtree_hashes`` when it is compared with many trees; it is extended
+    with the digests of ``new``.
+    """
+    hashes = subtree_hashes(new, subtree_hashes(old, hashes))
+
+    def hash_of(x):
+        return hashes[id(x)] if isinstance(x, (dict, list)) else _scalar_digest(x)
+
+    edits: List[Edit] = []
+    # 作業（old, new, path）と出力する Edit を文書順に取り出す
+    stack: list = [(old, new, None)]
+
+    while stack:
+        item = stack.pop()
+        if isinstance(item, Edit):
+            edits.append(item._replace(path=_materialize(item.path)))
+            continue
+
+        a, b, path = item
+        if hash_of(a) == hash_of(b):
+            continue
+
+        tasks: list = []
+        if isinstance(a, dict) and isinstance(b, dict):
+            if a.get("type") != b.get("type"):
+                tasks.append(Edit("replaced", path, a, b))
+            else:
+                type = a.get("type")
+                skip = ()
+                if type in ("identifier", "func") and (a["name"], a["parent"]) != (
+                    b["name"],
+                    b["parent"],
+                ):
+                    tasks.append(
+                        Edit(
+                            "renamed",
+                            path,
+                            Identifier.get_name(a),
+                            Identifier.get_name(b),
+                        )
+                    )
+                    skip = ("name", "parent")
+                elif type == "value" and hash_of(a["value"]) != hash_of(b["value"]):
+                    tasks.append(Edit("changed", path, a["value"], b["value"]))
+                    skip = ("value",)
+
+                keys = (*a, *(k for k in b if k not in a))
+                if type == "SELECT":
+                    # SQL に現れる順に報告する
+                    keys = sorted(keys, key=_select_order)
+                for key in keys:
+                    if key in skip:
+                        continue
+                    x = a.get(key, None)
+                    y = b.get(key, None)
+                    if _absent(x) and _absent(y):
+                        continue
+                    elif _absent(x):
+                        tasks.append(Edit("added", (path, key), None, y))
+                    elif _absent(y):
+                        tasks.append(Edit("removed", (path, key), x, None))
+                    else:
+                        tasks.append((x, y, (path, key)))
+
+        elif isinstance(a, list) and isinstance(b, list):
+            ha = [hash_of(x) for x in a]
+            hb = [hash_of(x) for x in b]
+            # 共通の先頭と末尾は対応付けない
+            lo = 0
+            n = min(len(a), len(b))
+            while lo < n and ha[lo] == hb[lo]:
+                lo += 1
+            hi = 0
+            while hi < n - lo and ha[-1 - hi] == hb[-1 - hi]:
+                hi += 1
+            ha = ha[lo : len(a) - hi]
+            hb = hb[lo : len(b) - hi]
+            if len(ha) * len(hb) <= MAX_ALIGNMENT:
+                opcodes = SequenceMatcher(None, ha, hb, autojunk=False).get_opcodes()
+            else:
+                opcodes = [("replace", 0, len(ha), 0, len(hb))]
+            for tag, i1, i2, j1, j2 in opcodes:
+                if tag == "equal":
+                    continue
+                i1, i2, j1, j2 = i1 + lo, i2 + lo, j1 + lo, j2 + lo
+                common = min(i2 - i1, j2 - j1)
+                for k in range(common):
+                    tasks.append((a[i1 + k], b[j1 + k], (path, i1 + k)))
+                for i in range(i1 + common, i2):
+                    tasks.append(Edit("removed", (path, i), a[i], None))
+                for j in range(j1 + common, j2):
+                    tasks.append(Edit("added", (path, j), None, b[j]))
+
+        elif isinstance(a, (dict, list)) or isinstance(b, (dict, list)):
+            tasks.append(Edit("replaced", path, a, b))
+        else:
+            tasks.append(Edit("changed", path, a, b))
+
+        stack.extend(reversed(tasks))
+
+    return edits
@@ -1,8 +1,13 @@
+import json
+import re
 import sys
-from typing import Any, NamedTuple
+from functools import lru_cache
+from typing import IO, TYPE_CHECKING, Any, Iterable, Iterator, List, NamedTuple, Union
 
-from lark import Lark, Transformer, v_args
+if TYPE_CHECKING:
+    from lark import Lark
 
+# [] は省略時に None を返すため、空の配列・オブジェクトは ()? で表す
 json_grammar = r"""
     ?start: value
 
@@ -15,8 +20,8 @@ json_grammar = r"""
           | "false"            -> false
           | "null"             -> null
 
-    array  : "[" [value ("," value)*] "]"
-    object : "{" [pair ("," pair)*] "}"
+    array  : "[" (value ("," value)*)? "]"
+    object : "{" (pair ("," pair)*)? "}"
     kv : "<" pair ">"
     pair   : string ":" value
 
@@ -41,28 +46,222 @@ class KeyValue(NamedTuple):
         return f"('{self.key}', {self.value})"
 
 
-class TreeToJson(Transformer):
-    @v_args(inline=True)
-    def string(self, s):
-        return s[1:-1].replace('\\"', '"')
+@lru_cache(maxsize=None)
+def load_transformer_class():
+    # lark の import は初回使用時まで遅延する
+    from lark import Transformer, v_args
 
-    def kv(self, s):
-        return KeyValue(s[0][0], s[0][1])
+    class TreeToJson(Transformer):
+        @v_args(inline=True)
+        def string(self, s):
+            if "\\" in s:
+                return json.loads(s)
+            return s[1:-1]
 
-    array = list
-    pair = tuple
-    object = dict
-    number = v_args(inline=True)(float)
+        def kv(self, s):
+            return KeyValue(s[0][0], s[0][1])
 
-    null = lambda self, _: None
-    true = lambda self, _: True
-    false = lambda self, _: False
+        array = list
+        pair = tuple
+        object = dict
+        number = v_args(inline=True)(float)
 
+        null = lambda self, _: None
+        true = lambda self, _: True
+        false = lambda self, _: False
 
-### Create the JSON parser with Lark, using the LALR algorithm
-json_parser = Lark(json_grammar, start="value")
+    return TreeToJson
+
+
+### Create the JSON parser with Lark on first use
+@lru_cache(maxsize=None)
+def load_json_lark() -> "Lark":
+    from lark import Lark
+
+    # 文法は LALR(1) で解析でき、木を作らずに transformer を直接適用する
+    return Lark(
+        json_grammar,
+        start="value",
+        parser="lalr",
+        transformer=load_transformer_class()(),
+    )
+
+
+def __getattr__(name):
+    # 互換性のため json_parser を残す。文法の構築は初回参照時まで遅延する
+    if name == "json_parser":
+        return load_json_lark()
+    elif name == "TreeToJson":
+        return load_transformer_class()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _reject_constant(name: str):
+    # NaN, Infinity は文法に含まれないため Lark で構文エラーにする
+    raise ValueError(name)
+
+
+# 数値は文法と同じく float で返す
+_decoder = json.JSONDecoder(parse_int=float, parse_constant=_reject_constant)
 
 
 def parse(text='("key": "value")'):
-    tree = json_parser.parse(text)
-    return TreeToJson().transform(tree)
+    # KeyValue を含まない JSON は標準ライブラリ（C 実装）で復号し、
+    # 失敗した場合のみ Lark で解析する
+    try:
+        return _decoder.decode(text)
+    except ValueError:
+        return load_json_lark().parse(text)
+
+
+def parse_many(texts: Iterable[str]) -> List[Any]:
+    """Decode many documents with one parser."""
+    decode = _decoder.decode
+    lark = load_json_lark()
+    result = []
+    for text in texts:
+        try:
+            result.append(decode(text))
+        except ValueError:
+            result.append(lark.parse(text))
+    return result
+
+
+STRUCTURE = re.compile(r'["\[\]{}<>,]')
+STRING_END = re.compile(r'["\\]')
+WHITESPACE = re.compile(r"[ \t\n\r]*")
+DELIMITER = re.compile(r"[ \t\n\r]*([,\]])")
+
+
+class ArrayDecoder:
+    """Incremental decoder for a top-level array.
+
+    ``feed`` accepts the text in chunks of any size and returns the elements
+    completed so far. Only the unfinished element is kept in memory.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.pos = 0
+        self.start = 0
+        self.depth = 0
+        self.count = 0
+        self.in_string = False
+        self.opened = False
+        self.closed = False
+
+    def feed(self, chunk: str) -> List[Any]:
+        if self.closed:
+            if chunk.strip():
+                raise ValueError("Extra data after the array.")
+            return []
+
+        buffer = self.buffer = self.buffer + chunk
+        pos = self.pos
+        result = []
+
+        while True:
+            if self.in_string:
+                m = STRING_END.search(buffer, pos)
+                if m is None:
+                    pos = len(buffer)
+                    break
+                elif m.group() == "\\":
+                    if m.end() == len(buffer):
+                        pos = m.start()
+                        break
+                    pos = m.end() + 1
+                else:
+                    self.in_string = False
+                    pos = m.end()
+                continue
+
+            if self.depth == 1 and pos == self.start:
+                # 要素の先頭では json の C 実装で 1 要素ずつ復号する
+                # KeyValue を含む要素や途中で切れた要素は走査に任せる
+                try:
+                    obj, end = _decoder.raw_decode(
+                        buffer, WHITESPACE.match(buffer, pos).end()
+                    )
+                except ValueError:
+                    pass
+                else:
+                    m = DELIMITER.match(buffer, end)
+                    if m is not None:
+                        self.count += 1
+                        result.append(obj)
+                        pos = self.start = m.end()
+                        if m.group(1) == "]":
+                            return self.finish(buffer, pos, result)
+                        continue
+
+            m = STRUCTURE.search(buffer, pos)
+            if m is None:
+                pos = len(buffer)
+                break
+
+            c = m.group()
+            pos = m.end()
+
+            if not self.opened:
+                if c != "[" or buffer[: m.start()].strip():
+                    raise ValueError("Expected an array.")
+                self.opened = True
+                self.depth = 1
+                self.start = pos
+            elif c == '"':
+                self.in_string = True
+            elif c in "[{<":
+                self.depth += 1
+            elif c in "]}>":
+                self.depth -= 1
+                if self.depth == 0:
+                    element = buffer[self.start : m.start()]
+                    if self.count or element.strip():
+                        result.append(self.decode(element))
+                    return self.finish(buffer, pos, result)
+            elif c == "," and self.depth == 1:
+                result.append(self.decode(buffer[self.start : m.start()]))
+                self.start = pos
+
+        # 処理済みの要素を捨て、未完了の要素だけを保持する
+        if self.opened:
+            self.buffer = buffer[self.start :]
+            self.pos = pos - self.start
+            self.start = 0
+        else:
+            self.pos = pos
+        return result
+
+    def finish(self, buffer: str, pos: int, result: List[Any]):
+        self.closed = True
+        self.buffer = ""
+        self.pos = self.start = 0
+        if buffer[pos:].strip():
+            raise ValueError("Extra data after the array.")
+        return result
+
+    def decode(self, text: str):
+        self.count += 1
+        return parse(text)
+
+    def close(self):
+        if not self.closed:
+            raise ValueError("Unexpected end of input.")
+
+
+def iter_array(
+    source: Union[str, IO[str], Iterable[str]], chunk_size: int = 1 << 16
+) -> Iterator[Any]:
+    """Yield the elements of a top-level array from a string, file or chunks."""
+    if isinstance(source, str):
+        chunks = (source[i : i + chunk_size] for i in range(0, len(source), chunk_size))
+    elif hasattr(source, "read"):
+        chunks = iter(lambda: source.read(chunk_size), "")
+    else:
+        chunks = source
+
+    decoder = ArrayDecoder()
+    for chunk in chunks:
+        yield from decoder.feed(chunk)
+    decoder.close()
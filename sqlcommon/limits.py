@@ -0,0 +1,237 @@
+import re
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Optional
+
+from .operators import BOPS, SIGN
+
+
+@dataclass(frozen=True)
+class Limits:
+    max_length: Optional[int] = 100_000
+    max_tokens: Optional[int] = 10_000
+    # 括弧で区切られていない二項演算子の連鎖数（Earley の曖昧性は連鎖長に対して爆発する）
+    max_operators: Optional[int] = 32
+    max_depth: Optional[int] = 64
+    timeout: Optional[float] = 1.0
+    # Earley の項目数（解析表の大きさ）と構文木の節点数の合計
+    max_steps: Optional[int] = None
+
+
+class ParseLimitError(Exception):
+    def __init__(self, reason: str, limit, value, text: str, pos: int):
+        self.reason = reason
+        self.limit = limit
+        self.value = value
+        self.pos = pos
+        self.line = text.count("\n", 0, pos) + 1
+        self.column = pos - (text.rfind("\n", 0, pos) + 1) + 1
+        super().__init__(
+            f"{reason} exceeded: {value} > {limit}"
+            f" at line {self.line} col {self.column}"
+        )
+
+
+TOKEN = re.compile(
+    r"""
+    \s+
+    | --[^\n]*
+    | /\*.*?(?:\*/|$)
+    | (?P<token>
+        '(?:[^']|'')*'?
+        | "(?:[^"]|"")*"?
+        | \w+
+        | [<>=!~|&^\#@%*/+\-]+
+        | \S
+    )
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+OPERATORS = frozenset(x["op"].upper() for x in BOPS + SIGN)
+SYMBOLS = frozenset("<>=!~|&^#@%*/+-")
+CLAUSES = frozenset(
+    (
+        "SELECT",
+        "FROM",
+        "WHERE",
+        "HAVING",
+        "ON",
+        "USING",
+        "JOIN",
+        "GROUP",
+        "ORDER",
+        "BY",
+        "LIMIT",
+        "OFFSET",
+        "UNION",
+        "INTERSECT",
+        "EXCEPT",
+        "WINDOW",
+    )
+)
+
+
+def check_input(text: str, limits: Limits):
+    if limits.max_length is not None and len(text) > limits.max_length:
+        raise ParseLimitError(
+            "max_length", limits.max_length, len(text), text, limits.max_length
+        )
+
+    tokens = 0
+    depth = 0
+    operators = 0
+
+    for m in TOKEN.finditer(text):
+        token = m.group("token")
+        if token is None:
+            continue
+
+        tokens += 1
+        if limits.max_tokens is not None and tokens > limits.max_tokens:
+            raise ParseLimitError(
+                "max_tokens", limits.max_tokens, tokens, text, m.start()
+            )
+
+        if token == "(":
+            depth += 1
+            operators = 0
+            if limits.max_depth is not None and depth > limits.max_depth:
+                raise ParseLimitError(
+                    "max_depth", limits.max_depth, depth, text, m.start()
+                )
+        elif token == ")":
+            depth -= 1
+            operators = 0
+        elif token in {",", ";"}:
+            operators = 0
+        else:
+            upper = token.upper()
+            if upper in OPERATORS or upper[0] in SYMBOLS:
+                # 未知の記号の連続（"+-+-" 等）は 1 文字ずつ数える
+                operators += 1 if upper in OPERATORS else len(upper)
+                if (
+                    limits.max_operators is not None
+                    and operators > limits.max_operators
+                ):
+                    raise ParseLimitError(
+                        "max_operators",
+                        limits.max_operators,
+                        operators,
+                        text,
+                        m.start(),
+                    )
+            elif upper in CLAUSES:
+                operators = 0
+
+
+# timeout の計測に使う時計（テストで置き換える）
+clock = time.perf_counter
+
+
+class Budget:
+    __slots__ = ("limits", "text", "start", "steps", "pos")
+
+    def __init__(self, text: str, limits: Limits):
+        self.limits = limits
+        self.text = text
+        self.start = clock()
+        self.steps = 0
+        self.pos = 0
+
+    def step(self, n: int = 1):
+        self.steps += n
+        limits = self.limits
+
+        if limits.max_steps is not None and self.steps > limits.max_steps:
+            raise ParseLimitError(
+                "max_steps", limits.max_steps, self.steps, self.text, self.pos
+            )
+
+        if limits.timeout is not None:
+            elapsed = clock() - self.start
+            if elapsed > limits.timeout:
+                raise ParseLimitError(
+                    "timeout", limits.timeout, round(elapsed, 3), self.text, self.pos
+                )
+
+
+current_budget: ContextVar[Optional[Budget]] = ContextVar(
+    "current_budget", default=None
+)
+
+
+_hooks_lock = threading.Lock()
+
+
+def unsupported_lark(feature: str, detail: str) -> RuntimeError:
+    """Error for a feature that relies on lark internals missing here."""
+    from lark import __version__
+
+    return RuntimeError(
+        f"{feature} is not supported with lark {__version__}: {detail}."
+    )
+
+
+def install_hooks(lark):
+    """Check the current budget on every Earley column and tree node.
+
+    The hooks replace internals of lark's Earley parser
+    (``predict_and_complete`` and the tree builder ``callbacks``; checked
+    with lark 1.3, pinned ``^1.1.2`` in pyproject.toml), so install them only
+    on a Lark instance used by parsers with limits. The hooks are no-ops
+    unless a budget is set. LALR is linear and not hooked.
+    """
+    if lark.options.parser != "earley":
+        return
+
+    parser = lark.parser.parser
+    if getattr(parser, "_budget_hooks", False):
+        return
+    if not hasattr(parser, "predict_and_complete") or not isinstance(
+        getattr(parser, "callbacks", None), dict
+    ):
+        raise unsupported_lark(
+            "Parse limiting",
+            "the Earley parser has no predict_and_complete or callbacks",
+        )
+
+    with _hooks_lock:
+        # 同じ Lark に複数のスレッドが同時に設定しないようにする
+        if not getattr(parser, "_budget_hooks", False):
+            _install_hooks(parser)
+
+
+def _install_hooks(parser):
+    predict_and_complete = parser.predict_and_complete
+
+    def predict_and_complete_with_budget(i, to_scan, columns, *args):
+        predict_and_complete(i, to_scan, columns, *args)
+        budget = current_budget.get()
+        if budget is not None:
+            budget.pos = i
+            budget.step(len(columns[i]))
+
+    def wrap(callback):
+        def callback_with_budget(children):
+            budget = current_budget.get()
+            if budget is not None:
+                budget.step()
+            return callback(children)
+
+        return callback_with_budget
+
+    parser.predict_and_complete = predict_and_complete_with_budget
+    parser.callbacks = {k: wrap(v) for k, v in parser.callbacks.items()}
+    parser._budget_hooks = True
+
+
+def set_eof_position(e, text: str):
+    # dynamic lexer の UnexpectedEOF は位置を持たないため入力の末尾を設定する
+    pos = len(text)
+    e.pos_in_stream = pos
+    e.line = text.count("\n") + 1
+    e.column = pos - (text.rfind("\n") + 1) + 1
+    return e
@@ -0,0 +1,300 @@
+"""Memory used by syntax trees and by parsing them.
+
+    memory_usage(get_parser()(sql)).by_type["Identifier"].size
+
+    profiler = AllocationProfiler()
+    for sql in statements:
+        profiler.parse(sql)
+    print(profiler.report())
+
+``memory_usage`` walks a tree and sums ``sys.getsizeof`` of its objects by
+node type. ``AllocationProfiler`` parses with the Earley parser under
+``tracemalloc`` and attributes the memory still allocated after each call
+to the grammar rule whose parse tree node it built and to the transformer
+callback that converted it.
+
+    python -m sqlcommon.memory queries.log --top 10
+"""
+import argparse
+import gc
+import sys
+import tracemalloc
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional
+
+from .dialects import Dialect, validate_dialect
+
+if TYPE_CHECKING:
+    from lark import Transformer as _TransformerBase
+else:
+    _TransformerBase = object
+
+
+@dataclass
+class Usage:
+    count: int = 0
+    # バイト数（呼出しでは、呼出し後も確保されている大きさ）
+    size: int = 0
+    # 一時的な確保を含む最大（tracemalloc.reset_peak を使える Python 3.9 以降）
+    peak: int = 0
+
+
+@dataclass(frozen=True)
+class MemoryUsage:
+    size: int
+    count: int
+    # 節点の型 -> 節点と、節点が単独で持つ値（文字列、数値、span）の合計
+    by_type: Dict[str, Usage] = field(default_factory=dict)
+
+
+def _sorted(usages: Dict[str, Usage]) -> Dict[str, Usage]:
+    return dict(sorted(usages.items(), key=lambda x: (-x[1].size, x[0])))
+
+
+def memory_usage(tree) -> MemoryUsage:
+    """Deep memory usage of a parsed statement, by node type.
+
+    Nodes and lists are counted under their class name (``Identifier``,
+    ``Expressions``, ...). Strings, numbers and spans are added to the node
+    that holds them. Objects reachable twice are counted once; ``None``,
+    booleans and the ``type`` tags are shared by every tree and not counted.
+    """
+    by_type: Dict[str, Usage] = {}
+    seen = set()
+    stack: list = [(tree, None)]
+    push = stack.append
+    pop = stack.pop
+    while stack:
+        obj, owner = pop()
+        if obj is None or obj is True or obj is False or id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        size = sys.getsizeof(obj)
+
+        if isinstance(obj, (dict, list)):
+            name = obj.__class__.__name__
+            usage = by_type.get(name)
+            if usage is None:
+                usage = by_type[name] = Usage()
+            usage.count += 1
+            usage.size += size
+            if isinstance(obj, dict):
+                for k, v in obj.items():
+                    if k != "type":
+                        push((v, name))
+                # native パーサが記録する位置
+                span = getattr(obj, "span", None)
+                if span is not None:
+                    usage.size += sys.getsizeof(obj.__dict__)
+                    push((span, name))
+            else:
+                for v in obj:
+                    push((v, name))
+        else:
+            if owner is None:
+                owner = obj.__class__.__name__
+            usage = by_type.get(owner)
+            if usage is None:
+                usage = by_type[owner] = Usage()
+            usage.size += size
+            if isinstance(obj, tuple):
+                for v in obj:
+                    push((v, owner))
+
+    return MemoryUsage(
+        size=sum(x.size for x in by_type.values()),
+        count=sum(x.count for x in by_type.values()),
+        by_type=_sorted(by_type),
+    )
+
+
+def _traced() -> int:
+    return tracemalloc.get_traced_memory()[0]
+
+
+def _record(usages: Dict[str, Usage], name: str, size: int):
+    usage = usages.get(name)
+    if usage is None:
+        usage = usages[name] = Usage()
+    usage.count += 1
+    usage.size += size
+
+
+class _Profiled(_TransformerBase):
+    # Transformer の呼出しごとに確保された大きさを記録する
+    # lark の内部（_call_userfunc）を上書きする。対応は AllocationProfiler で確認する
+    _usages: Dict[str, Usage]
+
+    def _call_userfunc(self, tree, new_children=None):
+        name = tree.data
+        if getattr(self.__class__, name, None) is None:
+            # 既定の処理（Tree の再構築）
+            return super()._call_userfunc(tree, new_children)
+        before = _traced()
+        result = super()._call_userfunc(tree, new_children)
+        _record(self._usages, name, _traced() - before)
+        return result
+
+    def _call_userfunc_token(self, token):
+        name = token.type
+        if getattr(self.__class__, name, None) is None:
+            return super()._call_userfunc_token(token)
+        before = _traced()
+        result = super()._call_userfunc_token(token)
+        _record(self._usages, name, _traced() - before)
+        return result
+
+
+class AllocationProfiler:
+    """Parse under ``tracemalloc`` and attribute allocations.
+
+    ``rules`` maps a grammar rule to the parse tree nodes built for it and
+    ``callbacks`` maps a transformer callback to the values it returned;
+    sizes are the bytes still allocated when the call returns, so they do
+    not include temporaries. ``phases`` holds the totals of the Earley parse
+    and of the transform. The chart of the Earley parse is cyclic garbage
+    freed only by the collector, so phases run between ``gc.collect`` calls
+    and their ``peak`` is the memory a worker must provide. The profiler
+    owns its Lark instance, so the parsers of ``get_parser`` are not slowed
+    down.
+    """
+
+    def __init__(self, dialect: Optional[Dialect] = None, cls_transformer=None):
+        # memory_usage だけを使う場合は lark を読み込まない
+        from lark import Transformer
+
+        from .limits import unsupported_lark
+        from .transformer import SqlTransformer, create_lark
+
+        validate_dialect(dialect)
+        if not all(
+            hasattr(Transformer, x) for x in ("_call_userfunc", "_call_userfunc_token")
+        ):
+            raise unsupported_lark(
+                "Allocation profiling",
+                "Transformer has no _call_userfunc or _call_userfunc_token",
+            )
+        if cls_transformer is None:
+            cls_transformer = SqlTransformer
+        self.rules: Dict[str, Usage] = {}
+        self.callbacks: Dict[str, Usage] = {}
+        self.phases: Dict[str, Usage] = {}
+        self.parses = 0
+
+        self.lark = create_lark("start", "earley", dialect)
+        parser = self.lark.parser.parser
+        if not isinstance(getattr(parser, "callbacks", None), dict):
+            raise unsupported_lark(
+                "Allocation profiling", "the Earley parser has no callbacks"
+            )
+        parser.callbacks = {
+            rule: self._wrap(str(rule.origin.name), callback)
+            for rule, callback in parser.callbacks.items()
+        }
+
+        cls = type(
+            f"Profiled{cls_transformer.__name__}", (_Profiled, cls_transformer), {}
+        )
+        self.transformer = cls()
+        self.transformer._usages = self.callbacks
+
+    def _wrap(self, name: str, callback):
+        rules = self.rules
+
+        def profiled(children):
+            before = _traced()
+            result = callback(children)
+            _record(rules, name, _traced() - before)
+            return result
+
+        return profiled
+
+    def _phase(self, name: str, func, arg):
+        # Earley の解析表は循環参照を持ち、GC まで解放されない
+        gc.collect()
+        reset_peak = getattr(tracemalloc, "reset_peak", None)
+        if reset_peak is not None:
+            reset_peak()
+        before = _traced()
+        result = func(arg)
+        peak = tracemalloc.get_traced_memory()[1]
+        gc.collect()
+        _record(self.phases, name, _traced() - before)
+        usage = self.phases[name]
+        if reset_peak is not None:
+            usage.peak = max(usage.peak, peak - before)
+        return result
+
+    def parse(self, text: str):
+        """Parse ``text`` like ``get_parser()`` and record its allocations."""
+        tracing = tracemalloc.is_tracing()
+        if not tracing:
+            tracemalloc.start()
+        try:
+            tree = self._phase("parse", self.lark.parse, text)
+            result = self._phase("transform", self.transformer.transform, tree)
+        finally:
+            if not tracing:
+                tracemalloc.stop()
+        self.parses += 1
+        return result
+
+    def report(self, top: int = 10) -> str:
+        lines: List[str] = [f"{self.parses} statements"]
+        for title, usages in (
+            ("phase", self.phases),
+            ("rule", self.rules),
+            ("callback", self.callbacks),
+        ):
+            lines.append(_table(title, usages, top))
+        return "\n".join(lines)
+
+
+def _table(title: str, usages: Dict[str, Usage], top: int) -> str:
+    # peak は測定した場合のみ表示する
+    peak = any(x.peak for x in usages.values())
+    lines = [
+        f"\n{title:<24} {'count':>10} {'bytes':>12}"
+        + (f" {'peak':>12}" if peak else "")
+    ]
+    for name, usage in list(_sorted(usages).items())[:top]:
+        line = f"{name:<24} {usage.count:>10} {usage.size:>12}"
+        lines.append(line + (f" {usage.peak:>12}" if peak else ""))
+    return "\n".join(lines)
+
+
+def _lines(path: str) -> Iterable[str]:
+    f = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    try:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield line
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(
+        prog="python -m sqlcommon.memory", description=__doc__.splitlines()[0]
+    )
+    parser.add_argument("log", help="statements, one per line (- for stdin)")
+    parser.add_argument("--dialect", default=None)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    profiler = AllocationProfiler(args.dialect)
+    trees: Dict[str, Usage] = {}
+    for text in _lines(args.log):
+        for name, usage in memory_usage(profiler.parse(text)).by_type.items():
+            total = trees.setdefault(name, Usage())
+            total.count += usage.count
+            total.size += usage.size
+
+    print(_table("node", trees, args.top))
+    print(profiler.report(args.top))
+
+
+if __name__ == "__main__":
+    main()
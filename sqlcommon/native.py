@@ -0,0 +1,561 @@
+import re
+from functools import lru_cache
+from typing import Optional
+
+from .dialects import Dialect, get_grammar, validate_dialect
+from .limits import set_eof_position
+from .precedence import Operator, parse_expression
+from .tokens import (
+    Bracket,
+    CommonTableExpression,
+    Expressions,
+    Func,
+    Identifier,
+    JoinStatement,
+    Param,
+    SelectStatement,
+    UnionStatement,
+    Value,
+    WithClause,
+)
+
+# grammer2.lark と同じ木（SqlTransformer の出力）を手書きの再帰下降で構築する
+# Earley を経由しないため、入力長に対して線形に解析できる
+
+TOKEN_PATTERN = r"""
+    (?P<ws>\s+|--[^\n]*|/\*.+?\*/)
+    | (?P<string>'(?:[^'\n]|'')*')
+    | (?P<name>"(?:[^"\\\n]|\\.)*")
+    | (?P<float>(?:[0-9]+\.[0-9]*|\.[0-9]+)(?:[eE][+-]?[0-9]+)?|[0-9]+[eE][+-]?[0-9]+)
+    | (?P<int>[0-9]+)
+    | (?P<param>
+        :[A-Za-z_][A-Za-z0-9_]*|:[0-9]+|%\([A-Za-z_][A-Za-z0-9_]*\)s|%s|\?|\$[0-9]+
+    )
+    | (?P<word>[A-Za-z_][A-Za-z0-9_]*)
+    | (?P<op>{ops})
+"""
+
+PUNCTUATION = ("(", ")", ",", ".", ";", "*", "!", "[", "]")
+
+# 別名を省略した場合に、後続の句のキーワードを別名として読まない
+FOLLOW = frozenset(
+    (
+        "FROM",
+        "JOIN",
+        "STRAIGHT_JOIN",
+        "NATURAL",
+        "INNER",
+        "CROSS",
+        "LEFT",
+        "RIGHT",
+        "FULL",
+        "ON",
+        "USING",
+        "GROUP",
+        "WHERE",
+        "HAVING",
+        "WINDOW",
+        "ORDER",
+        "LIMIT",
+        "OFFSET",
+        "UNION",
+        "INTERSECT",
+        "EXCEPT",
+        "ASC",
+        "DESC",
+    )
+)
+
+VALUES = {"NULL": None, "TRUE": True, "FALSE": False}
+JOIN_TYPES = frozenset(("INNER", "CROSS", "LEFT", "RIGHT", "FULL"))
+
+
+def terminal_literals(grammar: str, name: str):
+    # %override を含め、最後の定義を採用する
+    definitions = re.findall(
+        rf"^(?:%override )?{name}:(.*?)(?=\n\s*\n|\Z)", grammar, re.M | re.S
+    )
+    body = re.sub(r"//[^\n]*", "", definitions[-1])
+    return [
+        re.sub(r"\\(.)", r"\1", x) for x in re.findall(r'"((?:[^"\\]|\\.)*)"', body)
+    ]
+
+
+class Lexicon:
+    """Keywords and operators of a dialect, taken from its grammar."""
+
+    def __init__(self, dialect: Optional[Dialect] = None):
+        grammar = get_grammar(dialect)
+        bops = terminal_literals(grammar, "BOPS")
+        signs = terminal_literals(grammar, "SIGN")
+
+        self.reserved = frozenset(
+            x.upper() for x in terminal_literals(grammar, "RESERVED_WORDS")
+        )
+        self.infix = frozenset(x.upper() for x in bops)
+        self.prefix = frozenset(x.upper() for x in signs)
+        # 方言の文法は予約語（count 等）を関数名として許容する
+        self.reserved_func_names = dialect is not None
+
+        symbols = {x for x in bops + signs if not x[0].isalpha()}
+        symbols.update(PUNCTUATION)
+        ops = "|".join(re.escape(x) for x in sorted(symbols, key=len, reverse=True))
+        self.pattern = re.compile(TOKEN_PATTERN.format(ops=ops), re.VERBOSE)
+
+    def tokenize(self, text: str):
+        tokens = []
+        match = self.pattern.match
+        pos = 0
+        end = len(text)
+        while pos < end:
+            m = match(text, pos)
+            if m is None:
+                raise unexpected_characters(text, pos)
+            kind = m.lastgroup
+            if kind != "ws":
+                value = m.group()
+                upper = value.upper() if kind == "word" else value
+                tokens.append((kind, value, upper, pos))
+            pos = m.end()
+        tokens.append(("eof", "", "", end))
+        return tokens
+
+
+@lru_cache(maxsize=None)
+def get_lexicon(dialect: Optional[Dialect] = None) -> Lexicon:
+    return Lexicon(validate_dialect(dialect))
+
+
+def unexpected_characters(text: str, pos: int, allowed=None):
+    # Lark と同じ例外を送出する。lark の import は構文エラー時まで遅延する
+    from lark.exceptions import UnexpectedCharacters
+
+    line = text.count("\n", 0, pos) + 1
+    column = pos - (text.rfind("\n", 0, pos) + 1) + 1
+    return UnexpectedCharacters(text, pos, line, column, allowed=allowed)
+
+
+def unquote(value: str):
+    return value[1:-1].replace("''", "'")
+
+
+class Parser:
+    def __init__(self, text: str, lexicon: Lexicon):
+        self.text = text
+        self.lexicon = lexicon
+        self.tokens = lexicon.tokenize(text)
+        self.pos = 0
+
+    # tokens
+
+    def peek(self, offset: int = 0):
+        return self.tokens[min(self.pos + offset, len(self.tokens) - 1)]
+
+    def error(self, *expected):
+        kind, value, upper, pos = self.peek()
+        if kind == "eof":
+            from lark.exceptions import UnexpectedEOF
+
+            return set_eof_position(UnexpectedEOF(list(expected)), self.text)
+        else:
+            return unexpected_characters(self.text, pos, set(expected))
+
+    def keyword(self, *words):
+        kind, value, upper, pos = self.tokens[self.pos]
+        if kind == "word" and upper in words:
+            self.pos += 1
+            return upper
+        return None
+
+    def expect_keyword(self, word: str):
+        if self.keyword(word) is None:
+            raise self.error(word)
+
+    def is_keyword(self, word: str, offset: int = 0):
+        kind, value, upper, pos = self.peek(offset)
+        return kind == "word" and upper == word
+
+    def symbol(self, symbol: str):
+        kind, value, upper, pos = self.tokens[self.pos]
+        if kind == "op" and value == symbol:
+            self.pos += 1
+            return True
+        return False
+
+    def expect_symbol(self, symbol: str):
+        if not self.symbol(symbol):
+            raise self.error(symbol)
+
+    def is_symbol(self, symbol: str, offset: int = 0):
+        kind, value, upper, pos = self.peek(offset)
+        return kind == "op" and value == symbol
+
+    def start(self):
+        return self.tokens[self.pos][3]
+
+    def end(self):
+        kind, value, upper, pos = self.tokens[self.pos - 1]
+        return pos + len(value)
+
+    def spanned(self, node, start: int):
+        # 元の文字列における位置 text[start:end]（別名、ASC/DESC は含まない）
+        node.span = (start, self.end())
+        return node
+
+    def expect_eof(self):
+        if self.tokens[self.pos][0] != "eof":
+            raise self.error("$END")
+
+    def name(self, func: bool = False):
+        kind, value, upper, pos = self.tokens[self.pos]
+        if kind == "name":
+            self.pos += 1
+            return value[1:-1]
+        elif kind == "word":
+            if upper in self.lexicon.reserved and not (
+                func and self.lexicon.reserved_func_names
+            ):
+                raise NotImplementedError(f"Invalid syntax: {value}")
+            self.pos += 1
+            return value
+        else:
+            raise self.error("NAME")
+
+    # statements
+
+    def is_select(self):
+        return self.is_keyword("SELECT") or self.is_keyword("WITH")
+
+    def select(self):
+        start = self.start()
+        with_ = self.with_clause() if self.is_keyword("WITH") else None
+        self.expect_keyword("SELECT")
+        stmt = {"returning": self.items()}
+        if with_ is not None:
+            stmt["with_"] = with_
+
+        if self.keyword("FROM"):
+            stmt["from_"] = self.items()
+            stmt["joins"] = self.joins()
+            if self.keyword("GROUP"):
+                self.expect_keyword("BY")
+                stmt["groupby"] = self.items()
+            for key in ("WHERE", "HAVING", "WINDOW", "LIMIT", "OFFSET"):
+                if self.keyword(key):
+                    stmt[key.lower()] = self.expr()
+
+        if self.keyword("ORDER"):
+            self.expect_keyword("BY")
+            stmt["orderby"] = self.order_items()
+
+        union_start = self.start()
+        union_type = self.keyword("UNION", "INTERSECT", "EXCEPT")
+        if union_type is not None:
+            stmt["unions"] = self.union(union_type, union_start)
+
+        result = self.spanned(SelectStatement(**stmt), start)
+        self.symbol(";")
+        return result
+
+    def with_clause(self):
+        start = self.start()
+        self.expect_keyword("WITH")
+        # RECURSIVE は予約語ではないため、CTE の名前（WITH recursive AS ...）と区別する
+        kind = self.peek(1)[0]
+        recursive = (
+            self.is_keyword("RECURSIVE")
+            and kind in ("word", "name")
+            and not self.is_keyword("AS", 1)
+        )
+        if recursive:
+            self.pos += 1
+
+        ctes = Expressions(self.cte())
+        while self.symbol(","):
+            ctes.append(self.cte())
+        return self.spanned(WithClause(ctes, recursive), start)
+
+    def cte(self):
+        start = self.start()
+        name = self.name()
+        columns = None
+        if self.symbol("("):
+            columns = [self.name()]
+            while self.symbol(","):
+                columns.append(self.name())
+            self.expect_symbol(")")
+        self.expect_keyword("AS")
+        self.expect_symbol("(")
+        select = self.select()
+        self.expect_symbol(")")
+        return self.spanned(CommonTableExpression(name, select, columns), start)
+
+    def union(self, union_type: str, start: int):
+        if self.keyword("ALL", "DISTINCT") == "ALL":
+            union_type += " ALL"
+        bracket = self.symbol("(")
+        select = self.select()
+        if bracket:
+            self.expect_symbol(")")
+        return self.spanned(UnionStatement(union_type, Expressions(select)), start)
+
+    def joins(self):
+        joins = Expressions()
+        while True:
+            start = self.pos
+            start_char = self.start()
+            self.keyword("NATURAL")
+            join_type = self.join_type()
+            if self.keyword("JOIN", "STRAIGHT_JOIN") is None:
+                if self.pos != start:
+                    raise self.error("JOIN", "STRAIGHT_JOIN")
+                return joins
+
+            from_ = self.items()
+            if self.keyword("ON"):
+                on = [self.expr()]
+                while self.symbol(","):
+                    on.append(self.expr())
+                join = JoinStatement(join_type, from_=from_, on=on)
+                joins.append(self.spanned(join, start_char))
+            elif self.keyword("USING"):
+                self.expect_symbol("(")
+                using = [self.using_item()]
+                while self.symbol(","):
+                    using.append(self.using_item())
+                self.expect_symbol(")")
+                join = JoinStatement(join_type, from_=from_, using=using)
+                joins.append(self.spanned(join, start_char))
+            else:
+                raise self.error("ON", "USING")
+
+    def join_type(self):
+        join_type = self.keyword(*JOIN_TYPES)
+        if join_type is None:
+            return None
+        if join_type in ("LEFT", "RIGHT", "FULL") and self.keyword("OUTER"):
+            join_type += " OUTER"
+        return join_type
+
+    def using_item(self):
+        start = self.start()
+        obj = self.spanned(Identifier(name=self.name(), parent=None), start)
+        obj["is_item"] = True
+        return obj
+
+    # items
+
+    def items(self):
+        items = Expressions(self.item())
+        while self.symbol(","):
+            items.append(self.item())
+        return items
+
+    def item(self):
+        start = self.start()
+        obj = self.expr()
+        if not isinstance(obj, dict):
+            obj = self.spanned(Value(obj), start)
+        obj["is_item"] = True
+        obj["alias"] = self.alias()
+        return obj
+
+    def alias(self):
+        kind, value, upper, pos = self.tokens[self.pos]
+        if kind == "word":
+            if upper == "AS":
+                self.pos += 1
+                return self.name()
+            elif upper not in FOLLOW:
+                return self.name()
+        elif kind == "name":
+            return self.name()
+        return None
+
+    def order_items(self):
+        items = Expressions(self.order_item())
+        while self.symbol(","):
+            items.append(self.order_item())
+        return items
+
+    def order_item(self):
+        start = self.start()
+        obj = self.expr()
+        if not isinstance(obj, dict):
+            obj = self.spanned(Value(obj), start)
+        asc_or_desc = self.keyword("ASC", "DESC")
+        obj["is_asc"] = None if asc_or_desc is None else asc_or_desc == "ASC"
+        return obj
+
+    # expressions
+
+    def expr(self):
+        # 各要素の位置を precedence に渡し、組み立てた節点にも span を設定する
+        elements: list = []
+        spans: list = []
+        self.operand(elements, spans)
+        lexicon = self.lexicon
+
+        while True:
+            kind, value, upper, pos = self.tokens[self.pos]
+            if kind == "op":
+                if value in lexicon.infix:
+                    elements.append(Operator("infix", value))
+                elif value == "!":
+                    self.pos += 1
+                    elements.append(Operator("postfix", value))
+                    spans.append((pos, self.end()))
+                    continue
+                else:
+                    break
+            elif kind == "word":
+                if upper in lexicon.infix:
+                    elements.append(Operator("infix", upper))
+                elif upper == "BETWEEN":
+                    elements.append(Operator("between", upper))
+                elif upper == "IN":
+                    self.pos += 1
+                    elements.append(self.in_op(upper))
+                    spans.append((pos, self.end()))
+                    continue
+                elif upper == "NOT" and self.is_keyword("BETWEEN", 1):
+                    self.pos += 1
+                    elements.append(Operator("between", "NOT BETWEEN"))
+                elif upper == "NOT" and self.is_keyword("LIKE", 1):
+                    self.pos += 1
+                    elements.append(Operator("infix", "NOT LIKE"))
+                elif upper == "NOT" and self.is_keyword("IN", 1):
+                    self.pos += 2
+                    elements.append(self.in_op("NOT IN"))
+                    spans.append((pos, self.end()))
+                    continue
+                else:
+                    break
+            else:
+                break
+
+            self.pos += 1
+            spans.append((pos, self.end()))
+            self.operand(elements, spans)
+
+        if len(elements) == 1:
+            return elements[0]
+        return parse_expression(elements, spans)
+
+    def in_op(self, op: str):
+        start = self.start()
+        self.expect_symbol("(")
+        if self.is_select():
+            arg = Bracket(Expressions(self.select()))
+            self.expect_symbol(")")
+            return Operator("in", op, self.spanned(arg, start))
+
+        expr = []
+        if not self.symbol(")"):
+            expr.append(self.expr())
+            while self.symbol(","):
+                expr.append(self.expr())
+            self.expect_symbol(")")
+
+        if len(expr) == 1 and isinstance(expr[0], Bracket):
+            # IN ((SELECT ...))
+            arg = expr[0]
+        else:
+            arg = self.spanned(Bracket(Expressions(*expr)), start)
+        return Operator("in", op, arg)
+
+    def operand(self, elements: list, spans: list):
+        prefix = self.lexicon.prefix
+        while True:
+            kind, value, upper, pos = self.tokens[self.pos]
+            if (kind == "op" or kind == "word") and upper in prefix:
+                self.pos += 1
+                elements.append(Operator("prefix", upper))
+                spans.append((pos, self.end()))
+            else:
+                break
+        start = self.start()
+        elements.append(self.primary())
+        spans.append((start, self.end()))
+
+    def primary(self):
+        kind, value, upper, pos = self.tokens[self.pos]
+
+        if kind == "int":
+            self.pos += 1
+            return int(value)
+        elif kind == "float":
+            self.pos += 1
+            return float(value)
+        elif kind == "string":
+            strings = []
+            while self.tokens[self.pos][0] == "string":
+                strings.append(unquote(self.tokens[self.pos][1]))
+                self.pos += 1
+            return "".join(strings)
+        elif kind == "param":
+            self.pos += 1
+            return self.spanned(Param.from_placeholder(value), pos)
+        elif kind == "op":
+            if value == "(":
+                self.pos += 1
+                if self.is_select():
+                    result = Bracket(Expressions(self.select()))
+                    self.expect_symbol(")")
+                    return self.spanned(result, pos)
+                result = self.expr()
+                self.expect_symbol(")")
+                return result
+            elif value == "*":
+                self.pos += 1
+                return self.spanned(Identifier(name="*", parent=None), pos)
+        elif kind == "word":
+            # 予約語と衝突した場合は値（null, true 等）を優先する
+            if upper in VALUES:
+                self.pos += 1
+                return VALUES[upper]
+            elif upper == "ARRAY" and self.is_symbol("[", 1):
+                raise NotImplementedError(
+                    "ARRAY is not supported by the native parser."
+                )
+            return self.identifier()
+        elif kind == "name":
+            return self.identifier()
+
+        raise self.error("expression")
+
+    def identifier(self):
+        start = self.start()
+        if self.is_symbol(".", 1):
+            parent = self.name()
+            self.pos += 1
+            if self.symbol("*"):
+                return self.spanned(Identifier(name="*", parent=parent), start)
+        else:
+            parent = None
+
+        if self.is_symbol("(", 1):
+            name = self.name(func=True)
+            self.pos += 1
+            args = []
+            if not self.symbol(")"):
+                args.append(self.expr())
+                while self.symbol(","):
+                    args.append(self.expr())
+                self.expect_symbol(")")
+            func = Func(name=name, parent=parent, args=Expressions(*args))
+            return self.spanned(func, start)
+
+        return self.spanned(Identifier(name=self.name(), parent=parent), start)
+
+
+def parse(text: str, start: str = "start", dialect: Optional[Dialect] = None):
+    parser = Parser(text, get_lexicon(dialect))
+    if start in ("start", "stmt"):
+        result = parser.select()
+    elif start == "expr":
+        result = parser.expr()
+    else:
+        raise ValueError(f"Unsupported start for the native parser: {start}")
+    parser.expect_eof()
+    return result
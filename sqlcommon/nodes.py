@@ -1,196 +1,493 @@
-from dataclasses import dataclass, field
-from functools import lru_cache
-from typing import TYPE_CHECKING, Any, List, Optional, TypedDict, Union, no_type_check
+"""Typed views over the ``tokens`` tree.
+
+The classes do not copy the parsed tree. Each view holds a reference to one
+``tokens`` node, reads its fields on access and wraps its children only when
+``nodes`` is first read, so wrapping a statement costs one small object.
+
+    select = wrap(get_parser()("select a from t where b = 1"))
+    select.get_tables()  # [Table('t')]
+"""
+
+from typing import Any, Iterator, List, Optional, Tuple
+
+from .tokens import AstBase, Expressions, Identifier, SelectStatement, to_sql
 
 
 class Node:
-    tag: str
+    __slots__ = ("node",)
+    tag: str = "NODE"
+
+    def __init__(self, node):
+        self.node = node
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.tag = cls.__name__.upper()
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs, tag=self._tag())
+    def __eq__(self, other):
+        return type(self) is type(other) and (
+            self.node is other.node or self.node == other.node
+        )
 
-    @classmethod
-    @lru_cache(maxsize=20)
-    def _tag(cls):
-        return cls.__name__.upper()
+    __hash__ = None
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_sql()!r})"
+
+    def to_sql(self) -> str:
+        return to_sql(self.node)
 
 
 class Terminal(Node):
-    ...
+    __slots__ = ()
 
 
-@dataclass
 class Table(Terminal):
-    name: str
-    schema: Optional[str]
-    alias: Optional[str]
+    __slots__ = ()
+
+    @property
+    def name(self) -> str:
+        return self.node["name"]
+
+    @property
+    def schema(self) -> Optional[str]:
+        return self.node["parent"]
+
+    @property
+    def alias(self) -> Optional[str]:
+        return self.node.get("alias", None)
 
 
-@dataclass
 class Column(Terminal):
-    name: str
-    table: Optional[str]
-    table_alias: Optional[str]
-    alias: Optional[str]
+    __slots__ = ()
 
+    @property
+    def name(self) -> str:
+        return self.node["name"]
 
-@dataclass
-class Star(Column):
-    name: str = field(default="*", init=False)
-    table: Optional[str]
-    table_alias: None
-    alias: None
+    @property
+    def table(self) -> Optional[str]:
+        # 修飾子は表名または別名（解決しない）
+        return self.node["parent"]
+
+    @property
+    def alias(self) -> Optional[str]:
+        return self.node.get("alias", None)
 
 
-@dataclass
-class Func(Terminal):
-    name: str
-    schema: Optional[str]
-    alias: Optional[str]
-    nodes: List[Node]
-    anonymous: bool
+class Star(Column):
+    __slots__ = ()
 
 
-@dataclass
 class Value(Terminal):
-    value: Any
+    __slots__ = ()
+
+    @property
+    def value(self) -> Any:
+        # 木の中の生の値（int, str, None 等）も Value として扱う
+        if isinstance(self.node, AstBase):
+            return self.node["value"]
+        return self.node
 
 
-@dataclass
 class Param(Terminal):
-    name: str
+    __slots__ = ()
+
+    @property
+    def name(self) -> Optional[str]:
+        return self.node["name"]
+
+    @property
+    def style(self) -> str:
+        return self.node["style"]
 
 
 class Expr(Node):
-    name: str
-    nodes: List[Node]
+    __slots__ = ("_nodes",)
+
+    def __init__(self, node):
+        self.node = node
+        self._nodes = None
+
+    @property
+    def nodes(self) -> List[Node]:
+        # 子の view は初回参照時に作る
+        if self._nodes is None:
+            self._nodes = list(self._children())
+        return self._nodes
+
+    def _children(self) -> Iterator[Node]:
+        for x in self.node["expr"]:
+            yield wrap(x)
+
+
+class Func(Expr):
+    __slots__ = ()
+
+    @property
+    def name(self) -> str:
+        return self.node["name"]
+
+    @property
+    def schema(self) -> Optional[str]:
+        return self.node["parent"]
+
+    @property
+    def alias(self) -> Optional[str]:
+        return self.node.get("alias", None)
+
+
+class Uo(Expr):
+    """Prefix or postfix operator."""
+
+    __slots__ = ()
+
+    @property
+    def op(self) -> str:
+        return self.node["op"]
+
+
+class Op(Expr):
+    """Binary operator or ``BETWEEN``."""
+
+    __slots__ = ()
+
+    @property
+    def op(self) -> str:
+        return self.node["op"]
+
+
+class Bracket(Expr):
+    __slots__ = ()
+
+
+class _Defined(str):
+    pass
+
+
+def _iter_identifiers(*roots: Tuple[Any, bool]) -> Iterator[Tuple[dict, bool]]:
+    # (identifier, FROM 句の表か) を返す。木を複製せずに走査する
+    stack = list(reversed(roots))
+    # WITH で定義した名前は表ではない（WITH は参照より先に現れる）
+    ctes = set()
+    while stack:
+        obj, is_table = stack.pop()
+        if isinstance(obj, AstBase):
+            type = obj["type"]
+            if type == "identifier":
+                if is_table and obj["parent"] is None and obj["name"] in ctes:
+                    continue
+                yield obj, is_table
+            elif type == "with":
+                if obj["recursive"]:
+                    ctes.update(x["name"] for x in obj["ctes"])
+                stack.extend((x, False) for x in reversed(obj["ctes"]))
+            elif type == "cte":
+                # 名前は本体を走査した後に定義する
+                stack.append((_Defined(obj["name"]), False))
+                stack.append((obj["select"], False))
+            elif type == "SELECT":
+                # SQL に現れる順に返す
+                for key in reversed(SELECT_KEYS):
+                    value = obj.get(key, None)
+                    if value is not None:
+                        stack.append((value, key == "from_"))
+            elif type == "join":
+                for key in ("using", "on", "from_"):
+                    if key in obj:
+                        stack.append((obj[key], key == "from_"))
+            else:
+                # 派生表の中身は表ではない
+                for value in obj.values():
+                    stack.append((value, False))
+        elif isinstance(obj, list):
+            stack.extend((x, is_table) for x in reversed(obj))
+        elif isinstance(obj, _Defined):
+            ctes.add(str(obj))
+
+
+def _tables(*roots: Tuple[Any, bool]) -> List[Table]:
+    return [Table(x) for x, is_table in _iter_identifiers(*roots) if is_table]
+
+
+def _columns(*roots: Tuple[Any, bool]) -> List[Column]:
+    return [
+        Star(x) if x["name"] == "*" else Column(x)
+        for x, is_table in _iter_identifiers(*roots)
+        if not is_table
+    ]
+
+
+def _star():
+    return Expressions(Identifier("*"))
 
 
-@dataclass
 class Select(Expr):
-    expr: str = field(default="SELECT", init=False)
-    nodes: List[Union["Returning", "Query", "Union_", "UnionAll", "Except"]]
+    __slots__ = ()
 
-    def get_tables(self):
-        return []
+    def _children(self):
+        stmt = self.node
+        if stmt.get("with_", None):
+            yield With(stmt["with_"])
+        yield Returning(stmt["returning"])
+        if any(key in stmt for key in QUERY_CLAUSES):
+            yield Query(stmt)
+        if stmt.get("unions", None):
+            yield wrap(stmt["unions"])
 
-    def get_columns(self):
-        return []
+    def get_tables(self) -> List[Table]:
+        return _tables((self.node, False))
 
+    def get_columns(self) -> List[Column]:
+        return _columns((self.node, False))
 
-@dataclass
-class Returning(Expr):
-    expr: str = field(default="RETURNING", init=False)
-    nodes: List[Union["Expr", Terminal]]
+    def to_select(self) -> "Select":
+        return self
 
-    def to_select(self):
-        return Select(nodes=[self])
 
-    def get_columns(self):
-        return []
+class Clause(Expr):
+    """A clause of a statement; ``node`` is the clause's list of expressions."""
+
+    __slots__ = ()
+
+    def _children(self):
+        node = self.node
+        if isinstance(node, list):
+            for x in node:
+                yield wrap(x)
+        else:
+            yield wrap(node)
+
+    def get_columns(self) -> List[Column]:
+        return _columns((self.node, False))
+
+
+class With(Expr):
+    """``WITH``; ``node`` is the ``with`` node."""
+
+    __slots__ = ()
+
+    @property
+    def recursive(self) -> bool:
+        return self.node["recursive"]
+
+    def _children(self):
+        for x in self.node["ctes"]:
+            yield Cte(x)
+
+    def get_tables(self) -> List[Table]:
+        return _tables((self.node, False))
+
+
+class Cte(Expr):
+    """A common table expression; its only child is its query."""
+
+    __slots__ = ()
+
+    @property
+    def name(self) -> str:
+        return self.node["name"]
+
+    @property
+    def columns(self) -> Optional[List[str]]:
+        return self.node["columns"]
+
+    def _children(self):
+        yield Select(self.node["select"])
+
+    def get_tables(self) -> List[Table]:
+        return _tables((self.node["select"], False))
+
+    def to_select(self) -> Select:
+        return Select(self.node["select"])
+
+
+class Returning(Clause):
+    __slots__ = ()
+
+    def to_select(self) -> Select:
+        return Select(SelectStatement(returning=self.node))
 
 
-@dataclass
 class Query(Expr):
-    expr: str = field(default="QUERY", init=False)
-    nodes: List[Union["From", "Where", "Join", "OrderBy", "Limit", "Offset"]]
+    """The clauses after ``SELECT ...``; ``node`` is the statement."""
 
-    def get_tables(self):
-        return []
+    __slots__ = ()
 
-    def to_select(self):
-        star = Star()
-        return Select(nodes=[self, Returning(nodes=[star])])
+    def _children(self):
+        stmt = self.node
+        for key, cls in QUERY_CLAUSES.items():
+            value = stmt.get(key, None)
+            if key == "joins":
+                for join in value or ():
+                    yield Join(join)
+            elif value is not None and (value or key in ("limit", "offset")):
+                yield cls(value)
 
+    def get_tables(self) -> List[Table]:
+        stmt = self.node
+        return _tables(
+            (stmt.get("from_", None), True), (stmt.get("joins", None), False)
+        )
 
-@dataclass
-class From(Expr):
-    expr: str = field(default="FROM", init=False)
-    nodes: List[Union["Expr", Terminal]]
+    def to_select(self) -> Select:
+        clauses = {k: self.node[k] for k in QUERY_CLAUSES if k in self.node}
+        return Select(SelectStatement(returning=_star(), **clauses))
 
-    def to_select(self):
-        query = Query(nodes=[self])
-        return query.to_select()
+    def to_sql(self) -> str:
+        # 句だけでは SQL にならないため SELECT * を補う
+        return self.to_select().to_sql()
 
-    def get_tables(self):
-        return []
+
+class From(Clause):
+    __slots__ = ()
+
+    def _children(self):
+        for x in self.node:
+            if isinstance(x, Identifier) and x["type"] == "identifier":
+                yield Table(x)
+            else:
+                yield wrap(x)
+
+    def get_tables(self) -> List[Table]:
+        return [x for x in self.nodes if isinstance(x, Table)]
+
+    def to_select(self) -> Select:
+        return Select(SelectStatement(returning=_star(), from_=self.node))
 
 
-@dataclass
 class Join(Expr):
-    expr: str = field(default="JOIN", init=False)
-    nodes: List[Union["Expr", Terminal]]
+    __slots__ = ()
+
+    @property
+    def join_type(self) -> str:
+        return self.node["join_type"]
+
+    def _children(self):
+        join = self.node
+        yield From(join["from_"])
+        if "on" in join:
+            yield Where(join["on"])
+        if "using" in join:
+            for x in join["using"]:
+                yield wrap(x)
+
+    def get_tables(self) -> List[Table]:
+        return self.nodes[0].get_tables()
+
+
+class Where(Clause):
+    __slots__ = ()
+
 
-    def get_tables(self):
-        return []
+class GroupBy(Clause):
+    __slots__ = ()
 
 
-@dataclass
-class Where(Expr):
-    expr: str = field(default="WHERE", init=False)
-    nodes: List[Union["Expr", Terminal]]
+class Having(Clause):
+    __slots__ = ()
 
 
-@dataclass
-class OrderBy(Expr):
-    expr: str = field(default="ORDERBY", init=False)
-    nodes: List[Union["Expr", Terminal]]
+class OrderBy(Clause):
+    __slots__ = ()
 
 
-@dataclass
-class Limit(Expr):
-    expr: str = field(default="LIMIT", init=False)
-    nodes: List[Union["Expr", Terminal]]
+class Window(Clause):
+    __slots__ = ()
 
 
-@dataclass
-class Offset(Expr):
-    expr: str = field(default="OFFSET", init=False)
-    nodes: List[Union["Expr", Terminal]]
+class Limit(Clause):
+    __slots__ = ()
 
 
-@dataclass
-class Union_(Expr):
-    expr: str = field(default="UNION", init=False)
-    nodes: List["Select"]
+class Offset(Clause):
+    __slots__ = ()
 
 
-@dataclass
-class UnionAll(Expr):
-    expr: str = field(default="UNIONALL", init=False)
-    nodes: List["Select"]
+class SetOperation(Expr):
+    """``UNION`` and the like; ``node`` is the ``union`` node."""
 
+    __slots__ = ()
 
-@dataclass
-class Except(Expr):
-    expr: str = field(default="EXCEPT", init=False)
-    nodes: List["Select"]
+    @property
+    def op(self) -> str:
+        return self.node["union_type"]
 
+    def _children(self):
+        for x in self.node["select"]:
+            yield wrap(x)
 
-@dataclass
-class Uo(Node):
-    name: str
-    op: str
-    nodes: List[Node]
+    def get_tables(self) -> List[Table]:
+        return _tables((self.node, False))
 
-    def __str__(self):
-        if not len(self.nodes) == 1:
-            raise ValueError()
 
-        return f"{self.op} {str(self.nodes[0])}"
+class Union_(SetOperation):
+    __slots__ = ()
 
 
-@dataclass
-class Op(Node):
-    name: str
-    op: str
-    nodes: List[Node]
+class UnionAll(SetOperation):
+    __slots__ = ()
 
-    def __str__(self):
-        if len(self.nodes) > 1:
-            raise ValueError()
 
-        if len(self.nodes) > 2:
-            return "(" + f" {self.op} ".join((str(x) for x in self.nodes)) + ")"
+class Intersect(SetOperation):
+    __slots__ = ()
+
+
+class Except(SetOperation):
+    __slots__ = ()
+
+
+# statement の key -> 句の view（SelectStatement.tokens と同じ順序）
+QUERY_CLAUSES = {
+    "from_": From,
+    "joins": Join,
+    "groupby": GroupBy,
+    "having": Having,
+    "where": Where,
+    "orderby": OrderBy,
+    "window": Window,
+    "limit": Limit,
+    "offset": Offset,
+}
+
+SELECT_KEYS = ("with_", "returning", *QUERY_CLAUSES, "unions")
+
+VIEWS = {
+    "SELECT": Select,
+    "join": Join,
+    "func": Func,
+    "value": Value,
+    "param": Param,
+    "bo": Op,
+    "between": Op,
+    "prefix": Uo,
+    "postfix": Uo,
+    "bracket": Bracket,
+    "with": With,
+    "cte": Cte,
+}
+
+
+def wrap(obj) -> Node:
+    """View of a ``tokens`` node (raw literals become ``Value``)."""
+    if not isinstance(obj, AstBase):
+        return Value(obj)
+
+    type = obj["type"]
+    if type == "identifier":
+        return Star(obj) if obj["name"] == "*" else Column(obj)
+    elif type == "union":
+        union_type = obj["union_type"]
+        if union_type == "UNION ALL":
+            return UnionAll(obj)
+        elif union_type.startswith("UNION"):
+            return Union_(obj)
+        elif union_type.startswith("INTERSECT"):
+            return Intersect(obj)
         else:
-            return f"{self.op} ".join((str(x) for x in self.nodes))
+            return Except(obj)
+
+    try:
+        return VIEWS[type](obj)
+    except KeyError:
+        raise ValueError(f"Unknown node type: {type}") from None
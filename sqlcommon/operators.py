@@ -1,13 +1,100 @@
+# 優先順位（大きいほど強く結合する）
+# https://www.postgresql.org/docs/current/sql-syntax-lexical.html#SQL-PRECEDENCE
 UO = [
-    {"name": "NOT", "op": "NOT"},
+    {"name": "NOT", "op": "NOT", "precedence": 3},
+    {"name": "+", "op": "+", "precedence": 11},
+    {"name": "-", "op": "-", "precedence": 11},
+    {"name": "|/", "op": "|/", "precedence": 11},
+    {"name": "||/", "op": "||/", "precedence": 11},
+    {"name": "!!", "op": "!!", "precedence": 11},
+    {"name": "@", "op": "@", "precedence": 11},
+    {"name": "~", "op": "~", "precedence": 11},
+    {"name": "!", "op": "!", "precedence": 12, "postfix": True},
 ]
 
 
 OP = [
-    {"name": "AND", "op": "AND"},
-    {"name": "OR", "op": "OR"},
+    {"name": "OR", "op": "OR", "precedence": 1},
+    {"name": "AND", "op": "AND", "precedence": 2},
+    {"name": "IS", "op": "IS", "precedence": 4},
+    {"name": "IS NOT", "op": "IS NOT", "precedence": 4},
+    {"name": "=", "op": "=", "precedence": 5},
+    {"name": "!=", "op": "!=", "precedence": 5},
+    {"name": "<>", "op": "<>", "precedence": 5},
+    {"name": ">", "op": ">", "precedence": 5},
+    {"name": "<", "op": "<", "precedence": 5},
+    {"name": ">=", "op": ">=", "precedence": 5},
+    {"name": "<=", "op": "<=", "precedence": 5},
+    {"name": "BETWEEN", "op": "BETWEEN", "precedence": 6},
+    {"name": "NOT BETWEEN", "op": "NOT BETWEEN", "precedence": 6},
+    {"name": "IN", "op": "IN", "precedence": 6},
+    {"name": "NOT IN", "op": "NOT IN", "precedence": 6},
+    {"name": "LIKE", "op": "LIKE", "precedence": 6},
+    {"name": "NOT LIKE", "op": "NOT LIKE", "precedence": 6},
+    {"name": "ILIKE", "op": "ILIKE", "precedence": 6},
+    # その他の演算子（||, ~, & 等）は 7
+    {"name": "+", "op": "+", "precedence": 8},
+    {"name": "-", "op": "-", "precedence": 8},
+    {"name": "*", "op": "*", "precedence": 9},
+    {"name": "/", "op": "/", "precedence": 9},
+    {"name": "%", "op": "%", "precedence": 9},
+    {"name": "^", "op": "^", "precedence": 10},
+]
+
+OTHER_PRECEDENCE = 7
+PREFIX_PRECEDENCE = {x["op"]: x["precedence"] for x in UO if not x.get("postfix")}
+POSTFIX_PRECEDENCE = {x["op"]: x["precedence"] for x in UO if x.get("postfix")}
+INFIX_PRECEDENCE = {x["op"]: x["precedence"] for x in OP}
+
+
+# grammar terminals per dialect
+# "dialects" が無い演算子は全ての方言で使用できる
+BOPS = [
+    {"name": "=", "op": "="},
+    {"name": "!=", "op": "!="},
+    {"name": "<>", "op": "<>"},
+    {"name": ">", "op": ">"},
+    {"name": "<", "op": "<"},
+    {"name": ">=", "op": ">="},
+    {"name": "<=", "op": "<="},
     {"name": "+", "op": "+"},
     {"name": "-", "op": "-"},
     {"name": "*", "op": "*"},
     {"name": "/", "op": "/"},
+    {"name": "%", "op": "%"},
+    {"name": "||", "op": "||"},
+    {"name": "LIKE", "op": "LIKE"},
+    {"name": "AND", "op": "AND"},
+    {"name": "OR", "op": "OR"},
+    {"name": "IS", "op": "IS"},
+    {"name": "^", "op": "^", "dialects": ["postgresql"]},
+    {"name": "&", "op": "&", "dialects": ["postgresql"]},
+    {"name": "|", "op": "|", "dialects": ["postgresql"]},
+    {"name": "#", "op": "#", "dialects": ["postgresql"]},
+    {"name": "<<", "op": "<<", "dialects": ["postgresql"]},
+    {"name": ">>", "op": ">>", "dialects": ["postgresql"]},
+    {"name": "!!=", "op": "!!=", "dialects": ["postgresql"]},
+    {"name": "~~", "op": "~~", "dialects": ["postgresql"]},
+    {"name": "!~~", "op": "!~~", "dialects": ["postgresql"]},
+    {"name": "~", "op": "~", "dialects": ["postgresql"]},
+    {"name": "~*", "op": "~*", "dialects": ["postgresql"]},
+    {"name": "!~", "op": "!~", "dialects": ["postgresql"]},
+    {"name": "!~*", "op": "!~*", "dialects": ["postgresql"]},
+    {"name": "ILIKE", "op": "ILIKE", "dialects": ["postgresql"]},
 ]
+
+
+SIGN = [
+    {"name": "NOT", "op": "NOT"},
+    {"name": "+", "op": "+"},
+    {"name": "-", "op": "-"},
+    {"name": "|/", "op": "|/", "dialects": ["postgresql"]},
+    {"name": "||/", "op": "||/", "dialects": ["postgresql"]},
+    {"name": "!!", "op": "!!", "dialects": ["postgresql"]},
+    {"name": "@", "op": "@", "dialects": ["postgresql"]},
+    {"name": "~", "op": "~", "dialects": ["postgresql"]},
+]
+
+
+def get_operators(operators: list, dialect: str):
+    return [x for x in operators if dialect in x.get("dialects", [dialect])]
@@ -0,0 +1,67 @@
+import threading
+from typing import Optional
+
+from .dialects import Dialect, validate_dialect
+from .limits import Limits
+from .transformer import SqlTransformer, get_parser
+
+
+class ParserPool:
+    """Thread-safe parsing facade.
+
+    ``get_parser`` returns a function that shares one Lark instance and one
+    transformer between its callers. The pool instead gives every thread its
+    own parser, Lark instance and transformer, created on the thread's first
+    call, so threads never share parser state. Building an Earley parser
+    takes about 100 ms, so reuse the pool rather than creating it per request.
+
+        pool = ParserPool(dialect="postgresql")
+        stmt = pool.parse("select 1")  # from any thread
+    """
+
+    def __init__(
+        self,
+        start: str = "start",
+        cls_transformer=SqlTransformer,
+        parser_type: str = "earley",
+        dialect: Optional[Dialect] = None,
+        limits: Optional[Limits] = None,
+    ):
+        validate_dialect(dialect)
+        self.start = start
+        self.cls_transformer = cls_transformer
+        self.parser_type = parser_type
+        self.dialect = dialect
+        self.limits = limits
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._created = 0
+
+    @property
+    def size(self) -> int:
+        """Number of parsers created so far (one per thread that parsed)."""
+        return self._created
+
+    def get(self):
+        """Parse function owned by the current thread."""
+        try:
+            return self._local.parse
+        except AttributeError:
+            pass
+
+        parse = self._local.parse = get_parser(
+            self.start,
+            self.cls_transformer,
+            parser_type=self.parser_type,
+            dialect=self.dialect,
+            limits=self.limits,
+            shared=False,
+        )
+        with self._lock:
+            self._created += 1
+        return parse
+
+    def parse(self, text: str):
+        return self.get()(text)
+
+    __call__ = parse
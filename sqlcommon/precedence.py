@@ -0,0 +1,144 @@
+from typing import Any, NamedTuple, Optional
+
+from .operators import (
+    INFIX_PRECEDENCE,
+    OTHER_PRECEDENCE,
+    POSTFIX_PRECEDENCE,
+    PREFIX_PRECEDENCE,
+)
+from .tokens import Between, BinaryOperator, Expressions, Postfix, Prefix
+
+
+class ExpressionError(ValueError):
+    """Invalid chain of operators, such as BETWEEN without AND.
+
+    Every parser backend raises it as is. ``pos`` is the offset of the
+    offending element in the source when the backend records spans.
+    """
+
+    def __init__(self, message: str, pos: Optional[int] = None):
+        super().__init__(message)
+        self.pos = pos
+
+
+class Operator(NamedTuple):
+    kind: str  # prefix, infix, postfix, between, in
+    op: str
+    arg: Any = None
+
+    @property
+    def precedence(self):
+        if self.kind == "prefix":
+            return PREFIX_PRECEDENCE.get(self.op, OTHER_PRECEDENCE)
+        elif self.kind == "postfix":
+            return POSTFIX_PRECEDENCE.get(self.op, OTHER_PRECEDENCE)
+        else:
+            return INFIX_PRECEDENCE.get(self.op, OTHER_PRECEDENCE)
+
+
+def normalize_op(op: str):
+    # キーワード演算子は大文字に揃える（and -> AND, not  like -> NOT LIKE）
+    if op[0].isalpha():
+        return " ".join(op.upper().split())
+    else:
+        return str(op)
+
+
+END = Operator("end", "", None)
+
+
+class ExpressionParser:
+    """Precedence climbing over a flat list of operands and ``Operator``.
+
+    All operators are left associative, as in PostgreSQL. Each element is
+    visited once, so parsing is linear in the length of the expression.
+    If ``spans`` holds the source ``(start, end)`` of each element, every
+    built node gets a ``span`` covering the elements it was built from.
+    """
+
+    def __init__(self, elements: list, spans: Optional[list] = None):
+        self.elements = elements
+        self.spans = spans
+        self.pos = 0
+
+    def error(self, message: str, index: int) -> ExpressionError:
+        spans = self.spans
+        if not spans:
+            return ExpressionError(message)
+        elif index < len(spans):
+            return ExpressionError(message, spans[index][0])
+        # 式の終端
+        return ExpressionError(message, spans[-1][1])
+
+    def set_span(self, node, start: int):
+        if self.spans is not None:
+            node.span = (self.spans[start][0], self.spans[self.pos - 1][1])
+        return node
+
+    def parse(self):
+        result = self.parse_expr(0)
+        if self.pos != len(self.elements):
+            raise self.error(
+                f"Unexpected operator: {self.elements[self.pos]}", self.pos
+            )
+        return result
+
+    def next(self):
+        # 被演算子の NULL（None）と区別するため、終端では END を返す
+        if self.pos < len(self.elements):
+            return self.elements[self.pos]
+        else:
+            return END
+
+    def parse_operand(self):
+        x = self.next()
+        if x is END:
+            raise self.error("Missing operand.", self.pos)
+        start = self.pos
+        self.pos += 1
+        if isinstance(x, Operator):
+            if x.kind != "prefix":
+                raise self.error(f"Unexpected operator: {x}", start)
+            node = Prefix(op=x.op, expr=Expressions(self.parse_expr(x.precedence)))
+            return self.set_span(node, start)
+        else:
+            return x
+
+    def parse_expr(self, min_precedence: int):
+        start = self.pos
+        left = self.parse_operand()
+
+        while True:
+            x = self.next()
+            if x is END or x.precedence < min_precedence:
+                return left
+
+            self.pos += 1
+            if x.kind == "postfix":
+                left = Postfix(op=x.op, expr=Expressions(left))
+                self.set_span(left, start)
+            elif x.kind == "in":
+                left = BinaryOperator(op=x.op, expr=Expressions(left, x.arg))
+                self.set_span(left, start)
+            elif x.kind == "between":
+                lower = self.parse_expr(x.precedence + 1)
+                and_ = self.next()
+                if and_ is END or and_.op != "AND":
+                    raise self.error(f"{x.op} requires AND.", self.pos)
+                self.pos += 1
+                upper = self.parse_expr(x.precedence + 1)
+                left = Between(op=x.op, expr=Expressions(left, lower, upper))
+                self.set_span(left, start)
+            else:
+                op = x.op
+                y = self.next()
+                if op == "IS" and isinstance(y, Operator) and y.op == "NOT":
+                    op = "IS NOT"
+                    self.pos += 1
+                right = self.parse_expr(x.precedence + 1)
+                left = BinaryOperator(op=op, expr=Expressions(left, right))
+                self.set_span(left, start)
+
+
+def parse_expression(elements: list, spans: Optional[list] = None):
+    return ExpressionParser(elements, spans).parse()
@@ -0,0 +1,190 @@
+"""Aggregate table, column and query shape usage over a query log.
+
+    python -m sqlcommon.querylog queries.log -o report.json --workers 4
+
+The log holds one statement per line. Statements are parsed by a pool of
+worker processes that each keep a warm parser, and counts are aggregated
+with fixed-memory sketches, so memory does not grow with the log.
+"""
+import argparse
+import json
+import multiprocessing
+import sys
+import time
+from collections import deque
+from typing import IO, Iterable, Iterator, List, Optional, Tuple
+
+from .limits import Limits
+from .references import get_references, get_shape
+from .sketches import HeavyHitters, HyperLogLog
+
+# (tables, columns, shape) or (None, None, error type)
+Result = Tuple[Optional[Tuple[str, ...]], Optional[Tuple[str, ...]], str]
+
+_parse = None
+
+
+def _init_worker(parser_type: str, dialect: Optional[str]):
+    global _parse
+    from . import get_parser
+
+    _parse = get_parser(parser_type=parser_type, dialect=dialect, limits=Limits())
+
+
+def analyze(sql: str) -> Result:
+    try:
+        stmt = _parse(sql)
+        references = get_references(stmt)
+        shape = get_shape(stmt)
+    except Exception as e:
+        return None, None, type(e).__name__
+    return tuple(sorted(references.tables)), tuple(sorted(references.columns)), shape
+
+
+def analyze_batch(lines: List[str]) -> List[Result]:
+    return [analyze(x) for x in lines]
+
+
+def iter_statements(fp: IO[str]) -> Iterator[str]:
+    for line in fp:
+        line = line.strip()
+        if line and not line.startswith("--"):
+            yield line
+
+
+def batches(statements: Iterable[str], size: int) -> Iterator[List[str]]:
+    batch = []
+    for x in statements:
+        batch.append(x)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def run(
+    statements: Iterable[str],
+    workers: int = 0,
+    batch_size: int = 500,
+    parser_type: str = "native",
+    dialect: Optional[str] = None,
+) -> Iterator[Result]:
+    if workers <= 0:
+        _init_worker(parser_type, dialect)
+        for batch in batches(statements, batch_size):
+            yield from analyze_batch(batch)
+        return
+
+    # imap は入力を先読みし尽くすため、未完了のバッチ数を制限して読み込む
+    with multiprocessing.Pool(
+        workers, initializer=_init_worker, initargs=(parser_type, dialect)
+    ) as pool:
+        pending = deque()
+        for batch in batches(statements, batch_size):
+            pending.append(pool.apply_async(analyze_batch, (batch,)))
+            if len(pending) >= workers * 2:
+                yield from pending.popleft().get()
+        while pending:
+            yield from pending.popleft().get()
+
+
+class Report:
+    def __init__(self, k: int = 1000, p: int = 14):
+        self.statements = 0
+        self.errors = HeavyHitters(k)
+        self.tables = HeavyHitters(k)
+        self.columns = HeavyHitters(k)
+        self.shapes = HeavyHitters(k)
+        self.table_shapes = HeavyHitters(k)
+        self.distinct_tables = HyperLogLog(p)
+        self.distinct_columns = HyperLogLog(p)
+        self.distinct_shapes = HyperLogLog(p)
+
+    def add(self, result: Result):
+        tables, columns, shape = result
+        self.statements += 1
+        if tables is None:
+            self.errors.add(shape)
+            return
+
+        self.shapes.add(shape)
+        self.distinct_shapes.add(shape)
+        for table in tables:
+            self.tables.add(table)
+            self.distinct_tables.add(table)
+            self.table_shapes.add((table, shape))
+        for column in columns:
+            self.columns.add(column)
+            self.distinct_columns.add(column)
+
+    def to_dict(self, top: int = 100):
+        def heavy_hitters(sketch: HeavyHitters, *names: str):
+            items = []
+            for key, count in sketch.top(top):
+                keys = key if isinstance(key, tuple) else (key,)
+                items.append({**dict(zip(names, keys)), "count": count})
+            return {"max_error": sketch.error, "items": items}
+
+        return {
+            "statements": self.statements,
+            "errors": self.errors.n,
+            "distinct": {
+                "tables": self.distinct_tables.count(),
+                "columns": self.distinct_columns.count(),
+                "shapes": self.distinct_shapes.count(),
+            },
+            "error_types": heavy_hitters(self.errors, "type"),
+            "tables": heavy_hitters(self.tables, "table"),
+            "columns": heavy_hitters(self.columns, "column"),
+            "shapes": heavy_hitters(self.shapes, "shape"),
+            "table_shapes": heavy_hitters(self.table_shapes, "table", "shape"),
+        }
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(
+        prog="python -m sqlcommon.querylog", description=__doc__.splitlines()[0]
+    )
+    parser.add_argument("log", help="query log, one statement per line (- for stdin)")
+    parser.add_argument("-o", "--output", help="report path (default: stdout)")
+    parser.add_argument(
+        "-w", "--workers", type=int, default=multiprocessing.cpu_count()
+    )
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--parser", default="native", choices=["native", "earley"])
+    parser.add_argument("--dialect", default=None)
+    parser.add_argument("-k", type=int, default=1000, help="heavy hitter counters")
+    parser.add_argument("--top", type=int, default=100)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    report = Report(k=args.k)
+
+    fp = sys.stdin if args.log == "-" else open(args.log, encoding="utf-8")
+    try:
+        for result in run(
+            iter_statements(fp),
+            workers=args.workers,
+            batch_size=args.batch_size,
+            parser_type=args.parser,
+            dialect=args.dialect,
+        ):
+            report.add(result)
+    finally:
+        if fp is not sys.stdin:
+            fp.close()
+
+    result = report.to_dict(args.top)
+    result["seconds"] = round(time.perf_counter() - start, 3)
+
+    if args.output is None:
+        json.dump(result, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    else:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
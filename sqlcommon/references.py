@@ -0,0 +1,228 @@
+from typing import AbstractSet, Dict, NamedTuple, Optional, Set
+
+from .tokens import (
+    NON_EXPR_KEYS,
+    AstBase,
+    Bracket,
+    Expressions,
+    Identifier,
+    Param,
+    Value,
+    to_sql,
+)
+
+
+class References(NamedTuple):
+    tables: AbstractSet[str]
+    columns: AbstractSet[str]
+
+
+def _table_name(obj: dict):
+    if obj["parent"] is None:
+        return obj["name"]
+    return obj["parent"] + "." + obj["name"]
+
+
+class Scope:
+    """Names visible in a SELECT: its sources, then those of enclosing ones."""
+
+    def __init__(self, parent: Optional["Scope"] = None):
+        self.parent = parent
+        # alias or table name -> table name（派生表、CTE は None）
+        self.tables: Dict[str, Optional[str]] = {}
+        # WITH で定義した名前
+        self.ctes: Set[str] = set()
+
+    def add(self, key: str, table: Optional[str]):
+        self.tables[key] = table
+
+    def is_cte(self, name: str) -> bool:
+        scope: Optional[Scope] = self
+        while scope is not None:
+            if name in scope.ctes:
+                return True
+            scope = scope.parent
+        return False
+
+    def isolated(self) -> "Scope":
+        # 派生表と CTE の本体は、外側の表を参照できないが CTE は参照できる
+        scope = Scope()
+        parent: Optional[Scope] = self
+        while parent is not None:
+            scope.ctes.update(parent.ctes)
+            parent = parent.parent
+        return scope
+
+    def resolve(self, qualifier: Optional[str]) -> str:
+        scope: Optional[Scope] = self
+        if qualifier is None:
+            # 修飾されていない列は、唯一の表に属する場合のみ解決する
+            tables = [x for x in self.tables.values() if x is not None]
+            if len(self.tables) == 1 and len(tables) == 1:
+                return tables[0]
+            return "?"
+
+        while scope is not None:
+            if qualifier in scope.tables:
+                return scope.tables[qualifier] or "?"
+            scope = scope.parent
+        return qualifier
+
+
+class ReferenceCollector:
+    """Collect the tables and columns referenced by a statement.
+
+    Call ``expr(stmt, None)``. Subclasses may override ``select``, ``with_``,
+    ``column`` and ``expr`` to observe the walk; each receives the ``Scope``
+    of the names visible where the node occurs.
+    """
+
+    def __init__(self):
+        self.tables: Set[str] = set()
+        self.columns: Set[str] = set()
+
+    def select(self, stmt: dict, parent: Optional[Scope]):
+        with_ = stmt.get("with_", None)
+        if with_:
+            # CTE の名前は UNION の後続の SELECT からも参照できる
+            parent = self.with_(with_, parent)
+        scope = Scope(parent)
+
+        sources = list(stmt.get("from_", None) or [])
+        for join in stmt.get("joins", None) or []:
+            sources.extend(join["from_"])
+
+        for source in sources:
+            if isinstance(source, Identifier) and source["type"] == "identifier":
+                alias = source.get("alias", None)
+                if source["parent"] is None and scope.is_cte(source["name"]):
+                    scope.add(alias or source["name"], None)
+                    continue
+                table = _table_name(source)
+                self.tables.add(table)
+                scope.add(alias or source["name"], table)
+                if alias is not None and source["name"] not in scope.tables:
+                    # 別名の付いた表の名前は、同じ名前の別名より優先しない
+                    scope.add(source["name"], table)
+            else:
+                # 派生表（サブクエリ）は外側の表を参照できない
+                self.expr(source, scope.isolated())
+                alias = source.get("alias", None) if isinstance(source, dict) else None
+                if alias is not None:
+                    scope.add(alias, None)
+
+        for key, value in stmt.items():
+            if key == "from_" or key == "with_" or key in NON_EXPR_KEYS:
+                continue
+            elif key == "joins":
+                for join in value:
+                    self.expr(join.get("on", None), scope)
+                    for column in join.get("using", None) or []:
+                        self.column(column, scope)
+            elif key == "unions":
+                for select in value["select"]:
+                    self.select(select, parent)
+            else:
+                self.expr(value, scope)
+
+    def with_(self, with_: dict, parent: Optional[Scope]) -> Scope:
+        scope = Scope(parent)
+        ctes = with_["ctes"]
+        if with_["recursive"]:
+            scope.ctes.update(cte["name"] for cte in ctes)
+        for cte in ctes:
+            # 後続の CTE は先に定義した CTE を参照できる
+            self.select(cte["select"], scope.isolated())
+            scope.ctes.add(cte["name"])
+        return scope
+
+    def column(self, obj: dict, scope: Scope):
+        self.columns.add(scope.resolve(obj["parent"]) + "." + obj["name"])
+
+    def expr(self, obj, scope: Optional[Scope]):
+        if isinstance(obj, AstBase):
+            type = obj["type"]
+            if type == "SELECT":
+                self.select(obj, scope)
+            elif type == "identifier":
+                self.column(obj, scope or Scope())
+            else:
+                for key, value in obj.items():
+                    if key not in NON_EXPR_KEYS:
+                        self.expr(value, scope)
+        elif isinstance(obj, list):
+            for x in obj:
+                self.expr(x, scope)
+
+
+def get_references(stmt) -> References:
+    """Tables and columns referenced by a statement.
+
+    Columns are reported as ``table.column`` with aliases resolved; a column
+    whose table cannot be determined (or that belongs to a derived table or a
+    CTE) is reported as ``?.column``. Names defined by ``WITH`` are not
+    reported as tables; the tables read by their queries are.
+    """
+    collector = ReferenceCollector()
+    collector.expr(stmt, None)
+    return References(collector.tables, collector.columns)
+
+
+class _QualifierCollector(ReferenceCollector):
+    def __init__(self):
+        super().__init__()
+        # id(列) -> 修飾子が指す表
+        self.qualifiers: Dict[int, str] = {}
+
+    def column(self, obj: dict, scope: Scope):
+        if obj["parent"] is not None:
+            self.qualifiers[id(obj)] = scope.resolve(obj["parent"])
+
+
+def get_qualifiers(stmt) -> Dict[int, str]:
+    """Tables named by the qualifiers of columns, keyed by ``id`` of the column.
+
+    An alias resolves to its table and a derived table or a CTE to ``?``; a
+    qualifier that is not in scope resolves to itself.
+    """
+    collector = _QualifierCollector()
+    collector.expr(stmt, None)
+    return collector.qualifiers
+
+
+def _is_literal(obj):
+    return obj is None or isinstance(obj, (str, int, float, Value, Param))
+
+
+def _normalize(obj):
+    if isinstance(obj, Value):
+        param = Param()
+        for k, v in obj.items():
+            if k not in ("type", "value", "name", "style"):
+                param[k] = v
+        return param
+    elif isinstance(obj, AstBase):
+        if (
+            isinstance(obj, Bracket)
+            and obj["expr"]
+            and all(_is_literal(x) for x in obj["expr"])
+        ):
+            # IN (1, 2, 3) と IN (4, 5) を同じ形とみなす
+            return Bracket(Expressions(Param()), alias=obj.get("alias", None))
+        copied = obj.__class__.__new__(obj.__class__)
+        for k, v in obj.items():
+            copied[k] = v if k in NON_EXPR_KEYS else _normalize(v)
+        return copied
+    elif isinstance(obj, Expressions):
+        return Expressions(*(_normalize(x) for x in obj))
+    elif isinstance(obj, list):
+        return [_normalize(x) for x in obj]
+    elif _is_literal(obj):
+        return Param()
+    else:
+        return obj
+
+
+def get_shape(stmt) -> str:
+    """SQL of the statement with literals replaced by ``?``."""
+    return to_sql(_normalize(stmt))
@@ -0,0 +1,237 @@
+import json
+from json.encoder import encode_basestring_ascii
+from typing import IO, Any, Dict, Iterable, Iterator
+
+from .tokens import (
+    AstBase,
+    Between,
+    BinaryOperator,
+    Bracket,
+    CommonTableExpression,
+    Expressions,
+    Func,
+    Identifier,
+    JoinStatement,
+    Name,
+    Param,
+    Postfix,
+    Prefix,
+    SelectStatement,
+    UnionStatement,
+    Value,
+    WithClause,
+)
+
+# type -> node class（Table, Column は Identifier として復元する）
+NODES: Dict[str, type] = {
+    "SELECT": SelectStatement,
+    "join": JoinStatement,
+    "union": UnionStatement,
+    "bracket": Bracket,
+    "prefix": Prefix,
+    "postfix": Postfix,
+    "bo": BinaryOperator,
+    "between": Between,
+    "name": Name,
+    "identifier": Identifier,
+    "func": Func,
+    "value": Value,
+    "param": Param,
+    "with": WithClause,
+    "cte": CommonTableExpression,
+}
+
+# compact schema: "type" を "t" と短い符号で表す
+TYPE_CODES = {
+    "SELECT": "s",
+    "join": "j",
+    "union": "u",
+    "bracket": "k",
+    "prefix": "x",
+    "postfix": "y",
+    "bo": "o",
+    "between": "w",
+    "name": "n",
+    "identifier": "i",
+    "func": "f",
+    "value": "v",
+    "param": "p",
+    "with": "h",
+    "cte": "c",
+}
+CODE_TYPES = {v: k for k, v in TYPE_CODES.items()}
+
+# compact schema では、コンストラクタが常に設定する None の alias/parent を省略する
+OMITTED = {
+    "bracket": ("alias",),
+    "bo": ("alias",),
+    "between": ("alias",),
+    "identifier": ("parent", "alias"),
+    "func": ("parent", "alias"),
+    "value": ("alias",),
+    "param": ("alias",),
+    "cte": ("columns",),
+}
+
+CHUNK_PIECES = 4096
+
+_keys: Dict[str, str] = {}
+
+
+def _key(key: str):
+    try:
+        return _keys[key]
+    except KeyError:
+        result = _keys[key] = encode_basestring_ascii(key) + ":"
+        return result
+
+
+def _scalar(obj):
+    if isinstance(obj, str):
+        return encode_basestring_ascii(obj)
+    elif obj is None:
+        return "null"
+    elif obj is True:
+        return "true"
+    elif obj is False:
+        return "false"
+    elif isinstance(obj, int):
+        return int.__repr__(obj)
+    elif isinstance(obj, float):
+        if obj != obj:
+            return "NaN"
+        elif obj == float("inf"):
+            return "Infinity"
+        elif obj == -float("inf"):
+            return "-Infinity"
+        return float.__repr__(obj)
+    else:
+        raise TypeError(f"Object of type {type(obj).__name__} is not serializable")
+
+
+def _members(node: dict, compact: bool, append):
+    # 区切りと key を書き出し、値は呼び出し側に返して書き出させる
+    sep = "{"
+    omitted = OMITTED.get(node.get("type"), ()) if compact else ()
+    for key, value in node.items():
+        if compact:
+            if key == "type":
+                append(sep + '"t":' + encode_basestring_ascii(TYPE_CODES[value]))
+                sep = ","
+                continue
+            elif value is None and key in omitted:
+                continue
+        append(sep + _key(key))
+        sep = ","
+        yield value
+    append("{}" if sep == "{" else "}")
+
+
+def _elements(array, append):
+    sep = "["
+    for value in array:
+        append(sep)
+        sep = ","
+        yield value
+    append("[]" if sep == "[" else "]")
+
+
+def iterencode(obj, compact: bool = False):
+    """Encode the tree as a sequence of JSON chunks.
+
+    The tree is walked with an explicit stack, so long operator chains do not
+    hit the recursion limit, and at most ``CHUNK_PIECES`` pieces are buffered.
+    """
+    chunks = []
+    append = chunks.append
+    stack = []
+    value = obj
+
+    while True:
+        if isinstance(value, dict):
+            stack.append(_members(value, compact, append))
+        elif isinstance(value, (list, tuple)):
+            stack.append(_elements(value, append))
+        else:
+            append(_scalar(value))
+
+        while stack:
+            try:
+                value = next(stack[-1])
+                break
+            except StopIteration:
+                stack.pop()
+        else:
+            break
+
+        if len(chunks) >= CHUNK_PIECES:
+            yield "".join(chunks)
+            chunks.clear()
+
+    yield "".join(chunks)
+
+
+def dump(obj, fp: IO[str], compact: bool = False):
+    for chunk in iterencode(obj, compact):
+        fp.write(chunk)
+
+
+def dumps(obj, compact: bool = False) -> str:
+    return "".join(iterencode(obj, compact))
+
+
+def dump_many(objs: Iterable[Any], fp: IO[str], compact: bool = False):
+    """Write one document per line (JSON Lines)."""
+    for obj in objs:
+        dump(obj, fp, compact)
+        fp.write("\n")
+
+
+def _node(obj: dict):
+    cls = NODES.get(obj.get("type"))
+    if cls is None:
+        raise ValueError(f"Unknown node type: {obj.get('type')}")
+    node = cls.__new__(cls)
+    for key, value in obj.items():
+        if value.__class__ is list:
+            expressions = Expressions()
+            expressions.extend(value)
+            value = expressions
+        node[key] = value
+    return node
+
+
+def _compact_node(obj: dict):
+    type = CODE_TYPES.get(obj.pop("t", None))
+    if type is None:
+        raise ValueError(f"Unknown node type code: {obj}")
+    obj["type"] = type
+    for key in OMITTED.get(obj["type"], ()):
+        obj.setdefault(key, None)
+    return _node(obj)
+
+
+_decoders = {
+    False: json.JSONDecoder(object_hook=_node),
+    True: json.JSONDecoder(object_hook=_compact_node),
+}
+
+
+def loads(text: str, compact: bool = False):
+    """Rebuild ``tokens`` nodes (arrays become ``Expressions``).
+
+    Decoding uses the stdlib decoder, so the depth of the tree is bounded by
+    the recursion limit.
+    """
+    return _decoders[compact].decode(text)
+
+
+def load(fp: IO[str], compact: bool = False):
+    return loads(fp.read(), compact)
+
+
+def load_many(fp: IO[str], compact: bool = False) -> Iterator[AstBase]:
+    decode = _decoders[compact].decode
+    for line in fp:
+        if line.strip():
+            yield decode(line)
@@ -0,0 +1,269 @@
+"""Parse cache shared by the processes on a host.
+
+The cache is a memory-mapped file, so forked workers and unrelated
+processes that open the same path share hits:
+
+    cache = SharedParseCache("/dev/shm/sqlcommon.cache", size=64 << 20)
+    parse = cached_parser(get_parser(parser_type="native"), cache)
+
+Entries are keyed by a 128-bit hash of the SQL text and hold the compact
+JSON of the tree (see ``serializer``), so spans recorded by the native
+parser are not cached. The file is a set-associative table: a key maps to
+one set of ``ways`` fixed-size slots and the set evicts with the clock
+algorithm. Writers lock their set (``fcntl`` byte-range lock); readers take
+no lock and validate the slot with a sequence number and a checksum.
+
+``fcntl`` locks belong to the process and are released when any of its
+descriptors for the file is closed (``mmap`` holds one too), so caches
+opened on the same file in one process share the descriptor, the mapping
+and a thread lock.
+"""
+import os
+import struct
+import threading
+import zlib
+from hashlib import blake2b
+from mmap import mmap
+from typing import Callable, Dict, Optional
+
+from .serializer import dumps, loads
+
+MAGIC = b"SQLCSHM1"
+# magic, slot_size, ways, sets
+HEADER = struct.Struct("<8sIII")
+HEADER_SIZE = 64
+
+# seq, ref, pad, key, length, crc
+SLOT = struct.Struct("<IB3x16sII")
+SEQ = struct.Struct("<I")
+KEY_SIZE = 16
+
+
+def _round_up(n: int, unit: int):
+    return (n + unit - 1) // unit * unit
+
+
+class _SharedFile:
+    def __init__(self, path: str, fd: int):
+        self.path = path
+        self.fd = fd
+        self.mm: Optional[mmap] = None
+        # fcntl のロックはプロセス単位なので、スレッド間は別に排他する
+        self.lock = threading.Lock()
+        self.refs = 0
+
+
+# 解決済みのパス -> プロセス内で共有する fd、mmap とロック
+_files: Dict[str, _SharedFile] = {}
+_files_lock = threading.Lock()
+
+
+def _open_file(path: str) -> _SharedFile:
+    path = os.path.realpath(path)
+    with _files_lock:
+        file = _files.get(path)
+        if file is None:
+            fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+            file = _files[path] = _SharedFile(path, fd)
+        file.refs += 1
+        return file
+
+
+def _close_file(file: _SharedFile):
+    with _files_lock:
+        file.refs -= 1
+        if file.refs:
+            return
+        del _files[file.path]
+        # 最後の参照を閉じるまで、他の cache のロックを解除しない
+        if file.mm is not None:
+            file.mm.close()
+        os.close(file.fd)
+
+
+class SharedParseCache:
+    def __init__(
+        self,
+        path: str,
+        size: int = 64 << 20,
+        slot_size: int = 4096,
+        ways: int = 8,
+    ):
+        import fcntl
+
+        self._fcntl = fcntl
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._mm = None
+
+        if slot_size <= SLOT.size or slot_size % 64:
+            raise ValueError("slot_size must be a multiple of 64 and hold a header.")
+        if not 1 <= ways <= 255:
+            raise ValueError("ways must be between 1 and 255.")
+
+        sets = max(1, (size - HEADER_SIZE) // (slot_size * ways + 1))
+        data_offset = _round_up(HEADER_SIZE + sets, 64)
+        total = data_offset + sets * ways * slot_size
+
+        self._file = _open_file(path)
+        self._fd = self._file.fd
+        self._lock = self._file.lock
+        try:
+            with self._lock:
+                # 同時に開いたプロセスのうち一つだけが初期化する
+                fcntl.lockf(self._fd, fcntl.LOCK_EX, HEADER_SIZE, 0)
+                try:
+                    header = os.pread(self._fd, HEADER.size, 0)
+                    if len(header) < HEADER.size or header[:8] != MAGIC:
+                        os.ftruncate(self._fd, 0)
+                        os.ftruncate(self._fd, total)
+                        os.pwrite(
+                            self._fd, HEADER.pack(MAGIC, slot_size, ways, sets), 0
+                        )
+                    else:
+                        _, slot_size, ways, sets = HEADER.unpack(header)
+                        data_offset = _round_up(HEADER_SIZE + sets, 64)
+                        total = data_offset + sets * ways * slot_size
+                finally:
+                    fcntl.lockf(self._fd, fcntl.LOCK_UN, HEADER_SIZE, 0)
+                if self._file.mm is None:
+                    self._file.mm = mmap(self._fd, total)
+            self._mm = self._file.mm
+        except BaseException:
+            _close_file(self._file)
+            raise
+
+        self.slot_size = slot_size
+        self.ways = ways
+        self.sets = sets
+        self.capacity = slot_size - SLOT.size
+        self._data_offset = data_offset
+
+    def close(self):
+        if self._mm is not None:
+            self._mm = None
+            _close_file(self._file)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @staticmethod
+    def key(sql: str, namespace: str = "") -> bytes:
+        h = blake2b(namespace.encode("utf-8"), digest_size=KEY_SIZE)
+        h.update(b"\0")
+        h.update(sql.encode("utf-8"))
+        return h.digest()
+
+    def _slots(self, key: bytes):
+        index = int.from_bytes(key[:8], "little") % self.sets
+        start = self._data_offset + index * self.ways * self.slot_size
+        return index, range(start, start + self.ways * self.slot_size, self.slot_size)
+
+    def _read(self, offset: int, key: bytes) -> Optional[bytes]:
+        mm = self._mm
+        seq, ref, slot_key, length, crc = SLOT.unpack_from(mm, offset)
+        if slot_key != key or seq & 1 or length > self.capacity:
+            return None
+        payload = mm[offset + SLOT.size : offset + SLOT.size + length]
+        # 書き込み中に読んだ場合は seq か checksum が一致しない
+        if SEQ.unpack_from(mm, offset)[0] != seq or zlib.crc32(payload) != crc:
+            return None
+        if not ref:
+            mm[offset + 4] = 1
+        return payload
+
+    def get(self, sql: str, namespace: str = ""):
+        """Cached tree for ``sql``, or None."""
+        key = self.key(sql, namespace)
+        for offset in self._slots(key)[1]:
+            payload = self._read(offset, key)
+            if payload is not None:
+                self.hits += 1
+                return loads(payload.decode("utf-8"), compact=True)
+        self.misses += 1
+        return None
+
+    def put(self, sql: str, stmt, namespace: str = "") -> bool:
+        """Store the tree; return False if it does not fit in a slot."""
+        payload = dumps(stmt, compact=True).encode("utf-8")
+        if len(payload) > self.capacity:
+            return False
+
+        key = self.key(sql, namespace)
+        index, slots = self._slots(key)
+        hand_offset = HEADER_SIZE + index
+        mm = self._mm
+        fcntl = self._fcntl
+
+        with self._lock:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, 1, hand_offset)
+            try:
+                victim = None
+                for offset in slots:
+                    if SLOT.unpack_from(mm, offset)[2] == key:
+                        victim = offset
+                        break
+
+                if victim is None:
+                    # clock: 参照ビットが立っている slot は一周だけ見逃す
+                    hand = mm[hand_offset]
+                    for _ in range(self.ways * 2):
+                        offset = slots[hand]
+                        hand = (hand + 1) % self.ways
+                        if mm[offset + 4]:
+                            mm[offset + 4] = 0
+                        else:
+                            victim = offset
+                            break
+                    else:
+                        victim = slots[hand]
+                    mm[hand_offset] = hand
+
+                # seqlock: 書き込み中は seq を奇数にする
+                seq = SEQ.unpack_from(mm, victim)[0]
+                seq = seq if seq & 1 else seq + 1
+                SEQ.pack_into(mm, victim, seq)
+                start = victim + SLOT.size
+                mm[start : start + len(payload)] = payload
+                SLOT.pack_into(
+                    mm, victim, seq, 0, key, len(payload), zlib.crc32(payload)
+                )
+                SEQ.pack_into(mm, victim, (seq + 1) & 0xFFFFFFFF)
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, 1, hand_offset)
+        return True
+
+    def __len__(self):
+        empty = bytes(KEY_SIZE)
+        return sum(
+            1
+            for offset in range(
+                self._data_offset,
+                self._data_offset + self.sets * self.ways * self.slot_size,
+                self.slot_size,
+            )
+            if SLOT.unpack_from(self._mm, offset)[2] != empty
+        )
+
+
+def cached_parser(
+    parse: Callable, cache: SharedParseCache, namespace: str = ""
+) -> Callable:
+    """Look up ``cache`` before calling ``parse``.
+
+    Use a different ``namespace`` for parsers with different dialects or
+    start rules that share one cache file.
+    """
+
+    def parse_cached(sql: str):
+        stmt = cache.get(sql, namespace)
+        if stmt is None:
+            stmt = parse(sql)
+            cache.put(sql, stmt, namespace)
+        return stmt
+
+    return parse_cached
@@ -0,0 +1,114 @@
+import hashlib
+import heapq
+import itertools
+import math
+from typing import Dict, Hashable, List, Tuple
+
+
+def hash64(item: str) -> int:
+    # プロセス間で同じ値になるよう、組み込みの hash ではなく blake2b を使う
+    return int.from_bytes(
+        hashlib.blake2b(item.encode(), digest_size=8).digest(), "little"
+    )
+
+
+class HeavyHitters:
+    """Misra-Gries frequent items summary with at most ``k`` counters.
+
+    Every item with a true count above ``n / (k + 1)`` is kept, and each
+    reported count is at most ``error`` below the true count. Counters are
+    stored with a common offset, so decrementing all of them is one
+    addition, and a min-heap finds the counters that reach zero: ``add``
+    is O(log k) amortized.
+    """
+
+    def __init__(self, k: int = 1000):
+        if k < 1:
+            raise ValueError("k must be at least 1.")
+        self.k = k
+        # item -> 計数 + offset（これまでに全ての計数から引いた合計）
+        self._values: Dict[Hashable, int] = {}
+        self._offset = 0
+        # (値, 順序, item)。値は item の現在の値以下で、増加は取り出す時に反映する
+        self._heap: List[Tuple[int, int, Hashable]] = []
+        self._order = itertools.count()
+        self.n = 0
+        self.error = 0
+
+    @property
+    def counters(self) -> Dict[Hashable, int]:
+        offset = self._offset
+        return {k: v - offset for k, v in self._values.items()}
+
+    def _min(self) -> int:
+        # 先頭の項目を最小の値を持つ item の現在の値にする
+        heap = self._heap
+        values = self._values
+        while True:
+            value, _, item = heap[0]
+            current = values[item]
+            if current == value:
+                return value
+            heapq.heapreplace(heap, (current, next(self._order), item))
+
+    def add(self, item: Hashable, count: int = 1):
+        self.n += count
+        values = self._values
+        if item in values:
+            values[item] += count
+            return
+
+        heap = self._heap
+        if len(values) >= self.k:
+            # 全ての計数から最小値を引き、0 になったものを捨てる
+            decrement = min(count, self._min() - self._offset)
+            self.error += decrement
+            self._offset += decrement
+            count -= decrement
+            while heap and self._min() <= self._offset:
+                del values[heapq.heappop(heap)[2]]
+            if count <= 0:
+                return
+
+        value = values[item] = count + self._offset
+        heapq.heappush(heap, (value, next(self._order), item))
+
+    def top(self, n: int = None) -> List[Tuple[Hashable, int]]:
+        items = sorted(self.counters.items(), key=lambda x: (-x[1], str(x[0])))
+        return items if n is None else items[:n]
+
+
+class HyperLogLog:
+    """Distinct count estimate in ``2 ** p`` bytes.
+
+    The standard error is ``1.04 / sqrt(2 ** p)``.
+    """
+
+    def __init__(self, p: int = 14):
+        self.p = p
+        self.m = 1 << p
+        self.registers = bytearray(self.m)
+
+    def add(self, item: str):
+        x = hash64(item)
+        index = x & (self.m - 1)
+        w = x >> self.p
+        # 先頭の 0 の数 + 1（残りの 64 - p bit 中）
+        rank = (64 - self.p) - w.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other: "HyperLogLog"):
+        if other.p != self.p:
+            raise ValueError("Precision mismatch.")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def count(self) -> int:
+        m = self.m
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            # 小さい範囲は linear counting で補正する
+            estimate = m * math.log(m / zeros)
+        return round(estimate)
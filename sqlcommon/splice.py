@@ -0,0 +1,127 @@
+from typing import Dict, Iterable, Iterator, List, Tuple, Union
+
+from .native import get_lexicon
+from .references import get_qualifiers
+from .tokens import AstBase, Identifier, to_sql
+
+Span = Tuple[int, int]
+
+
+def get_span(node) -> Span:
+    span = getattr(node, "span", None)
+    if span is None:
+        raise ValueError(
+            "The node has no source span. Parse with get_parser(parser_type='native')."
+        )
+    return span
+
+
+def splice(text: str, edits: Iterable[Tuple[Union[AstBase, Span], str]]) -> str:
+    """Replace the source of each node (or span) in ``text``.
+
+    The output is built from slices of the original text, so formatting and
+    comments outside the edited spans are kept as written.
+    """
+    spans = sorted(
+        (x if isinstance(x, tuple) else get_span(x), replacement)
+        for x, replacement in edits
+    )
+
+    pieces = []
+    pos = 0
+    for (start, end), replacement in spans:
+        if start < pos:
+            raise ValueError(f"Overlapping edits at {start}.")
+        pieces.append(text[pos:start])
+        pieces.append(replacement)
+        pos = end
+    pieces.append(text[pos:])
+    return "".join(pieces)
+
+
+class Rewriter:
+    """Collect edits against the source of a parsed statement."""
+
+    def __init__(self, text: str):
+        self.text = text
+        self.edits: List[Tuple[Span, str]] = []
+
+    def replace(self, node: Union[AstBase, Span], replacement: Union[str, AstBase]):
+        if not isinstance(replacement, str):
+            replacement = to_sql(replacement)
+        span = node if isinstance(node, tuple) else get_span(node)
+        self.edits.append((span, replacement))
+        return self
+
+    def to_sql(self) -> str:
+        return splice(self.text, self.edits)
+
+
+def iter_nodes(obj) -> Iterator[AstBase]:
+    stack = [obj]
+    while stack:
+        obj = stack.pop()
+        if isinstance(obj, AstBase):
+            yield obj
+            stack.extend(x for x in obj.values() if isinstance(x, (dict, list)))
+        elif isinstance(obj, list):
+            stack.extend(obj)
+
+
+def _table_name(obj: dict):
+    if obj["parent"] is None:
+        return obj["name"]
+    return obj["parent"] + "." + obj["name"]
+
+
+def _qualifier_span(text: str, node) -> Span:
+    # 列名の引用符を保つため、最後の "." より前（修飾子）だけを置き換える
+    start, end = get_span(node)
+    tokens = get_lexicon().tokenize(text[start:end])
+    dot = max(
+        i
+        for i, (kind, value, _, _) in enumerate(tokens)
+        if (kind, value) == ("op", ".")
+    )
+    kind, value, _, pos = tokens[dot - 1]
+    return start, start + pos + len(value)
+
+
+def rename_tables(stmt, text: str, mapping: Dict[str, str]) -> str:
+    """Rename tables in FROM/JOIN and in column qualifiers by splicing.
+
+    A qualifier is renamed only when it names the table itself, not an alias
+    of another table, a derived table or a name defined by ``WITH``.
+    """
+    rewriter = Rewriter(text)
+    sources = set()
+    ctes = {node["name"] for node in iter_nodes(stmt) if node["type"] == "cte"}
+
+    for node in iter_nodes(stmt):
+        if node["type"] != "SELECT":
+            continue
+        items = list(node.get("from_", None) or [])
+        for join in node.get("joins", None) or []:
+            items.extend(join["from_"])
+        for item in items:
+            if isinstance(item, Identifier) and item["type"] == "identifier":
+                sources.add(id(item))
+                if item["parent"] is None and item["name"] in ctes:
+                    continue
+                table = _table_name(item)
+                if table in mapping:
+                    rewriter.replace(item, mapping[table])
+
+    # 修飾子をスコープで解決し、別名（from accounts users の users 等）は変えない
+    qualifiers = get_qualifiers(stmt)
+    for node in iter_nodes(stmt):
+        if (
+            node["type"] == "identifier"
+            and id(node) not in sources
+            and node["parent"] in mapping
+            and node["parent"] not in ctes
+            and qualifiers.get(id(node), None) == node["parent"]
+        ):
+            rewriter.replace(_qualifier_span(text, node), mapping[node["parent"]])
+
+    return rewriter.to_sql()
@@ -0,0 +1,239 @@
+"""Analysis of statements memoized per distinct subquery.
+
+    analyzer = SubqueryAnalyzer()
+    result = analyzer.analyze(get_parser()(sql))
+    result.sql, result.references, result.cost, result.ctes["totals"].cost
+
+The units of analysis are the statement, the queries of its CTEs and its
+bracketed subqueries (derived tables, scalar and IN subqueries). Equal
+units are found by interning: one pass over the tree gives equal subtrees
+the same id. The rendered SQL, the complexity and the cost of a unit are
+computed once per id, from the results of its own subqueries, and reused by
+later occurrences and later statements. References also depend on the
+names visible where the unit occurs (outer aliases and CTEs), so they are
+memoized per id and visible names.
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+
+from .complexity import Complexity, CostWeights, combine, measure
+from .references import ReferenceCollector, References, Scope
+from .tokens import AstBase, Expressions, to_sql
+
+
+@dataclass(frozen=True)
+class Analysis:
+    sql: str
+    references: References
+    complexity: Complexity
+    cost: float
+    # 直接含む副問合せ（CTE を含む。同じ名前が見える同じ副問合せは一つ）
+    subqueries: Tuple["Analysis", ...] = ()
+    # WITH で定義した名前 -> その問合せ
+    ctes: Dict[str, "Analysis"] = field(default_factory=dict)
+
+
+class _Unit:
+    __slots__ = ("sql", "complexity", "cost")
+
+    def __init__(self, sql: str, complexity: Complexity, cost: float):
+        self.sql = sql
+        self.complexity = complexity
+        self.cost = cost
+
+
+class _Text(AstBase):
+    # 描画済みの副問合せ
+    def __init__(self, sql: str):
+        self["type"] = "sql"
+        self["sql"] = sql
+
+    def tokens(self):
+        yield self["sql"]
+
+
+def _substitute(obj, texts: Dict[int, str]):
+    if id(obj) in texts:
+        return _Text(texts[id(obj)])
+    elif isinstance(obj, AstBase):
+        copied = obj.__class__.__new__(obj.__class__)
+        for k, v in obj.items():
+            copied[k] = _substitute(v, texts)
+        return copied
+    elif isinstance(obj, Expressions):
+        return Expressions(*(_substitute(x, texts) for x in obj))
+    elif isinstance(obj, list):
+        return [_substitute(x, texts) for x in obj]
+    else:
+        return obj
+
+
+def _signature(scope: Optional[Scope]):
+    # 副問合せから見える名前（外側の別名と CTE）
+    result = []
+    while scope is not None:
+        result.append((frozenset(scope.tables.items()), frozenset(scope.ctes)))
+        scope = scope.parent
+    return tuple(result)
+
+
+class _Run:
+    """Interned ids of the nodes of one statement."""
+
+    def __init__(self, stmt, table: Dict[object, int]):
+        # id(node) -> 構造の id、構造の id -> SELECT
+        self.ids: Dict[int, int] = {}
+        self.selects: Dict[int, AstBase] = {}
+        # UNION の後続の SELECT（単位ではない）
+        self.branches: Set[int] = set()
+
+        ids = self.ids
+        stack: list = [stmt]
+        push = stack.append
+        pop = stack.pop
+        while stack:
+            obj = pop()
+            if obj is None:
+                # 子の id が決まった節点
+                obj = pop()
+                key: object
+                if isinstance(obj, dict):
+                    key = frozenset(
+                        [
+                            (
+                                (k, ids[id(v)])
+                                if isinstance(v, (dict, list))
+                                else (k, (v.__class__, v))
+                            )
+                            for k, v in obj.items()
+                        ]
+                    )
+                else:
+                    key = tuple(
+                        [
+                            (
+                                ids[id(v)]
+                                if isinstance(v, (dict, list))
+                                else (v.__class__, v)
+                            )
+                            for v in obj
+                        ]
+                    )
+                ids[id(obj)] = uid = table.setdefault(key, len(table))
+                if isinstance(obj, AstBase):
+                    type = obj["type"]
+                    if type == "SELECT":
+                        self.selects[uid] = obj
+                    elif type == "union":
+                        self.branches.update(id(x) for x in obj["select"])
+            elif id(obj) not in ids:
+                push(obj)
+                push(None)
+                for v in obj.values() if isinstance(obj, dict) else obj:
+                    if isinstance(v, (dict, list)):
+                        push(v)
+
+
+class _MemoCollector(ReferenceCollector):
+    def __init__(self, analyzer: "SubqueryAnalyzer", run: _Run):
+        super().__init__()
+        self.analyzer = analyzer
+        self.run = run
+        # 直接含む単位の (構造の id, 見える名前)
+        self.units: List[tuple] = []
+
+    def select(self, stmt: dict, parent: Optional[Scope]):
+        analyzer = self.analyzer
+        key = (self.run.ids[id(stmt)], _signature(parent))
+        references = analyzer._references.get(key)
+        if references is None:
+            collector = _MemoCollector(analyzer, self.run)
+            ReferenceCollector.select(collector, stmt, parent)
+            references = References(
+                frozenset(collector.tables), frozenset(collector.columns)
+            )
+            analyzer._references[key] = references
+            analyzer._nested[key] = tuple(collector.units)
+
+        self.tables.update(references.tables)
+        self.columns.update(references.columns)
+        if id(stmt) in self.run.branches:
+            self.units.extend(analyzer._nested[key])
+        else:
+            self.units.append(key)
+
+
+class SubqueryAnalyzer:
+    """Analyze statements, computing each distinct subquery once.
+
+    The memo grows with the distinct subtrees seen; it is cleared before an
+    analysis once it holds more than ``max_size`` of them, or by ``clear``.
+    ``hits`` and ``misses`` count the units found in and added to the memo.
+    """
+
+    def __init__(self, weights: CostWeights = CostWeights(), max_size: int = 1 << 17):
+        self.weights = weights
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.clear()
+
+    def clear(self):
+        # 部分木の構造 -> id（id は clear まで変わらない）
+        self._table: Dict[object, int] = {}
+        self._units: Dict[int, _Unit] = {}
+        self._references: Dict[tuple, References] = {}
+        self._nested: Dict[tuple, Tuple[tuple, ...]] = {}
+        self._analyses: Dict[tuple, Analysis] = {}
+
+    def analyze(self, stmt) -> Analysis:
+        # id は単位の記憶の key なので、上限を超えたら全体を捨てる
+        if len(self._table) > self.max_size:
+            self.clear()
+        run = _Run(stmt, self._table)
+        collector = _MemoCollector(self, run)
+        collector.select(stmt, None)
+        return self._analysis(collector.units[0], run)
+
+    def _unit(self, uid: int, run: _Run) -> _Unit:
+        unit = self._units.get(uid)
+        if unit is not None:
+            self.hits += 1
+            return unit
+
+        self.misses += 1
+        select = run.selects[uid]
+        own, children = measure(select)
+        units = [self._unit(run.ids[id(x)], run) for x in children]
+        complexity = combine(own, [x.complexity for x in units])
+        # 副問合せは描画済みの SQL に置き換えて描画する
+        texts = {id(x): unit.sql for x, unit in zip(children, units)}
+        sql = to_sql(_substitute(select, texts)) if texts else to_sql(select)
+        unit = self._units[uid] = _Unit(sql, complexity, self.weights.score(complexity))
+        return unit
+
+    def _analysis(self, key: tuple, run: _Run) -> Analysis:
+        analysis = self._analyses.get(key)
+        if analysis is not None:
+            return analysis
+
+        uid = key[0]
+        unit = self._unit(uid, run)
+        nested = self._nested[key]
+        subqueries = {k: self._analysis(k, run) for k in nested}
+
+        # WITH の問合せは最初に走査される
+        with_ = run.selects[uid].get("with_", None)
+        names = [x["name"] for x in with_["ctes"]] if with_ else []
+        ctes = {name: subqueries[k] for name, k in zip(names, nested)}
+
+        analysis = self._analyses[key] = Analysis(
+            sql=unit.sql,
+            references=self._references[key],
+            complexity=unit.complexity,
+            cost=unit.cost,
+            subqueries=tuple(subqueries.values()),
+            ctes=ctes,
+        )
+        return analysis
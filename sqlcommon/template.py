@@ -0,0 +1,277 @@
+import re
+import secrets
+from typing import Any, Dict, Iterable, List, Literal, Optional, Tuple, Union
+
+from .tokens import NON_EXPR_KEYS, AstBase, Expressions, Param, Value, to_sql
+
+Paramstyle = Literal["qmark", "numeric", "named", "format", "pyformat", "dollar"]
+
+
+class _Marker:
+    # 一回の描画の slot が共有する区切り。衝突したら描画し直す
+    __slots__ = ("text", "pattern")
+
+    def __init__(self):
+        self.text = "\x00"
+        self.pattern = _SLOT
+
+    def renew(self):
+        self.text = "\x00" + secrets.token_hex(8) + "\x00"
+        self.pattern = re.compile(
+            re.escape(self.text) + "([0-9]+)" + re.escape(self.text)
+        )
+
+
+_SLOT = re.compile("\x00([0-9]+)\x00")
+
+
+class _Slot(AstBase):
+    def __init__(self, index: int, marker: _Marker):
+        self["type"] = "slot"
+        self["index"] = index
+        self["marker"] = marker
+
+    def tokens(self):
+        text = self["marker"].text
+        yield text + str(self["index"]) + text
+
+
+def _split_slots(tree, marker: _Marker, count: int) -> List[str]:
+    """Render ``tree`` and split it at its ``count`` slots.
+
+    Returns the fragments and slot indices interleaved, as ``re.split``. A
+    literal or name that contains the marker would add a match, so the
+    indices are checked and the tree is rendered again with a random marker.
+    """
+    for _ in range(3):
+        parts = marker.pattern.split(to_sql(tree))
+        indices = parts[1::2]
+        if len(indices) == count and sorted(map(int, indices)) == list(range(count)):
+            return parts
+        marker.renew()
+    raise RuntimeError("Could not locate the placeholders in the rendered SQL.")
+
+
+def _replace_params(obj, params: List[Param], marker: _Marker):
+    if isinstance(obj, Param):
+        params.append(obj)
+        return _Slot(len(params) - 1, marker)
+    elif isinstance(obj, AstBase):
+        copied = obj.__class__.__new__(obj.__class__)
+        for k, v in obj.items():
+            copied[k] = _replace_params(v, params, marker)
+        return copied
+    elif isinstance(obj, Expressions):
+        return Expressions(*(_replace_params(x, params, marker) for x in obj))
+    elif isinstance(obj, list):
+        return [_replace_params(x, params, marker) for x in obj]
+    else:
+        return obj
+
+
+class Template:
+    """Parse once, bind many.
+
+    The statement is rendered once into the SQL fragments around each
+    placeholder, so binding values is a join of precomputed strings.
+
+    Positional placeholders (``?``, ``%s``) are numbered by their order in the
+    rendered SQL and bound from a sequence; numbered placeholders (``:1``,
+    ``$1``) bind ``params[n - 1]``; named placeholders (``:x``, ``%(x)s``)
+    bind ``params["x"]``.
+    """
+
+    def __init__(self, stmt):
+        params: List[Param] = []
+        marker = _Marker()
+        parts = _split_slots(_replace_params(stmt, params, marker), marker, len(params))
+
+        self.fragments: Tuple[str, ...] = tuple(parts[0::2])
+        self.keys: Tuple[Union[int, str], ...] = tuple(
+            self._get_keys([params[int(i)] for i in parts[1::2]])
+        )
+        self._compiled: Dict[str, tuple] = {}
+
+    @staticmethod
+    def _get_keys(params: List[Param]):
+        position = 0
+        for param in params:
+            style = param["style"]
+            if style in {"qmark", "format"}:
+                yield position
+                position += 1
+            elif style in {"numeric", "dollar"}:
+                yield int(param["name"]) - 1
+            else:
+                yield param["name"]
+
+    def render(self, params: Any = ()) -> str:
+        """Return SQL with the values inlined as literals."""
+        fragments = self.fragments
+        values = [to_sql(params[k]) for k in self.keys]
+        return fragments[0] + "".join(v + f for v, f in zip(values, fragments[1:]))
+
+    def bind(
+        self, params: Any = (), paramstyle: Paramstyle = "qmark"
+    ) -> Tuple[str, Union[tuple, dict]]:
+        """Return ``(sql, params)`` for ``cursor.execute`` in ``paramstyle``."""
+        try:
+            sql, keys, names = self._compiled[paramstyle]
+        except KeyError:
+            sql, keys, names = self._compiled.setdefault(
+                paramstyle, self._compile(paramstyle)
+            )
+
+        if names:
+            return sql, {name: params[k] for name, k in zip(names, keys)}
+        else:
+            return sql, tuple(params[k] for k in keys)
+
+    def _compile(self, paramstyle: Paramstyle):
+        if paramstyle not in Param.PLACEHOLDERS:
+            raise ValueError(f"Unknown paramstyle: {paramstyle}")
+
+        fragments = self.fragments
+        if paramstyle in {"format", "pyformat"}:
+            fragments = tuple(x.replace("%", "%%") for x in fragments)
+
+        placeholder = Param.PLACEHOLDERS[paramstyle]
+
+        if paramstyle in {"qmark", "format"}:
+            keys = self.keys
+            names = None
+            placeholders = [placeholder] * len(keys)
+        else:
+            # 同じパラメータは一度だけ渡す
+            keys = tuple(dict.fromkeys(self.keys))
+            if paramstyle in {"numeric", "dollar"}:
+                names = None
+                numbers = {k: str(i + 1) for i, k in enumerate(keys)}
+            else:
+                names = tuple(k if isinstance(k, str) else f"p{k + 1}" for k in keys)
+                numbers = dict(zip(keys, names))
+            placeholders = [placeholder.format(numbers[k]) for k in self.keys]
+
+        sql = fragments[0] + "".join(p + f for p, f in zip(placeholders, fragments[1:]))
+        return sql, keys, names
+
+
+# GROUP BY と ORDER BY の式は SELECT の項目と一致させる必要がある（位置の整数も含む）ため、
+# リテラルをパラメータにしない
+_INLINE = frozenset(("groupby", "orderby"))
+_KEEP = NON_EXPR_KEYS | _INLINE
+# 項目としての属性。式が一致するかの比較では除く
+_ITEM_KEYS = frozenset(("alias", "is_item", "is_asc"))
+
+
+def _is_bindable(value):
+    # NULL と真偽値は IS NULL, IS TRUE でパラメータにできないため残す
+    return isinstance(value, (str, int, float)) and not isinstance(value, bool)
+
+
+def _expr_of(obj):
+    if isinstance(obj, dict):
+        return {k: v for k, v in obj.items() if k not in _ITEM_KEYS}
+    return obj
+
+
+def _grouped(select: dict) -> Dict[str, list]:
+    # 節点の種類 -> GROUP BY, ORDER BY の式
+    grouped: Dict[str, list] = {}
+    for key in _INLINE:
+        for x in select.get(key, None) or ():
+            if isinstance(x, dict):
+                grouped.setdefault(x["type"], []).append(_expr_of(x))
+    return grouped
+
+
+def _lift_literals(obj, values: list, marker: _Marker, grouped: Dict[str, list]):
+    # grouped と一致する部分木（SELECT の項目など）は残す
+    if isinstance(obj, AstBase) and grouped:
+        exprs = grouped.get(obj.get("type", None), None)
+        if exprs and _expr_of(obj) in exprs:
+            return obj
+
+    if isinstance(obj, Value):
+        value = obj["value"]
+        if not _is_bindable(value):
+            return obj
+        values.append(value)
+        slot = _Slot(len(values) - 1, marker)
+        for k, v in obj.items():
+            if k not in ("type", "value"):
+                slot[k] = v
+        return slot
+    elif isinstance(obj, Param):
+        raise ValueError("The statement already has placeholders.")
+    elif isinstance(obj, AstBase):
+        if obj["type"] == "SELECT":
+            grouped = _grouped(obj)
+        copied = obj.__class__.__new__(obj.__class__)
+        for k, v in obj.items():
+            if k in _KEEP:
+                copied[k] = v
+            else:
+                copied[k] = _lift_literals(v, values, marker, grouped)
+        return copied
+    elif isinstance(obj, list):
+        items = (_lift_literals(x, values, marker, grouped) for x in obj)
+        return Expressions(*items) if isinstance(obj, Expressions) else list(items)
+    elif _is_bindable(obj):
+        values.append(obj)
+        return _Slot(len(values) - 1, marker)
+    else:
+        return obj
+
+
+def _compile_batch(fragments: Tuple[str, ...], paramstyle: Paramstyle):
+    if paramstyle in {"format", "pyformat"}:
+        fragments = tuple(x.replace("%", "%%") for x in fragments)
+
+    placeholder = Param.PLACEHOLDERS[paramstyle]
+    numbers = [str(i + 1) for i in range(len(fragments) - 1)]
+    if paramstyle in {"named", "pyformat"}:
+        names = tuple("p" + x for x in numbers)
+        placeholders = [placeholder.format(x) for x in names]
+    else:
+        names = None
+        placeholders = [placeholder.format(x) for x in numbers]
+
+    sql = fragments[0] + "".join(p + f for p, f in zip(placeholders, fragments[1:]))
+    return sql, names
+
+
+def render_batches(
+    stmts: Iterable[AstBase], paramstyle: Paramstyle = "qmark"
+) -> List[Tuple[str, List[Union[tuple, dict]]]]:
+    """Render statements as ``(sql, [params, ...])`` for ``cursor.executemany``.
+
+    String and numeric literals become placeholders in ``paramstyle``, so
+    statements that differ only in their literals share one SQL text and are
+    grouped into one batch. NULL, booleans, GROUP BY and ORDER BY, and the
+    expressions that match them elsewhere in the SELECT stay in the SQL, so
+    the database still sees them as the same expression. Batches are
+    returned in order of first use.
+    """
+    if paramstyle not in Param.PLACEHOLDERS:
+        raise ValueError(f"Unknown paramstyle: {paramstyle}")
+
+    batches: Dict[Tuple[str, ...], Tuple[str, Optional[tuple], list]] = {}
+    for stmt in stmts:
+        values: list = []
+        marker = _Marker()
+        lifted = _lift_literals(stmt, values, marker, {})
+        parts = _split_slots(lifted, marker, len(values))
+        fragments = tuple(parts[0::2])
+        params = [values[int(i)] for i in parts[1::2]]
+
+        try:
+            sql, names, batch = batches[fragments]
+        except KeyError:
+            sql, names = _compile_batch(fragments, paramstyle)
+            batch = []
+            batches[fragments] = (sql, names, batch)
+
+        batch.append(dict(zip(names, params)) if names else tuple(params))
+
+    return [(sql, batch) for sql, names, batch in batches.values()]
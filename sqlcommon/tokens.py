@@ -1,5 +1,30 @@
 from typing import Any, List, NamedTuple
 
+from .operators import (
+    INFIX_PRECEDENCE,
+    OTHER_PRECEDENCE,
+    POSTFIX_PRECEDENCE,
+    PREFIX_PRECEDENCE,
+)
+
+# 式を含まない key（名前や演算子）
+NON_EXPR_KEYS = frozenset(
+    (
+        "type",
+        "op",
+        "name",
+        "parent",
+        "alias",
+        "is_item",
+        "is_asc",
+        "join_type",
+        "union_type",
+        "style",
+        "columns",
+        "recursive",
+    )
+)
+
 
 def tokenize(it):
     for x in it:
@@ -24,7 +49,16 @@ class AstBase(dict):
         yield ""
 
     def to_sql(self):
-        return " ".join(self.tokens())
+        sql = " ".join(self.tokens())
+
+        if self.get("alias", None) is not None:
+            sql += " AS " + Name.get_name(self["alias"])
+
+        is_asc = self.get("is_asc", None)
+        if is_asc is not None:
+            sql += " ASC" if is_asc else " DESC"
+
+        return sql
 
 
 class Expressions(list):
@@ -49,6 +83,32 @@ class Bracket(AstBase):
         yield "(" + to_sql(self["expr"]) + ")"
 
 
+def get_precedence(obj):
+    # 被演算子を括弧で囲む必要があるかの判定に使う（原子は最大）
+    if isinstance(obj, AstBase) and obj.get("alias", None) is None:
+        type = obj["type"]
+        if type == "bo":
+            return INFIX_PRECEDENCE.get(obj["op"].upper(), OTHER_PRECEDENCE)
+        elif type == "prefix":
+            return PREFIX_PRECEDENCE.get(obj["op"].upper(), OTHER_PRECEDENCE)
+        elif type == "postfix":
+            return POSTFIX_PRECEDENCE.get(obj["op"], OTHER_PRECEDENCE)
+        elif type == "between":
+            return INFIX_PRECEDENCE["BETWEEN"]
+    return float("inf")
+
+
+# 記号の演算子を構成する文字（連結すると別の演算子やコメントになる）
+OPERATOR_CHARS = frozenset("+-*/<>=~!@#%^&|`?")
+
+
+def operand_to_sql(obj, precedence):
+    if get_precedence(obj) < precedence:
+        return "(" + to_sql(obj) + ")"
+    else:
+        return to_sql(obj)
+
+
 class Prefix(AstBase):
     def __init__(self, op: str, expr: Expressions, alias: str = None):
         self["type"] = "prefix"
@@ -56,7 +116,15 @@ class Prefix(AstBase):
         self["expr"] = expr
 
     def tokens(self):
-        yield self["op"] + to_sql(self["expr"][0])
+        op = self["op"]
+        expr = operand_to_sql(self["expr"][0], get_precedence(self))
+        if op[-1].isalpha():
+            yield op + " " + expr
+        elif expr[:1] in OPERATOR_CHARS:
+            # - -b を --b（行コメント）にしない
+            yield op + "(" + expr + ")"
+        else:
+            yield op + expr
 
 
 class Postfix(AstBase):
@@ -66,7 +134,7 @@ class Postfix(AstBase):
         self["expr"] = expr
 
     def tokens(self):
-        yield to_sql(self["expr"][0]) + self["op"]
+        yield operand_to_sql(self["expr"][0], get_precedence(self)) + self["op"]
 
 
 class BinaryOperator(AstBase):
@@ -77,9 +145,43 @@ class BinaryOperator(AstBase):
         self["alias"] = alias
 
     def tokens(self):
-        yield to_sql(self["expr"][0])
+        # 左結合の連鎖は再帰せずに展開する（長い WHERE 句で再帰上限に達しないため）
+        spine = []
+        node = self
+        while True:
+            spine.append(node)
+            left = node["expr"][0]
+            if (
+                isinstance(left, BinaryOperator)
+                and left.get("alias", None) is None
+                and "is_asc" not in left
+                and get_precedence(left) >= get_precedence(node)
+            ):
+                node = left
+            else:
+                break
+
+        yield operand_to_sql(left, get_precedence(node))
+        for node in reversed(spine):
+            yield node["op"]
+            yield operand_to_sql(node["expr"][1], get_precedence(node) + 1)
+
+
+class Between(AstBase):
+    def __init__(self, op: str, expr: Expressions, alias: str = None):
+        self["type"] = "between"
+        self["op"] = op  # BETWEEN, NOT BETWEEN
+        self["expr"] = expr  # value, lower, upper
+        self["alias"] = alias
+
+    def tokens(self):
+        precedence = get_precedence(self) + 1
+        value, lower, upper = self["expr"]
+        yield operand_to_sql(value, precedence)
         yield self["op"]
-        yield to_sql(self["expr"][1])
+        yield operand_to_sql(lower, precedence)
+        yield "AND"
+        yield operand_to_sql(upper, precedence)
 
 
 # def get_name(self: dict):
@@ -184,13 +286,49 @@ class Value(AstBase):
     def tokens(self):
         val = self["value"]
         if isinstance(val, str):
-            yield "'" + val + "'"
+            yield "'" + val.replace("'", "''") + "'"
         elif val is None:
             yield "NULL"
         else:
             yield str(val)
 
 
+class Param(AstBase):
+    # DBAPI paramstyle -> placeholder
+    PLACEHOLDERS = {
+        "qmark": "?",
+        "format": "%s",
+        "numeric": ":{}",
+        "named": ":{}",
+        "pyformat": "%({})s",
+        "dollar": "${}",
+    }
+
+    def __init__(self, name: str = None, style: str = "qmark", alias: str = None):
+        self["type"] = "param"
+        self["name"] = name
+        self["style"] = style
+        self["alias"] = alias
+
+    @classmethod
+    def from_placeholder(cls, text: str):
+        if text == "?":
+            return cls(None, "qmark")
+        elif text == "%s":
+            return cls(None, "format")
+        elif text.startswith("%("):
+            return cls(text[2:-2], "pyformat")
+        elif text.startswith("$"):
+            return cls(text[1:], "dollar")
+        elif text[1:].isdigit():
+            return cls(text[1:], "numeric")
+        else:
+            return cls(text[1:], "named")
+
+    def tokens(self):
+        yield self.PLACEHOLDERS[self["style"]].format(self["name"])
+
+
 class SelectStatement(AstBase):
     def __init__(
         self,
@@ -204,12 +342,14 @@ class SelectStatement(AstBase):
         window: Expressions = None,
         limit: Expressions = None,
         offset: Expressions = None,
-        unions: "Expressions[UnionStatement]" = None,
+        unions: "UnionStatement" = None,
+        with_: "WithClause" = None,
     ):
         dic = locals()
         self["type"] = "SELECT"
 
         for key in {
+            "with_",
             "returning",
             "from_",
             "joins",
@@ -227,6 +367,9 @@ class SelectStatement(AstBase):
                 self[key] = val
 
     def tokens(self):
+        if self.get("with_", None):
+            yield to_sql(self["with_"])
+
         yield "SELECT"
         yield to_sql(self["returning"])
 
@@ -269,6 +412,33 @@ class SelectStatement(AstBase):
             yield to_sql(self["unions"])
 
 
+class WithClause(AstBase):
+    def __init__(self, ctes: "Expressions[CommonTableExpression]", recursive=False):
+        self["type"] = "with"
+        self["recursive"] = recursive
+        self["ctes"] = ctes
+
+    def tokens(self):
+        yield "WITH RECURSIVE" if self["recursive"] else "WITH"
+        yield to_sql(self["ctes"])
+
+
+class CommonTableExpression(AstBase):
+    def __init__(self, name: str, select, columns: List[str] = None):
+        self["type"] = "cte"
+        self["name"] = name
+        self["columns"] = columns
+        self["select"] = select
+
+    def tokens(self):
+        name = Name.get_name(self["name"])
+        if self["columns"]:
+            name += "(" + ", ".join(Name.get_name(x) for x in self["columns"]) + ")"
+        yield name
+        yield "AS"
+        yield "(" + to_sql(self["select"]) + ")"
+
+
 class JoinStatement(AstBase):
     def __init__(self, join_type: str, from_, on=None, using=None):
         self["type"] = "join"
@@ -1,26 +1,36 @@
-import os
-from typing import Literal
+from functools import lru_cache, partial
+from typing import Literal, Optional
 
 from lark import Lark, Transformer, v_args
-
+from lark.exceptions import UnexpectedEOF, VisitError
+
+from .dialects import Dialect, get_grammar, validate_dialect
+from .limits import (
+    Budget,
+    Limits,
+    check_input,
+    current_budget,
+    install_hooks,
+    set_eof_position,
+)
+from .precedence import ExpressionError, Operator, normalize_op, parse_expression
 from .tokens import (
-    BinaryOperator,
     Bracket,
     Column,
+    CommonTableExpression,
     Expressions,
     Func,
     Identifier,
     JoinStatement,
-    Postfix,
+    Param,
     Prefix,
     SelectStatement,
     Table,
     UnionStatement,
     Value,
+    WithClause,
 )
 
-path = os.path.dirname(__file__)
-
 
 def Node(name, arr):
     return (name, arr)
@@ -37,14 +47,12 @@ class CommonTransformer(Transformer):
     float = v_args(inline=True)(float)
     null = lambda self, _: None
     STAR = str
-    BOPS = v_args(inline=True)(str)
-    SIGN = v_args(inline=True)(str)
 
     def RESERVED_WORDS(self, tree):
         raise NotImplementedError(f"Invalid syntax: {str(tree)}")
 
     def STRING_LITERAL(self, s):
-        return s[1:-1]
+        return s[1:-1].replace("''", "'")
 
     def str(self, strings):
         return "".join(strings)
@@ -52,15 +60,23 @@ class CommonTransformer(Transformer):
     @v_args(inline=True)
     def NAME(self, s):
         if s[0] == '"' and s[len(s) - 1] == '"':
-            s = s[1 : len(s) - 2]
+            s = s[1 : len(s) - 1]
             return s
         else:
             return str(s)
 
+    @v_args(inline=True)
+    def FUNC_NAME(self, s):
+        return self.NAME(s)
+
     @v_args(inline=True)
     def alias_string(self, s):
         return self.NAME(s)
 
+    @v_args(inline=True)
+    def param(self, s):
+        return Param.from_placeholder(str(s))
+
     def identifier(self, tree):
         schema_or_table, name = tree
         return Identifier(name=name, parent=schema_or_table)
@@ -83,11 +99,35 @@ class CommonTransformer(Transformer):
     def ASC_OR_DESC(self, tree):
         return str(tree).upper()
 
-    def sign_expr(self, tree):
-        return Postfix(op=tree[0], expr=Expressions(tree[1]))
+    def BOPS(self, token):
+        return Operator("infix", normalize_op(token))
+
+    def SIGN(self, token):
+        return Operator("prefix", normalize_op(token))
+
+    def between_op(self, tree):
+        return Operator("between", normalize_op(" ".join(x for x in tree if x)))
 
-    def bo_expr(self, tree):
-        return BinaryOperator(op=tree[1], expr=Expressions(tree[0], tree[2]))
+    def not_like_op(self, tree):
+        return Operator("infix", normalize_op(" ".join(tree)))
+
+    def in_op(self, tree):
+        not_, *expr = tree
+        if len(expr) == 1 and isinstance(expr[0], Bracket):
+            # IN (SELECT ...)
+            arg = expr[0]
+        else:
+            arg = Bracket(Expressions(*expr))
+        return Operator("in", "NOT IN" if not_ else "IN", arg)
+
+    def postfix_op(self, tree):
+        return Operator("postfix", str(tree[0]))
+
+    def chain(self, tree):
+        return parse_expression(tree)
+
+    def subquery(self, tree):
+        return Bracket(Expressions(tree[0]))
 
     def expr(self, tree):
         return tree
@@ -106,6 +146,9 @@ class CommonTransformer(Transformer):
         else:
             raise RuntimeError()
 
+        if not isinstance(obj, dict):
+            obj = Value(obj)
+
         obj["is_asc"] = is_asc
         return obj
 
@@ -160,13 +203,28 @@ class SelectTransformer(CommonTransformer):
     def join_stmts(self, tree):
         return Node("JOIN", Expressions(*tree))
 
+    def with_stmt(self, tree):
+        recursive, *ctes = tree
+        return Node("WITH", WithClause(Expressions(*ctes), recursive is not None))
+
+    def cte(self, tree):
+        name, columns, select = tree
+        return CommonTableExpression(name, select, columns)
+
+    def cte_columns(self, tree):
+        return list(tree)
+
     def _union_stmt(self, union_name, tree):
-        return Node(union_name, Expressions(*tree))
+        quantifier, select = tree
+        if quantifier is not None and quantifier.upper() == "ALL":
+            union_name += " ALL"
+        return Node("UNION", UnionStatement(union_name, Expressions(select)))
 
     def select(self, tree):
-        returning_stmt, query_stmt, orderby_stmt, union_stmt = tree
+        with_stmt, returning_stmt, query_stmt, orderby_stmt, union_stmt = tree
         # evalute order
         dic = {
+            "WITH": [],
             "FROM": [],
             "JOIN": [],
             "WHERE": [],
@@ -178,8 +236,6 @@ class SelectTransformer(CommonTransformer):
             "LIMIT": [],
             "OFFSET": [],
             "UNION": [],
-            "INTERSECT": [],
-            "EXCEPT": [],
         }
 
         if query_stmt is None:
@@ -194,26 +250,9 @@ class SelectTransformer(CommonTransformer):
                 except KeyError:
                     raise
 
-        for stmt in orderby_stmt or []:
-            dic[stmt[0]].append(stmt[1])
-
-        for stmt in union_stmt or []:
-            dic[stmt[0]].append(stmt[1])
-
-        u1 = dic.pop("UNION", None)
-        u2 = dic.pop("INTERSECT", None)
-        u3 = dic.pop("EXCEPT", None)
-
-        if u1:
-            dic.setdefault("unions", Expressions()).append(UnionStatement("UNION", u1))
-
-        if u2:
-            dic.setdefault("unions", Expressions()).append(
-                UnionStatement("INTERSECT", u2)
-            )
-
-        if u3:
-            dic.setdefault("unions", Expressions()).append(UnionStatement("EXCEPT", u3))
+        for stmt in (with_stmt, orderby_stmt, union_stmt):
+            if stmt is not None:
+                dic[stmt[0]].append(stmt[1])
 
         for values in dic.values():
             if len(values) > 1:
@@ -221,6 +260,8 @@ class SelectTransformer(CommonTransformer):
 
         dic["from_"] = dic.pop("FROM")
         dic["joins"] = dic.pop("JOIN")
+        dic["unions"] = dic.pop("UNION")
+        dic["with_"] = dic.pop("WITH")
 
         stmt = {**{k.lower(): v[0] for k, v in dic.items() if len(v) == 1}}
 
@@ -231,26 +272,122 @@ class SqlTransformer(SelectTransformer):
     ...
 
 
+def create_lark(
+    start: str = "start",
+    parser_type: str = "earley",
+    dialect: Optional[Dialect] = None,
+) -> Lark:
+    # lalr は解析表をキャッシュファイルに保存し、次回以降のプロセスで読み込む
+    options = {"cache": True} if parser_type == "lalr" else {}
+    return Lark(get_grammar(dialect), start=start, parser=parser_type, **options)
+
+
+def create_limited_lark(
+    start: str = "start",
+    parser_type: str = "earley",
+    dialect: Optional[Dialect] = None,
+) -> Lark:
+    # 制限の hook は lark の内部を置き換えるため、制限のない parser とは共有しない
+    lark = create_lark(start, parser_type, dialect)
+    install_hooks(lark)
+    return lark
+
+
+# 方言ごとの解析表は初回使用時に構築し、プロセス内で共有する
+load_lark = lru_cache(maxsize=None)(create_lark)
+load_limited_lark = lru_cache(maxsize=None)(create_limited_lark)
+
+
 def get_parser(
     start: Literal["start", "value", "stmt", "expr"] = "start",
     cls_transformer=SqlTransformer,
-    parser_type: Literal["earley", "lalr"] = "earley",
+    parser_type: Literal["earley", "lalr", "native"] = "earley",
+    dialect: Optional[Dialect] = None,
+    limits: Optional[Limits] = None,
+    shared: bool = True,
 ):
-    with open(path + "/grammer2.lark") as grammer:
-        parser = Lark(grammer.read(), start=start, parser=parser_type)
+    """Build a parse function.
+
+    With ``shared=True`` the Lark instance is shared by every parser with the
+    same grammar; parsers with ``limits`` share another one that has the
+    limit hooks. With ``shared=False`` the parser builds its own Lark
+    instance on first use. Each returned function owns its transformer, so
+    use one per thread (see ``ParserPool``) for concurrent parsing.
+    """
+    validate_dialect(dialect)
+
+    if parser_type == "native":
+        return get_native_parser(start, cls_transformer, dialect, limits)
+
+    if limits is None:
+        create, load = create_lark, load_lark
+    else:
+        create, load = create_limited_lark, load_limited_lark
+
+    if shared:
+        get_lark = partial(load, start, parser_type, dialect)
+    else:
+        get_lark = lru_cache(maxsize=None)(partial(create, start, parser_type, dialect))
+
+    if limits is None:
+
+        def parse_tree(text: str):
+            try:
+                return get_lark().parse(text)
+            except UnexpectedEOF as e:
+                raise set_eof_position(e, text)
+
+    else:
+
+        def parse_tree(text: str):
+            check_input(text, limits)
+            lark = get_lark()
+            token = current_budget.set(Budget(text, limits))
+            try:
+                return lark.parse(text)
+            except UnexpectedEOF as e:
+                raise set_eof_position(e, text)
+            finally:
+                current_budget.reset(token)
+
+    if cls_transformer is None:
+        return parse_tree
+
+    else:
+        transformer = cls_transformer()
+
+        def parse(text: str):
+            tree = parse_tree(text)
+            try:
+                result = transformer.transform(tree)
+            except VisitError as e:
+                # native と同じ例外を送出する
+                if isinstance(e.orig_exc, ExpressionError):
+                    raise e.orig_exc from None
+                raise
+            return result
 
-        if cls_transformer is None:
+        return parse
 
-            def parse(text: str):
-                tree = parser.parse(text)
-                return tree
 
-        else:
-            transformer = cls_transformer()
+def get_native_parser(
+    start: str = "start",
+    cls_transformer=SqlTransformer,
+    dialect: Optional[Dialect] = None,
+    limits: Optional[Limits] = None,
+):
+    # 手書きの再帰下降パーサ。SqlTransformer と同じ木を直接構築する
+    from .native import parse as parse_native
 
-            def parse(text: str):
-                tree = parser.parse(text)
-                result = transformer.transform(tree)
-                return result
+    if cls_transformer is not SqlTransformer:
+        raise ValueError("The native parser only builds SqlTransformer trees.")
+    if start not in ("start", "stmt", "expr"):
+        raise ValueError(f"Unsupported start for the native parser: {start}")
 
-        return parse
+    def parse(text: str):
+        if limits is not None:
+            # 線形時間で解析するため、timeout と max_steps は使用しない
+            check_input(text, limits)
+        return parse_native(text, start, dialect)
+
+    return parse
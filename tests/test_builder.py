@@ -0,0 +1,149 @@
+import pytest
+
+from sqlcommon import get_parser
+from sqlcommon.builder import (
+    Alias,
+    Desc,
+    InnerJoin,
+    Join,
+    LeftJoin,
+    Select,
+    and_,
+    func,
+    merge_items,
+    op,
+    or_,
+)
+from sqlcommon.tokens import Value
+
+
+@pytest.fixture(scope="session")
+def parser():
+    return get_parser(start="stmt")
+
+
+def test_merge_items():
+    items = list(merge_items(("a", Alias("b", "c")), {"d": "t.e"}))
+    assert [(x["name"], x["parent"], x["alias"]) for x in items] == [
+        ("a", None, None),
+        ("b", None, "c"),
+        ("e", "t", "d"),
+    ]
+
+
+@pytest.mark.parametrize(
+    "builder, sql",
+    [
+        (Select(1), "select 1"),
+        (Select("*").From("users"), "select * from users"),
+        (
+            Select("u.id", n="u.name").From(u="users"),
+            "select u.id, u.name as n from users u",
+        ),
+        (
+            Select("*").From("users").Where(op("=", "id", 1), op(">", "age", 20)),
+            "select * from users where id = 1 and age > 20",
+        ),
+        (
+            Select("*")
+            .From("users")
+            .Where(or_(op("=", "id", 1), op("=", "id", 2)), op(">", "age", 20)),
+            "select * from users where (id = 1 or id = 2) and age > 20",
+        ),
+        (
+            Select("*")
+            .From("users1")
+            .Join(Join("users2").On(op("=", "users1.id", "users2.id"))),
+            "select * from users1 join users2 on users1.id = users2.id",
+        ),
+        (
+            Select("*").From("users1").Join(LeftJoin("users2").Using("id", "name")),
+            "select * from users1 left join users2 using(id, name)",
+        ),
+        (
+            Select("a", total=func("sum", "b")).From("t").GroupBy("a"),
+            "select a, sum(b) as total from t group by a",
+        ),
+        (
+            Select("a").From("t").Limit(10).Offset(5).OrderBy(Desc("a"), "b"),
+            "select a from t limit 10 offset 5 order by a desc, b",
+        ),
+        (
+            Select("a").From("t").Union(Select("b").From("u"), union_all=True),
+            "select a from t union all select b from u",
+        ),
+        (
+            Select("a")
+            .From("t")
+            .Union(Select("b").From("u"))
+            .Except(Select("c").From("v")),
+            "select a from t union select b from u except select c from v",
+        ),
+        (
+            # 集合演算を持つ SELECT に連結しても、その集合演算は残る
+            Select("a")
+            .From("t")
+            .Union(Select("b").From("u").Union(Select("c").From("v"), union_all=True))
+            .Except(Select("d").From("w")),
+            "select a from t union select b from u union all select c from v"
+            " except select d from w",
+        ),
+    ],
+)
+def test_equals_parser(parser, builder, sql):
+    assert builder.build() == parser(sql)
+    assert builder.to_sql() == parser(sql).to_sql()
+
+
+def test_to_sql():
+    stmt = (
+        Select("u.id", total=func("sum", "o.price"))
+        .From(u="users")
+        .Join(InnerJoin(o="orders").On(op("=", "u.id", "o.user_id")))
+        .Where(and_(op("=", "u.name", Value("x")), op(">", "o.price", 0)))
+        .GroupBy("u.id")
+        .OrderBy(Desc("total"))
+        .Limit(10)
+    )
+    assert stmt.to_sql() == (
+        "SELECT u.id, sum(o.price) AS total FROM users AS u"
+        " INNER JOIN orders AS o ON u.id = o.user_id"
+        " GROUP BY u.id WHERE u.name = 'x' AND o.price > 0"
+        " ORDER BY total DESC LIMIT 10"
+    )
+
+
+def test_where():
+    stmt = Select("*").From("t").Where(or_(op("=", "a", 1), op("=", "a", 2)), "b")
+    assert stmt.to_sql() == "SELECT * FROM t WHERE (a = 1 OR a = 2) AND b"
+
+
+def test_where_requires_condition():
+    with pytest.raises(ValueError, match="Where"):
+        Select("*").From("t").Where()
+    with pytest.raises(ValueError, match="Having"):
+        Select("*").From("t").GroupBy("a").Having()
+    with pytest.raises(ValueError, match="and_"):
+        and_()
+
+
+def test_union_keeps_operands(parser):
+    # 渡された SELECT の木は変更しない
+    inner = parser("select b from u union select c from v")
+    expected = inner.to_sql()
+    first = Select("a").From("t").Union(inner).Except(Select("d").From("w"))
+    second = Select("a").From("t").Union(inner).Intersect(Select("e").From("x"))
+    assert first.to_sql() == (
+        "SELECT a FROM t UNION SELECT b FROM u UNION SELECT c FROM v"
+        " EXCEPT SELECT d FROM w"
+    )
+    assert second.build() == parser(
+        "select a from t union select b from u union select c from v"
+        " intersect select e from x"
+    )
+    assert inner.to_sql() == expected
+
+
+def test_join_requires_condition():
+    with pytest.raises(ValueError, match="On"):
+        Select("*").From("a").Join(Join("b")).build()
@@ -0,0 +1,119 @@
+import pytest
+
+from sqlcommon import get_parser
+from sqlcommon.complexity import (
+    AdmissionGate,
+    Complexity,
+    CostWeights,
+    Thresholds,
+    analyze,
+)
+
+
+@pytest.fixture(scope="session")
+def parser():
+    return get_parser(parser_type="native")
+
+
+@pytest.mark.parametrize(
+    "sql, expected",
+    [
+        ("select 1", dict(missing_limit=True, nodes=2)),
+        ("select a from t limit 10", dict(nodes=3)),
+        (
+            "select a from t, u join v on t.a = v.a left join w using (a) limit 1",
+            dict(joins=3, predicates=1),
+        ),
+        (
+            "select a from t union select a from u union all select a from v limit 5",
+            dict(unions=2),
+        ),
+        (
+            "select a from t where a not in (select b from u where b in"
+            " (select c from v)) limit 1",
+            dict(subqueries=2, subquery_depth=2, predicates=2),
+        ),
+        (
+            "select (select max(a) from u) from (select a from t) x limit 1",
+            dict(subqueries=2, subquery_depth=1),
+        ),
+        (
+            "with x as (select a from t), y as (select a from x where a in"
+            " (select b from u)) select a from y limit 1",
+            dict(subqueries=3, subquery_depth=2, predicates=1),
+        ),
+        (
+            "select a from t where a in (1, 2, 3) and b in () and c between 1 and 2"
+            " and d like 'x%' and e is null or f <> 1 limit 1",
+            dict(predicates=6, in_lists=[3, 0]),
+        ),
+    ],
+)
+def test_analyze(parser, sql, expected):
+    result = analyze(parser(sql))
+    for key, value in expected.items():
+        if key == "in_lists":
+            assert sorted(getattr(result, key)) == sorted(value)
+        else:
+            assert getattr(result, key) == value, key
+    for key in ("joins", "unions", "subqueries", "subquery_depth", "predicates"):
+        if key not in expected:
+            assert getattr(result, key) == 0, key
+
+
+def test_analyze_earley_tree():
+    sql = "select a from t join u on t.a = u.a where b in (1, 2) limit 1"
+    assert analyze(get_parser()(sql)) == analyze(get_parser(parser_type="native")(sql))
+
+
+def test_analyze_long_chain(parser):
+    sql = "select a from t where " + " and ".join(f"c{i} = {i}" for i in range(5000))
+    result = analyze(parser(sql))
+    assert result.predicates == 5000
+
+
+def test_score():
+    c = Complexity(
+        joins=2, unions=1, subqueries=1, subquery_depth=1, predicates=3, in_lists=[10]
+    )
+    assert CostWeights().score(c) == 20 + 5 + 5 + 10 + 3 + 1
+    assert (
+        CostWeights(joins=0, missing_limit=100).score(
+            Complexity(joins=5, missing_limit=True)
+        )
+        == 100
+    )
+
+
+def test_thresholds():
+    c = Complexity(joins=3, in_lists=[5, 200], missing_limit=True)
+    assert Thresholds().exceeded(c, 1000) == []
+    assert Thresholds(max_joins=3, max_in_list=200).exceeded(c, 0) == []
+    assert Thresholds(max_joins=2, max_in_list=100, require_limit=True).exceeded(
+        c, 0
+    ) == [
+        "max_joins exceeded: 3 > 2",
+        "max_in_list exceeded: 200 > 100",
+        "LIMIT is required",
+    ]
+
+
+def test_gate(parser):
+    gate = AdmissionGate(
+        queue=Thresholds(max_cost=15),
+        reject=Thresholds(max_joins=3, require_limit=True),
+    )
+
+    decision = gate.decide(parser("select a from t limit 1"))
+    assert decision.action == "accept"
+    assert decision.reasons == []
+
+    decision = gate.decide(parser("select a from t, u, v limit 1"))
+    assert decision.action == "queue"
+    assert decision.cost == 20
+    assert decision.reasons == ["max_cost exceeded: 20.0 > 15"]
+
+    decision = gate.decide(parser("select a from t"))
+    assert decision.action == "reject"
+    assert decision.reasons == ["LIMIT is required"]
+    assert decision.complexity.missing_limit
@@ -0,0 +1,79 @@
+import pytest
+from lark.exceptions import UnexpectedInput
+
+from sqlcommon import get_parser
+from sqlcommon.dialects import get_reserved_words
+from sqlcommon.transformer import load_lark
+
+
+@pytest.fixture(scope="session")
+def pg_parser():
+    return get_parser(dialect="postgresql")
+
+
+@pytest.fixture(scope="session")
+def ansi_parser():
+    return get_parser(dialect="sql2016")
+
+
+def test_unknown_dialect():
+    with pytest.raises(ValueError, match="Unknown dialect"):
+        get_parser(dialect="oracle")
+
+
+def test_reserved_words():
+    assert "SELECT" in get_reserved_words("postgresql")
+    assert "LIMIT" in get_reserved_words("postgresql")
+    assert "LIMIT" not in get_reserved_words("sql2016")
+    assert "COUNT" in get_reserved_words("sql2016")
+    assert "COUNT" not in get_reserved_words("postgresql")
+
+
+def test_lazy_load():
+    load_lark.cache_clear()
+    parse = get_parser(dialect="sql92")
+    assert load_lark.cache_info().currsize == 0
+    parse("select 1")
+    assert load_lark.cache_info().currsize == 1
+    parse("select 2")
+    assert load_lark.cache_info().hits == 1
+
+
+@pytest.mark.parametrize(
+    "sql, expect",
+    [
+        ("select a from t where a ~* 'x'", "SELECT a FROM t WHERE a ~* 'x'"),
+        ("select a from t where a ilike 'x'", "SELECT a FROM t WHERE a ILIKE 'x'"),
+        ("select null", "SELECT NULL"),
+        ("select count(*) from t", "SELECT count(*) FROM t"),
+    ],
+)
+def test_postgresql(pg_parser, sql, expect):
+    assert pg_parser(sql).to_sql() == expect
+
+
+@pytest.mark.parametrize(
+    "sql, expect",
+    [
+        ("select a from t where a = 'x'", "SELECT a FROM t WHERE a = 'x'"),
+        ("select limit", "SELECT limit"),
+        ("select count(*) from t", "SELECT count(*) FROM t"),
+        ("select a from t where a ~* 'x'", UnexpectedInput),
+    ],
+)
+def test_sql2016(ansi_parser, sql, expect):
+    if isinstance(expect, type):
+        with pytest.raises(expect):
+            ansi_parser(sql)
+    else:
+        assert ansi_parser(sql).to_sql() == expect
+
+
+@pytest.mark.parametrize(
+    "dialect, keyword",
+    [("postgresql", "limit"), ("sql2016", "count"), ("sql92", "select")],
+)
+def test_keywords(dialect, keyword):
+    parser = get_parser(dialect=dialect)
+    with pytest.raises(Exception, match="Invalid syntax"):
+        parser(f"select {keyword}")
@@ -0,0 +1,128 @@
+import pytest
+
+from sqlcommon import get_parser
+from sqlcommon.diff import DIGEST_SIZE, Edit, diff, subtree_hashes
+
+
+@pytest.fixture(scope="session")
+def parser():
+    return get_parser(parser_type="native")
+
+
+def edits(parser, old, new):
+    return [str(x) for x in diff(parser(old), parser(new))]
+
+
+def test_identical(parser):
+    sql = "select a, f(b) from t join u on t.id = u.id where c in (1, 2) limit 1"
+    assert diff(parser(sql), parser(sql)) == []
+    # 木の key の順序が異なっても同じ木とみなす
+    assert diff(parser(sql), get_parser()(sql)) == []
+
+
+def test_literal_changed(parser):
+    [edit] = diff(
+        parser("select a from t where x = 1"), parser("select a from t where x = 2")
+    )
+    assert edit == Edit("changed", ("where", "expr", 1), 1, 2)
+    assert edits(parser, "select 'a'", "select 'b'") == [
+        "changed returning.0: 'a' -> 'b'"
+    ]
+    assert edits(parser, "select 1", "select 1.0") == ["changed returning.0: 1 -> 1.0"]
+
+
+def test_renamed(parser):
+    assert edits(parser, "select a from t", "select a from s.t") == [
+        "renamed from_.0: 't' -> 's.t'"
+    ]
+    assert edits(parser, "select f(a) as x from t", "select g(a) as y from t") == [
+        "renamed returning.0: 'f' -> 'g'",
+        "changed returning.0.alias: 'x' -> 'y'",
+    ]
+
+
+def test_clauses(parser):
+    assert edits(parser, "select a from t", "select a from t where b = 1 limit 5") == [
+        "added where: b = 1",
+        "added limit: 5",
+    ]
+    assert edits(
+        parser,
+        "select a from t join u on t.a = u.a where b = 1",
+        "select a from t union select 1",
+    ) == [
+        "removed joins: INNER JOIN u ON t.a = u.a",
+        "removed where: b = 1",
+        "added unions: UNION SELECT 1",
+    ]
+
+
+def test_list_alignment(parser):
+    assert edits(parser, "select a, b, c from t", "select a, x, b, c from t") == [
+        "added returning.1: x"
+    ]
+    assert edits(parser, "select a, b, c from t", "select a, c from t") == [
+        "removed returning.1: b"
+    ]
+    assert (
+        edits(
+            parser,
+            "select a from t where a in (1, 2, 3)",
+            "select a from t where a in (1, 5, 3)",
+        )
+        == ["changed where.expr.1.expr.1: 2 -> 5"]
+    )
+
+
+def test_replaced(parser):
+    assert edits(
+        parser, "select a from t where b = 1", "select a from t where b = 1 + 1"
+    ) == ["replaced where.expr.1: 1 -> 1 + 1"]
+    assert edits(parser, "select a", "select f(a)") == [
+        "replaced returning.0: a -> f(a)"
+    ]
+
+
+def test_long_chain(parser):
+    def chain(changed):
+        return "select a from t where " + " and ".join(
+            f"c{i} = {i + 1 if i == changed else i}" for i in range(3000)
+        )
+
+    [edit] = diff(parser(chain(None)), parser(chain(5)))
+    assert edit.kind == "changed"
+    assert (edit.old, edit.new) == (5, 6)
+    assert len(edit.path) > 3000
+
+
+def test_subtree_hashes(parser):
+    stmt = parser("select a, a from t where a = a")
+    hashes = subtree_hashes(stmt)
+    first, second = stmt["returning"]
+    assert hashes[id(first)] == hashes[id(second)]
+    assert hashes[id(stmt["where"]["expr"][0])] != hashes[id(first)]  # is_item
+
+
+def test_digests(parser):
+    # 1, 1.0, True と '1' は区別する
+    stmts = [parser(f"select {x}") for x in ("1", "1.0", "true", "'1'")]
+    digests = {subtree_hashes(x)[id(x)] for x in stmts}
+    assert len(digests) == 4
+    assert {len(x) for x in digests} == {DIGEST_SIZE}
+
+
+def test_long_lists(parser):
+    def columns(names):
+        return "select " + ", ".join(names) + " from t"
+
+    names = [f"c{i}" for i in range(2000)]
+    # 共通の先頭と末尾を除けば、挿入は一つの追加になる
+    [edit] = diff(
+        parser(columns(names)), parser(columns(names[:1000] + ["x"] + names[1000:]))
+    )
+    assert str(edit) == "added returning.1000: x"
+    # 長い差分は位置で対応付ける
+    renamed = names[:1] + [f"d{i}" for i in range(1, 1999)] + names[-1:]
+    result = diff(parser(columns(names)), parser(columns(renamed)))
+    assert len(result) == 1998
+    assert {x.kind for x in result} == {"renamed"}
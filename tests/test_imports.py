@@ -0,0 +1,54 @@
+import subprocess
+import sys
+
+import pytest
+
+
+def run(code: str) -> str:
+    # 既に import 済みのモジュールの影響を受けないよう、別プロセスで確かめる
+    return subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    ).stdout.strip()
+
+
+@pytest.mark.parametrize(
+    "module",
+    [
+        "sqlcommon",
+        "sqlcommon.tokens",
+        "sqlcommon.builder",
+        "sqlcommon.template",
+        "sqlcommon.limits",
+        "sqlcommon.native",
+        "sqlcommon.kvjson",
+        "sqlcommon.memory",
+    ],
+)
+def test_lark_is_not_imported(module):
+    assert run(f"import sys, {module}; print('lark' in sys.modules)") == "False"
+
+
+def test_get_parser_is_lazy():
+    code = (
+        "import sys, sqlcommon; from sqlcommon import get_parser;"
+        " print('lark' in sys.modules, get_parser is sqlcommon.transformer.get_parser)"
+    )
+    assert run(code) == "True True"
+
+
+def test_native_without_lark():
+    code = (
+        "import sys; from sqlcommon.native import parse;"
+        " print(parse('select a from t').to_sql(), 'lark' in sys.modules)"
+    )
+    assert run(code) == "SELECT a FROM t False"
+
+
+def test_kvjson_grammar_is_lazy():
+    code = (
+        "from sqlcommon import kvjson;"
+        " print(kvjson.load_json_lark.cache_info().currsize);"
+        " kvjson.json_parser;"
+        " print(kvjson.load_json_lark.cache_info().currsize)"
+    )
+    assert run(code) == "0\n1"
@@ -0,0 +1,77 @@
+import io
+import json
+
+import pytest
+from lark.exceptions import UnexpectedInput
+
+from sqlcommon.kvjson import KeyValue, iter_array, parse, parse_many
+
+DOCS = [
+    "1",
+    "-1.5e3",
+    '"a"',
+    '"a\\"b\\\\c\\n\\u3042"',
+    "true",
+    "false",
+    "null",
+    "[]",
+    "{}",
+    "[1, [2, []], {}]",
+    '{"a": {"b": [1, "x", null]}, "c": "}]>,"}',
+]
+
+
+@pytest.mark.parametrize("text", DOCS)
+def test_same_as_json(text):
+    assert parse(text) == json.loads(text)
+
+
+def test_key_value():
+    assert parse('<"key": [1, 2]>') == KeyValue("key", [1.0, 2.0])
+    assert parse('[<"a": 1>, <"b": <"c": null>>]') == [
+        KeyValue("a", 1.0),
+        KeyValue("b", KeyValue("c", None)),
+    ]
+
+
+@pytest.mark.parametrize("text", ["[1,]", "{", '{"a" 1}', "<1>"])
+def test_syntax_error(text):
+    with pytest.raises(UnexpectedInput):
+        parse(text)
+
+
+def test_parse_many():
+    assert parse_many(DOCS) == [json.loads(x) for x in DOCS]
+
+
+ARRAY = '[1, "a,]\\"", [2, [3]], {"b": [4, 5]}, <"c": [6, 7]>, null]'
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 1000])
+def test_iter_array(chunk_size):
+    assert list(iter_array(ARRAY, chunk_size)) == parse(ARRAY)
+
+
+def test_iter_array_file():
+    assert list(iter_array(io.StringIO(ARRAY), 5)) == parse(ARRAY)
+    assert list(iter_array(["  [", "]  "])) == []
+
+
+def test_iter_array_is_lazy():
+    # 配列が閉じる前に、完了した要素から順に返す
+    items = iter_array(iter(["[1, 2", ", 3"]))
+    assert next(items) == 1
+    assert next(items) == 2
+    with pytest.raises(ValueError):
+        list(items)
+
+
+@pytest.mark.parametrize("text", ["{}", "[1] 2", "[1, [2]"])
+def test_iter_array_error(text):
+    with pytest.raises(ValueError):
+        list(iter_array(text))
+
+
+def test_iter_array_element_error():
+    with pytest.raises(UnexpectedInput):
+        list(iter_array("[1, , 2]"))
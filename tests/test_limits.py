@@ -0,0 +1,138 @@
+import pytest
+from lark.exceptions import UnexpectedInput
+
+from sqlcommon import get_parser
+from sqlcommon import limits as limits_module
+from sqlcommon.limits import Limits, ParseLimitError
+
+
+def chain(n: int, op: str = "and"):
+    return "select a from t where " + f" {op} ".join(f"c{i} = {i}" for i in range(n))
+
+
+@pytest.fixture(scope="session")
+def parser():
+    return get_parser(limits=Limits())
+
+
+@pytest.fixture(scope="session")
+def warm(parser):
+    parser("select 1")
+
+
+def test_valid(parser):
+    assert parser("select a from t where a = 1").to_sql() == (
+        "SELECT a FROM t WHERE a = 1"
+    )
+
+
+@pytest.mark.parametrize(
+    "limits, sql, reason, pos",
+    [
+        (Limits(max_length=10), "select a from t", "max_length", 10),
+        (Limits(max_tokens=3), "select a, b from t", "max_tokens", 10),
+        (Limits(max_depth=2), "select (((1)))", "max_depth", 9),
+        (Limits(max_operators=2), "select 1 + 2 + 3 - 4", "max_operators", 17),
+        (Limits(max_operators=2), "select 1 + 2, 3 + (4 + 5)", None, None),
+        (Limits(max_operators=3), "select a from t where a = 1 or b = 2", None, None),
+        (Limits(max_operators=2), "select 'a + b + c + d'", None, None),
+        (Limits(max_operators=2), "select 1 /* + + + */", None, None),
+    ],
+)
+def test_check_input(limits, sql, reason, pos):
+    parser = get_parser(limits=limits, cls_transformer=None)
+    if reason is None:
+        parser(sql)
+    else:
+        with pytest.raises(ParseLimitError) as e:
+            parser(sql)
+        assert e.value.reason == reason
+        assert e.value.pos == pos
+
+
+def test_error_position():
+    parser = get_parser(limits=Limits(max_operators=1))
+    with pytest.raises(ParseLimitError) as e:
+        parser("select a\nfrom t\nwhere a = 1 and b = 2")
+    assert (e.value.line, e.value.column) == (3, 13)
+
+
+@pytest.mark.parametrize(
+    "sql",
+    [
+        chain(200),
+        chain(200, "+"),
+        "select " + "- " * 1000 + "1",
+        "select " + "not " * 1000 + "1",
+        "select " + "(" * 1000 + "1" + ")" * 1000,
+        "select a from t where " + "a = 1 and " * 5000,
+        "select " + "a, " * 50000 + "a",
+    ],
+)
+def test_reject_fast(parser, warm, sql):
+    # 解析を始める前の線形時間の検査で拒否する
+    with pytest.raises(ParseLimitError) as e:
+        parser(sql)
+    assert e.value.reason in ("max_length", "max_tokens", "max_operators", "max_depth")
+
+
+def test_timeout(warm, monkeypatch):
+    # 呼ばれるたびに 0.01 秒進む時計
+    now = iter(range(1_000_000))
+    monkeypatch.setattr(limits_module, "clock", lambda: next(now) / 100)
+    parser = get_parser(limits=Limits(max_operators=None, timeout=0.1))
+    with pytest.raises(ParseLimitError) as e:
+        parser(chain(60))
+    assert e.value.reason == "timeout"
+    assert 0 < e.value.pos <= len(chain(60))
+    assert e.value.value <= 0.2
+
+
+def test_max_steps(warm):
+    parser = get_parser(limits=Limits(max_operators=None, max_steps=1000))
+    with pytest.raises(ParseLimitError) as e:
+        parser(chain(10))
+    assert e.value.reason == "max_steps"
+
+
+def test_budget_is_per_parser(warm):
+    limited = get_parser(limits=Limits(max_operators=None, max_steps=1000))
+    unlimited = get_parser()
+    with pytest.raises(ParseLimitError):
+        limited(chain(10))
+    assert unlimited(chain(10))
+
+
+@pytest.mark.parametrize(
+    "sql",
+    [
+        "select a from t where a = ",
+        "select a from t where (a = 1",
+        "select a from t where a = 'x",
+        "select a from t wher a = 1",
+    ],
+)
+def test_syntax_error(warm, sql):
+    # 構文誤りは少ない手数で報告される
+    parser = get_parser(limits=Limits(timeout=None, max_steps=5000))
+    with pytest.raises(UnexpectedInput) as e:
+        parser(sql)
+    assert e.value.column > 0
+
+
+def test_shared_lark_is_not_hooked(warm):
+    from sqlcommon.transformer import load_lark, load_limited_lark
+
+    assert not hasattr(
+        load_lark("start", "earley", None).parser.parser, "_budget_hooks"
+    )
+    assert load_limited_lark("start", "earley", None).parser.parser._budget_hooks
+
+
+def test_unsupported_lark():
+    from sqlcommon.transformer import create_lark
+
+    lark = create_lark()
+    del lark.parser.parser.callbacks
+    with pytest.raises(RuntimeError, match="not supported with lark"):
+        limits_module.install_hooks(lark)
@@ -0,0 +1,103 @@
+import sys
+import tracemalloc
+
+import pytest
+
+from sqlcommon import get_parser
+from sqlcommon.memory import AllocationProfiler, main, memory_usage
+from sqlcommon.tokens import Expressions, Identifier, SelectStatement
+
+SQL = (
+    "select a.b x, f(1, 'x'), ? from t join u on t.id = u.id"
+    " where a in (1, 2) and b > 1.5 limit 3"
+)
+
+
+@pytest.fixture(scope="module")
+def profiler():
+    return AllocationProfiler()
+
+
+def test_memory_usage():
+    usage = memory_usage(get_parser()(SQL))
+    assert usage.size == sum(x.size for x in usage.by_type.values())
+    assert usage.count == sum(x.count for x in usage.by_type.values())
+    assert usage.by_type["SelectStatement"].count == 1
+    assert usage.by_type["Identifier"].count == 7
+    assert usage.by_type["Func"].count == 1
+    # 大きい順
+    sizes = [x.size for x in usage.by_type.values()]
+    assert sizes == sorted(sizes, reverse=True)
+
+
+def test_memory_usage_values():
+    name = "".join(["column", "_name"])
+    small = memory_usage(Identifier(name="a", parent=None))
+    large = memory_usage(Identifier(name=name * 100, parent=None))
+    # 文字列は保持する節点に加算する
+    assert set(large.by_type) == {"Identifier"}
+    assert large.size - small.size == sys.getsizeof(name * 100) - sys.getsizeof("a")
+
+
+def test_memory_usage_shared():
+    column = Identifier(name="a", parent="t")
+    once = memory_usage(SelectStatement(returning=Expressions(column)))
+    twice = memory_usage(SelectStatement(returning=Expressions(column, column)))
+    assert twice.by_type["Identifier"] == once.by_type["Identifier"]
+    assert twice.count == once.count
+
+
+def test_memory_usage_spans():
+    # native パーサの span は節点に加算する
+    earley = memory_usage(get_parser()(SQL))
+    native = memory_usage(get_parser(parser_type="native")(SQL))
+    assert native.count == earley.count
+    assert native.by_type["Identifier"].size > earley.by_type["Identifier"].size
+
+
+def test_profiler(profiler):
+    parses = profiler.parses
+    calls = profiler.callbacks.get("select", None)
+    calls = 0 if calls is None else calls.count
+
+    assert profiler.parse(SQL) == get_parser()(SQL)
+    assert profiler.parses == parses + 1
+    assert profiler.callbacks["select"].count == calls + 1
+    assert profiler.callbacks["identifier"].size > 0
+    assert profiler.rules["identifier"].size > 0
+    assert set(profiler.phases) == {"parse", "transform"}
+    assert not tracemalloc.is_tracing()
+
+
+def test_profiler_tracing(profiler):
+    # 既に有効な tracemalloc は停止しない
+    tracemalloc.start()
+    try:
+        profiler.parse("select a from t")
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
+
+
+def test_unsupported_lark(monkeypatch):
+    from lark import Transformer
+
+    monkeypatch.delattr(Transformer, "_call_userfunc_token")
+    with pytest.raises(RuntimeError, match="not supported with lark"):
+        AllocationProfiler()
+
+
+def test_report(profiler):
+    profiler.parse(SQL)
+    report = profiler.report(top=3)
+    assert report.startswith(f"{profiler.parses} statements")
+    assert "callback" in report and "identifier" in report
+
+
+def test_main(tmp_path, capsys):
+    log = tmp_path / "queries.log"
+    log.write_text(f"{SQL}\n\nselect a from t\n")
+    main([str(log), "--top", "5"])
+    output = capsys.readouterr().out
+    assert "2 statements" in output
+    assert "Identifier" in output
@@ -0,0 +1,159 @@
+import pytest
+from lark.exceptions import UnexpectedInput
+
+from sqlcommon import get_parser
+from sqlcommon.limits import Limits, ParseLimitError
+from sqlcommon.precedence import ExpressionError
+
+# 同じ SQL を Lark（Earley）と native で解析し、木が一致することを確かめる
+QUERIES = [
+    "select 1",
+    "select 1;",
+    "select -1, - 1, +1.5, 1., .5e3, 1e3",
+    "select null, true, false, NULL",
+    "select 'a', 'a' 'b' c, 'it''s'",
+    'select a, b as c, d e, "ab", "x y" as "z"',
+    "select *, a.*, t.a, count(*), sum(), sum(null), sum(1, 2), s.f(a)",
+    "select * from users",
+    "select * from public.users u, (select 1) as s",
+    "select a from t join u on a = b",
+    "select a from t inner join u on a = b, c = d",
+    "select a from t natural join u using (a, b)",
+    "select a from t left join u on a = b right outer join v on a = c",
+    "select a from t full outer join u on a = b cross join v using (a)",
+    "select a from t straight_join u on a = b",
+    "select a, count(*) from t group by a having count(*) > 1",
+    "select a from t where a = 1 and b = 2 or not c",
+    "select a from t window w",
+    "select a from t limit 10 offset 20",
+    "select a from t order by a, b desc, c asc, 1",
+    "select 1 union select 2",
+    "select 1 union all select 2 intersect select 3 except distinct select 4",
+    "select 1 union (select 2)",
+    "select a from t where a in (1, 2, null) and b not in (select b from u)",
+    "select a from t where a in ((select 1)) or a in ()",
+    "select a from t where a between 1 and 2 and b not between c and d + 1",
+    "select a from t where a like 'x%' and b not like 'y'",
+    "select a from t where a is null and b is not null",
+    "select a!, -a ^ 2, not not a, 1 + 2 * 3 - 4 / 5 % 6",
+    "select a || b = c, a <> b, a != b, a >= b, a <= b, a < b, a > b",
+    "select (a + b) * c, ((1))",
+    "select :x, :1, %(name)s, %s, ?, $1",
+    "select a -- comment\n, /* comment */ b from t",
+    "SELECT A FROM T WHERE A = 1 ORDER BY A DESC",
+    "select a from t where " + " and ".join(f"c{i} = {i}" for i in range(50)),
+    "with x as (select 1) select * from x",
+    "with x(a, b) as (select 1, 2), y as (select a from x) select * from x, y",
+    "with recursive r(n) as (select 1 union all select n + 1 from r) select n from r",
+    "with recursive as (select 1) select 1",
+    "select * from (with x as (select 1) select * from x) s where a in (with y"
+    " as (select 2) select * from y)",
+]
+
+DIALECT_QUERIES = [
+    ("postgresql", "select a from t where a ~* 'x' and b ilike 'y' and c # d"),
+    ("postgresql", "select |/ a, @ b, count(*)"),
+    ("sql2016", "select limit"),
+    ("sql2016", "select a from t limit 1"),
+    ("sql92", "select count(a), sum(b) from t"),
+]
+
+
+@pytest.fixture(scope="session")
+def lark_parser():
+    return get_parser()
+
+
+@pytest.fixture(scope="session")
+def native_parser():
+    return get_parser(parser_type="native")
+
+
+@pytest.mark.parametrize("sql", QUERIES)
+def test_same_tree(lark_parser, native_parser, sql):
+    assert native_parser(sql) == lark_parser(sql)
+
+
+@pytest.mark.parametrize("dialect, sql", DIALECT_QUERIES)
+def test_same_tree_dialect(dialect, sql):
+    lark_parser = get_parser(dialect=dialect)
+    native_parser = get_parser(parser_type="native", dialect=dialect)
+    assert native_parser(sql) == lark_parser(sql)
+
+
+@pytest.mark.parametrize(
+    "sql",
+    ["a = 1 and b", "not a between 1 and 2", "f(x) || 'y'", "a in (select 1)"],
+)
+def test_same_tree_expr(sql):
+    lark_parser = get_parser(start="expr")
+    native_parser = get_parser(start="expr", parser_type="native")
+    assert native_parser(sql) == lark_parser(sql)
+
+
+@pytest.mark.parametrize(
+    "sql",
+    [
+        "select",
+        "select a from",
+        "select a from t wher a = 1",
+        "select a from t where (a = 1",
+        "select a from t where a = 'x",
+        "select a from t order by a where a = 1",
+        "select a b c",
+        "select a from t left outer u",
+        "select a from t join u",
+    ],
+)
+def test_syntax_error(native_parser, sql):
+    with pytest.raises(UnexpectedInput) as e:
+        native_parser(sql)
+    assert e.value.column > 0
+
+
+@pytest.mark.parametrize(
+    "sql, pos",
+    [
+        ("select a from t where a between 1", 33),
+        ("select a from t where a between 1 or 2 and 3", 34),
+        ("select a not between b", 22),
+    ],
+)
+def test_expression_error(lark_parser, native_parser, sql, pos):
+    # 演算子の連鎖の誤りは、どちらのパーサも同じ例外を送出する
+    with pytest.raises(ExpressionError, match="requires AND"):
+        lark_parser(sql)
+    with pytest.raises(ExpressionError, match="requires AND") as e:
+        native_parser(sql)
+    assert e.value.pos == pos
+
+
+@pytest.mark.parametrize(
+    "dialect, sql",
+    [(None, "select limit"), (None, "select avg(a)"), ("postgresql", "select limit")],
+)
+def test_reserved_words(dialect, sql):
+    parser = get_parser(parser_type="native", dialect=dialect)
+    with pytest.raises(NotImplementedError, match="Invalid syntax"):
+        parser(sql)
+
+
+def test_limits():
+    parser = get_parser(parser_type="native", limits=Limits(max_operators=2))
+    with pytest.raises(ParseLimitError):
+        parser("select 1 + 2 + 3 - 4")
+
+
+def test_long_chain(native_parser):
+    n = 10000
+    sql = "select a from t where " + " and ".join(f"c{i} = {i}" for i in range(n))
+    assert native_parser(sql).to_sql().count(" AND ") == n - 1
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [{"cls_transformer": None}, {"start": "value"}],
+)
+def test_unsupported(kwargs):
+    with pytest.raises(ValueError):
+        get_parser(parser_type="native", **kwargs)
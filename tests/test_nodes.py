@@ -0,0 +1,204 @@
+import pytest
+
+from sqlcommon import get_parser
+from sqlcommon.nodes import (
+    Bracket,
+    Column,
+    Cte,
+    Except,
+    From,
+    Func,
+    Intersect,
+    Join,
+    Limit,
+    Op,
+    Param,
+    Returning,
+    Select,
+    Star,
+    Table,
+    Union_,
+    UnionAll,
+    Uo,
+    Value,
+    Where,
+    With,
+    wrap,
+)
+from sqlcommon.tokens import AstBase
+
+SQL = (
+    "select u.id, count(*), x.* from public.users u, (select b from v) x"
+    " join orders o on u.id = o.uid"
+    " where u.a in (select c from w) and not u.d between 1 and :n limit 5"
+)
+
+
+@pytest.fixture(scope="session", params=["earley", "native"])
+def parser(request):
+    return get_parser(parser_type=request.param)
+
+
+def test_lazy(parser):
+    stmt = parser(SQL)
+    select = wrap(stmt)
+    assert isinstance(select, Select)
+    assert select.node is stmt
+    assert select._nodes is None
+    assert not hasattr(select, "__dict__")
+
+    returning, query = select.nodes
+    assert select._nodes is not None
+    assert returning.node is stmt["returning"]
+    assert query.node is stmt
+    assert returning._nodes is None and query._nodes is None
+    assert select.nodes[0] is returning
+
+
+def test_structure(parser):
+    returning, query = wrap(parser(SQL)).nodes
+    assert isinstance(returning, Returning)
+    assert [type(x) for x in returning.nodes] == [Column, Func, Star]
+    assert returning.nodes[1].name == "count"
+
+    from_, join, where, limit = query.nodes
+    assert (type(from_), type(join), type(where), type(limit)) == (
+        From,
+        Join,
+        Where,
+        Limit,
+    )
+    assert [type(x) for x in from_.nodes] == [Table, Bracket]
+    assert isinstance(from_.nodes[1].nodes[0], Select)
+    assert join.join_type == "INNER"
+    assert [x.to_sql() for x in join.nodes] == ["orders AS o", "u.id = o.uid"]
+    assert limit.nodes == [Value(5)]
+    assert limit.nodes[0].value == 5
+
+    [cond] = where.nodes
+    assert isinstance(cond, Op) and cond.op == "AND"
+    in_op, not_op = cond.nodes
+    assert in_op.op == "IN"
+    assert isinstance(not_op, Uo) and not_op.op == "NOT"
+    [between] = not_op.nodes
+    assert between.op == "BETWEEN"
+    value, lower, upper = between.nodes
+    assert lower.value == 1
+    assert isinstance(upper, Param) and upper.name == "n" and upper.style == "named"
+
+
+def test_fields(parser):
+    table = wrap(parser(SQL)).get_tables()[0]
+    assert (table.name, table.schema, table.alias) == ("users", "public", "u")
+    column = wrap(parser("select t.a as b from t")).get_columns()[0]
+    assert (column.name, column.table, column.alias) == ("a", "t", "b")
+    assert Table.tag == "TABLE" and Select.tag == "SELECT"
+
+
+def test_get_tables(parser):
+    select = wrap(parser(SQL + " union all select 1 from z"))
+    assert [x.to_sql() for x in select.get_tables()] == [
+        "public.users AS u",
+        "v",
+        "orders AS o",
+        "w",
+        "z",
+    ]
+    query = select.nodes[1]
+    assert [x.name for x in query.get_tables()] == ["users", "v", "orders"]
+    assert [x.name for x in query.nodes[0].get_tables()] == ["users"]
+    assert [x.name for x in query.nodes[1].get_tables()] == ["orders"]
+
+
+def test_get_columns(parser):
+    select = wrap(parser(SQL))
+    assert [x.to_sql() for x in select.get_columns()] == [
+        "u.id",
+        "*",
+        "x.*",
+        "b",
+        "u.id",
+        "o.uid",
+        "u.a",
+        "c",
+        "u.d",
+    ]
+    assert [x.to_sql() for x in select.nodes[0].get_columns()] == ["u.id", "*", "x.*"]
+    # 取得した view は元の木の節点を指す
+    stmt = select.node
+    assert select.get_columns()[0].node is stmt["returning"][0]
+
+
+def test_to_select(parser):
+    stmt = parser(SQL)
+    returning, query = wrap(stmt).nodes
+    from_ = query.nodes[0]
+
+    assert returning.to_select().to_sql() == "SELECT u.id, count(*), x.*"
+    assert from_.to_select().to_sql() == (
+        "SELECT * FROM public.users AS u, (SELECT b FROM v) AS x"
+    )
+    assert (
+        query.to_select().to_sql()
+        == "SELECT *" + stmt.to_sql()[len("SELECT u.id, count(*), x.*") :]
+    )
+    assert query.to_sql() == query.to_select().to_sql()
+    # 子は複製せずに共有する
+    assert from_.to_select().node["from_"] is stmt["from_"]
+    assert query.to_select().node["where"] is stmt["where"]
+    assert wrap(stmt).to_select().node is stmt
+
+
+@pytest.mark.parametrize(
+    "op, cls, union_type",
+    [
+        ("union", Union_, "UNION"),
+        ("union all", UnionAll, "UNION ALL"),
+        ("union distinct", Union_, "UNION"),
+        ("intersect", Intersect, "INTERSECT"),
+        ("except", Except, "EXCEPT"),
+    ],
+)
+def test_set_operations(parser, op, cls, union_type):
+    select = wrap(parser(f"select 1 {op} select a from t"))
+    returning, operation = select.nodes
+    assert isinstance(operation, cls)
+    assert operation.op == union_type
+    assert [x.to_sql() for x in operation.nodes] == ["SELECT a FROM t"]
+    assert [x.name for x in operation.get_tables()] == ["t"]
+
+
+def test_with(parser):
+    select = wrap(
+        parser(
+            "with recursive x(a) as (select a from t union all select a from x),"
+            " y as (select b from x join u on x.a = u.a) select * from y, z"
+        )
+    )
+    with_, returning, query = select.nodes
+    assert isinstance(with_, With) and with_.recursive
+    x, y = with_.nodes
+    assert isinstance(x, Cte)
+    assert (x.name, x.columns, y.name, y.columns) == ("x", ["a"], "y", None)
+    assert y.to_sql() == "y AS (SELECT b FROM x INNER JOIN u ON x.a = u.a)"
+    assert [type(n) for n in y.nodes] == [Select]
+    assert y.to_select().node is y.node["select"]
+    # WITH で定義した名前は表ではない
+    assert [t.name for t in select.get_tables()] == ["t", "u", "z"]
+    assert [t.name for t in with_.get_tables()] == ["t", "u"]
+    assert [t.name for t in y.get_tables()] == ["x", "u"]
+
+
+def test_equality(parser):
+    assert wrap(parser(SQL)) == wrap(parser(SQL))
+    assert wrap(parser("select 1")) != wrap(parser("select 2"))
+    assert Value(1) != Param(1)
+    with pytest.raises(TypeError):
+        hash(Value(1))
+
+
+def test_unknown_node():
+    node = AstBase()
+    node["type"] = "slot"
+    with pytest.raises(ValueError, match="Unknown node type"):
+        wrap(node)
@@ -0,0 +1,94 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from sqlcommon import ParserPool, get_parser
+from sqlcommon.limits import Limits, ParseLimitError
+
+QUERIES = [
+    "select a, b from t where a = 1",
+    "select u.id, count(*) from users u join orders o on u.id = o.uid group by u.id",
+    "select a from t where b in (1, 2, 3) and c between 1 and 2 limit 10",
+    "select x from (select 1 as x) s union all select 2",
+    "select coalesce(a, b) as c from t order by 1 desc",
+]
+
+
+def run_threads(func, threads: int):
+    # 全スレッドを同時に開始し、競合を起こりやすくする
+    barrier = threading.Barrier(threads)
+
+    def target(i):
+        barrier.wait()
+        return func(i)
+
+    with ThreadPoolExecutor(threads) as executor:
+        return list(executor.map(target, range(threads)))
+
+
+def test_lazy_creation():
+    pool = ParserPool()
+    assert pool.size == 0
+    assert pool.parse("select 1") == get_parser()("select 1")
+    assert pool("select 1") == get_parser()("select 1")
+    assert pool.size == 1
+    assert pool.get() is pool.get()
+
+
+def test_invalid_dialect():
+    with pytest.raises(ValueError):
+        ParserPool(dialect="unknown")
+
+
+@pytest.mark.parametrize(
+    "parser_type, threads, repeat",
+    [
+        ("earley", 8, 4),
+        ("native", 32, 50),
+    ],
+)
+def test_stress(parser_type, threads, repeat):
+    expected = [get_parser(parser_type=parser_type)(x) for x in QUERIES]
+    pool = ParserPool(parser_type=parser_type)
+
+    def work(i):
+        results = []
+        for j in range(repeat):
+            k = (i + j) % len(QUERIES)
+            results.append((k, pool.parse(QUERIES[k])))
+        return results
+
+    for results in run_threads(work, threads):
+        for k, result in results:
+            assert result == expected[k]
+    assert pool.size == threads
+
+
+def test_stress_limits():
+    # 予算は contextvar で管理されるため、スレッドごとの上限判定は独立する
+    pool = ParserPool(limits=Limits(max_steps=2000))
+    long = "select a from t where " + " and ".join(f"c{i} = {i}" for i in range(30))
+
+    def work(i):
+        if i % 2:
+            with pytest.raises(ParseLimitError):
+                pool.parse(long)
+            return None
+        return pool.parse(QUERIES[0])
+
+    expected = get_parser()(QUERIES[0])
+    for i, result in enumerate(run_threads(work, 8)):
+        assert result == (None if i % 2 else expected)
+
+
+def test_shared_hooks_are_installed_once():
+    from sqlcommon.transformer import load_limited_lark
+
+    parse = get_parser(limits=Limits(max_steps=None))
+    run_threads(lambda i: parse(QUERIES[i % len(QUERIES)]), 8)
+    parser = load_limited_lark("start", "earley", None).parser.parser
+    callback = next(iter(parser.callbacks.values()))
+    # 二重に包まれていれば、包んだ関数の closure がまた包んだ関数になる
+    inner = callback.__closure__[0].cell_contents
+    assert getattr(inner, "__name__", None) != "callback_with_budget"
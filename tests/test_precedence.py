@@ -0,0 +1,123 @@
+import pytest
+
+from sqlcommon import get_parser
+from sqlcommon.precedence import ExpressionError, Operator, parse_expression
+from sqlcommon.tokens import BinaryOperator, Expressions, Prefix
+
+
+@pytest.fixture(scope="session")
+def parser():
+    return get_parser(start="expr")
+
+
+def shape(obj):
+    # 木の形を括弧付きの文字列で表す
+    if isinstance(obj, dict) and obj["type"] in {"bo", "prefix", "postfix", "between"}:
+        return "(" + " ".join([obj["op"], *(shape(x) for x in obj["expr"])]) + ")"
+    elif isinstance(obj, dict) and obj["type"] == "identifier":
+        return obj["name"]
+    elif isinstance(obj, dict) and obj["type"] == "bracket":
+        return "[" + ", ".join(shape(x) for x in obj["expr"]) + "]"
+    else:
+        return str(obj)
+
+
+@pytest.mark.parametrize(
+    "sql, expect",
+    [
+        ("a or b and c", "(OR a (AND b c))"),
+        ("a and b or c", "(OR (AND a b) c)"),
+        ("a and b and c", "(AND (AND a b) c)"),
+        ("1 + 2 * 3", "(+ 1 (* 2 3))"),
+        ("1 - 2 - 3", "(- (- 1 2) 3)"),
+        ("1 - (2 - 3)", "(- 1 (- 2 3))"),
+        ("a || b || c", "(|| (|| a b) c)"),
+        ("a = 1 and b = 2", "(AND (= a 1) (= b 2))"),
+        ("a + 1 = b * 2", "(= (+ a 1) (* b 2))"),
+        ("not a = b and c", "(AND (NOT (= a b)) c)"),
+        ("not a and not b", "(AND (NOT a) (NOT b))"),
+        ("- a ^ 2", "(^ (- a) 2)"),
+        ("a || b = c", "(= (|| a b) c)"),
+        ("a like b || c", "(LIKE a (|| b c))"),
+        ("a is null or b", "(OR (IS a None) b)"),
+        ("a is not null and b", "(AND (IS NOT a None) b)"),
+        ("a between 1 and 2 and b", "(AND (BETWEEN a 1 2) b)"),
+        ("a not between 1 + 1 and 2 * 2", "(NOT BETWEEN a (+ 1 1) (* 2 2))"),
+        ("a in (1, 2) or b not in (3)", "(OR (IN a [1, 2]) (NOT IN b [3]))"),
+        ("a not like b", "(NOT LIKE a b)"),
+        ("a!", "(! a)"),
+        ("a != b", "(!= a b)"),
+    ],
+)
+def test_precedence(parser, sql, expect):
+    assert shape(parser(sql)) == expect
+
+
+@pytest.mark.parametrize(
+    "sql, expect",
+    [
+        ("(a or b) and c", "(a OR b) AND c"),
+        ("a or b and c", "a OR b AND c"),
+        ("1 - (2 - 3)", "1 - (2 - 3)"),
+        ("(1 - 2) - 3", "1 - 2 - 3"),
+        ("(1 + 2) * 3", "(1 + 2) * 3"),
+        ("-(a + b)", "-(a + b)"),
+        ("not (a and b)", "NOT (a AND b)"),
+        ("a is not null", "a IS NOT NULL"),
+        ("a between (1 and 2) and 3", "a BETWEEN (1 AND 2) AND 3"),
+    ],
+)
+def test_to_sql(parser, sql, expect):
+    assert parser(sql).to_sql() == expect
+
+
+def test_long_chain():
+    n = 10000
+    elements = [1]
+    for i in range(n):
+        elements += [Operator("infix", "AND"), i]
+
+    result = parse_expression(elements)
+    assert result["op"] == "AND"
+    assert result["expr"][1] == n - 1
+    assert result.to_sql() == " AND ".join(str(x) for x in [1, *range(n)])
+
+
+def test_unexpected_operator():
+    with pytest.raises(ExpressionError):
+        parse_expression([1, Operator("infix", "+")])
+
+    with pytest.raises(ExpressionError, match="AND"):
+        parse_expression(
+            [1, Operator("between", "BETWEEN"), 2, Operator("infix", "OR"), 3]
+        )
+
+
+def test_prefix_to_sql():
+    assert Prefix(
+        "NOT", Expressions(BinaryOperator("=", Expressions(1, 2)))
+    ).to_sql() == ("NOT 1 = 2")
+
+
+@pytest.mark.parametrize(
+    "sql, expect",
+    [
+        ("- -b", "-(-b)"),
+        ("-(-a)", "-(-a)"),
+        ("a - -1", "a - -1"),
+        ("+ - a", "+(-a)"),
+        ("not -a", "NOT -a"),
+    ],
+)
+def test_prefix_round_trip(parser, sql, expect):
+    # 記号の前置演算子を連結して -- （行コメント）等にしない
+    result = parser(sql).to_sql()
+    assert result == expect
+    assert parser(result) == parser(sql)
+
+
+def test_prefix_round_trip_statement():
+    parser = get_parser()
+    stmt = parser("select a - -1 as x, - -b from t where c = 1")
+    assert stmt.to_sql() == "SELECT a - (-1) AS x, -(-b) FROM t WHERE c = 1"
+    assert parser(stmt.to_sql()) == stmt
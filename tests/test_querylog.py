@@ -0,0 +1,169 @@
+import json
+import random
+
+import pytest
+
+from sqlcommon import get_parser
+from sqlcommon.querylog import Report, main, run
+from sqlcommon.references import get_references, get_shape
+from sqlcommon.sketches import HeavyHitters, HyperLogLog
+
+
+@pytest.fixture(scope="session")
+def parser():
+    return get_parser(parser_type="native")
+
+
+@pytest.mark.parametrize(
+    "sql, tables, columns",
+    [
+        ("select a, b from t", {"t"}, {"t.a", "t.b"}),
+        (
+            "select u.id, o.total from public.users u join orders o on u.id = o.uid",
+            {"public.users", "orders"},
+            {"public.users.id", "orders.total", "orders.uid"},
+        ),
+        ("select a from t, u", {"t", "u"}, {"?.a"}),
+        (
+            "select users.id from accounts users join users u on users.id = u.id",
+            {"accounts", "users"},
+            {"accounts.id", "users.id"},
+        ),
+        ("select count(*) from t where f(a) > 1", {"t"}, {"t.*", "t.a"}),
+        (
+            "select a from t where b in (select c from u where u.d = t.e)",
+            {"t", "u"},
+            {"t.a", "t.b", "u.c", "u.d", "t.e"},
+        ),
+        ("select x.a from (select a from t) x", {"t"}, {"t.a", "?.a"}),
+        ("select a from t union select b from u", {"t", "u"}, {"t.a", "u.b"}),
+        ("select a from t join u using (id)", {"t", "u"}, {"?.a", "?.id"}),
+        (
+            "with x as (select a from t), y as (select x.a from x join u on x.a = u.b)"
+            " select a from y union select a from x",
+            {"t", "u"},
+            {"t.a", "?.a", "u.b"},
+        ),
+        (
+            "with recursive r(n) as (select 1 union all select n from r)"
+            " select r.n from r, (with r as (select m from t) select m from r) s",
+            {"t"},
+            {"?.n", "t.m", "?.m"},
+        ),
+    ],
+)
+def test_references(parser, sql, tables, columns):
+    assert get_references(parser(sql)) == (tables, columns)
+
+
+def test_shape_with(parser):
+    stmt = parser("with x(a) as (select 1) select a from x where a = 'b'")
+    assert get_shape(stmt) == "WITH x(a) AS (SELECT ?) SELECT a FROM x WHERE a = ?"
+
+
+def test_shape(parser):
+    a = parser("select a, 'x' as b from t where a = 1 and c in (1, 2, 3) limit 10")
+    b = parser("select a, 'y' as b from t where a = 2 and c in (4) limit 5")
+    assert get_shape(a) == get_shape(b)
+    assert get_shape(a) == "SELECT a, ? AS b FROM t WHERE a = ? AND c IN (?) LIMIT ?"
+
+
+def test_heavy_hitters():
+    rng = random.Random(0)
+    sketch = HeavyHitters(k=10)
+    stream = ["hot"] * 3000 + ["warm"] * 1000 + [str(i) for i in range(5000)]
+    rng.shuffle(stream)
+    for x in stream:
+        sketch.add(x)
+    assert len(sketch.counters) <= 10
+    top = dict(sketch.top(2))
+    assert set(top) == {"hot", "warm"}
+    assert 3000 - sketch.error <= top["hot"] <= 3000
+    assert sketch.error <= len(stream) / 11
+
+
+def misra_gries(stream, k: int):
+    # 全ての計数を走査する素朴な実装
+    counters, error = {}, 0
+    for item, count in stream:
+        if item in counters:
+            counters[item] += count
+        elif len(counters) < k:
+            counters[item] = count
+        else:
+            decrement = min(count, min(counters.values()))
+            error += decrement
+            for key in list(counters):
+                counters[key] -= decrement
+                if counters[key] <= 0:
+                    del counters[key]
+            if count > decrement:
+                counters[item] = count - decrement
+    return counters, error
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_heavy_hitters_equals_misra_gries(seed):
+    rng = random.Random(seed)
+    k = rng.randint(1, 8)
+    items = "abcdefghijklmnop"[: rng.randint(1, 16)]
+    stream = [(rng.choice(items), rng.randint(1, 4)) for _ in range(300)]
+    sketch = HeavyHitters(k)
+    for item, count in stream:
+        sketch.add(item, count)
+    assert (sketch.counters, sketch.error) == misra_gries(stream, k)
+
+
+def test_heavy_hitters_requires_counters():
+    with pytest.raises(ValueError, match="k"):
+        HeavyHitters(k=0)
+
+
+def test_hyperloglog():
+    sketch = HyperLogLog(p=12)
+    for i in range(50000):
+        sketch.add(str(i % 20000))
+    assert abs(sketch.count() - 20000) / 20000 < 0.05
+    small = HyperLogLog()
+    for x in "abc":
+        small.add(x)
+    assert small.count() == 3
+
+
+LOG = [
+    "select a from t where a = 1",
+    "select a from t where a = 2",
+    "select u.id from users u join orders o on u.id = o.uid",
+    "-- comment",
+    "",
+    "select from",
+]
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_run(workers):
+    statements = [x for x in LOG if x and not x.startswith("--")] * 50
+    report = Report(k=10)
+    for result in run(statements, workers=workers, batch_size=7):
+        report.add(result)
+    result = report.to_dict()
+
+    assert result["statements"] == 200
+    assert result["errors"] == 50
+    assert result["tables"]["items"][0] == {"table": "t", "count": 100}
+    assert result["shapes"]["items"][0] == {
+        "shape": "SELECT a FROM t WHERE a = ?",
+        "count": 100,
+    }
+    assert result["distinct"]["tables"] == 3
+
+
+def test_main(tmp_path, capsys):
+    log = tmp_path / "queries.log"
+    log.write_text("\n".join(LOG) + "\n")
+    output = tmp_path / "report.json"
+    main([str(log), "-o", str(output), "--workers", "0"])
+    report = json.loads(output.read_text())
+    assert report["statements"] == 4
+    assert report["error_types"]["items"][0]["count"] == 1
+    assert {x["column"] for x in report["columns"]["items"]} >= {"t.a", "users.id"}
@@ -0,0 +1,89 @@
+import io
+import json
+
+import pytest
+
+from sqlcommon import get_parser
+from sqlcommon.serializer import dump_many, dumps, iterencode, load_many, loads
+from sqlcommon.tokens import Expressions, SelectStatement
+
+QUERIES = [
+    "select 1, 'a\"b', 1.5, null, true",
+    "select a.b as x, -1, sum(c), :p, ? from t",
+    "select a from t left join u on t.id = u.id join v using (id)",
+    "select a from t where a between 1 and 2 and b in (1, 2) and c is not null",
+    "select a! from (select 1) s group by a limit 1 order by a desc, 1",
+    "select 1 union all select 2 intersect select 3",
+    "with recursive x(a) as (select 1), y as (select a from x) select * from y",
+]
+
+
+@pytest.fixture(scope="session")
+def parser():
+    return get_parser(parser_type="native")
+
+
+@pytest.mark.parametrize("sql", QUERIES)
+def test_same_as_json(parser, sql):
+    tree = parser(sql)
+    assert json.loads(dumps(tree)) == json.loads(json.dumps(tree))
+
+
+@pytest.mark.parametrize("compact", [False, True])
+@pytest.mark.parametrize("sql", QUERIES)
+def test_roundtrip(parser, sql, compact):
+    tree = parser(sql)
+    result = loads(dumps(tree, compact), compact)
+    assert result == tree
+    assert isinstance(result, SelectStatement)
+    assert isinstance(result["returning"], Expressions)
+    assert result.to_sql() == tree.to_sql()
+
+
+def test_compact(parser):
+    tree = parser("select a, b.c from t where a = 1")
+    text = dumps(tree, compact=True)
+    assert '"type"' not in text
+    assert '"alias":null' not in text
+    assert '"parent":null' not in text
+    assert len(text) < len(dumps(tree)) * 0.7
+
+
+def where(parser, n: int):
+    return parser(
+        "select a from t where " + " and ".join(f"c{i} = {i}" for i in range(n))
+    )
+
+
+def test_long_chain(parser):
+    # 再帰しないため、json.dumps が再帰上限に達する深い木でも書き出せる
+    tree = where(parser, 5000)
+    with pytest.raises(RecursionError):
+        json.dumps(tree)
+    chunks = list(iterencode(tree, compact=True))
+    assert len(chunks) > 1
+    assert "".join(chunks).count('"op":"AND"') == 4999
+
+    tree = where(parser, 100)
+    assert loads(dumps(tree, compact=True), compact=True) == tree
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_many(parser, compact):
+    trees = [parser(sql) for sql in QUERIES]
+    fp = io.StringIO()
+    dump_many(trees, fp, compact)
+    assert fp.getvalue().count("\n") == len(trees)
+    fp.seek(0)
+    assert list(load_many(fp, compact)) == trees
+
+
+def test_errors():
+    with pytest.raises(TypeError):
+        dumps({"type": "value", "value": object()})
+    with pytest.raises(ValueError, match="Unknown node type"):
+        loads('{"type": "slot"}')
+    with pytest.raises(ValueError, match="Unknown node type code"):
+        loads('{"value": 1}', compact=True)
+    with pytest.raises(ValueError, match="Unknown node type code"):
+        loads('{"t": "?", "value": 1}', compact=True)
@@ -0,0 +1,171 @@
+import multiprocessing
+import subprocess
+import sys
+
+import pytest
+
+from sqlcommon import get_parser
+from sqlcommon.shmcache import SLOT, SharedParseCache, cached_parser
+
+pytest.importorskip("fcntl")
+
+
+@pytest.fixture(scope="session")
+def parser():
+    return get_parser(parser_type="native")
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "parse.cache")
+
+
+def sql(i: int):
+    return f"select a, b from t{i} where a = {i} and b in (1, 2) limit 10"
+
+
+def test_get_put(parser, path):
+    with SharedParseCache(path, size=1 << 20) as cache:
+        assert cache.get(sql(1)) is None
+        assert cache.put(sql(1), parser(sql(1)))
+        assert cache.get(sql(1)) == parser(sql(1))
+        assert cache.get(sql(1), namespace="postgresql") is None
+        assert (cache.hits, cache.misses) == (1, 2)
+        assert len(cache) == 1
+
+        # 同じ key は同じ slot を上書きする
+        assert cache.put(sql(1), parser("select 1"))
+        assert cache.get(sql(1)) == parser("select 1")
+        assert len(cache) == 1
+
+
+def test_too_large(parser, path):
+    long = "select " + ", ".join(f"c{i}" for i in range(100))
+    with SharedParseCache(path, size=1 << 16, slot_size=256) as cache:
+        assert not cache.put(long, parser(long))
+        assert cache.get(long) is None
+
+
+def test_clock_eviction(parser, path):
+    with SharedParseCache(path, size=1, slot_size=1024, ways=2) as cache:
+        assert (cache.sets, cache.ways) == (1, 2)
+        cache.put(sql(1), parser(sql(1)))
+        cache.put(sql(2), parser(sql(2)))
+        # 参照された sql(1) は残り、参照されていない sql(2) が追い出される
+        assert cache.get(sql(1)) is not None
+        cache.put(sql(3), parser(sql(3)))
+        assert cache.get(sql(1)) is not None
+        assert cache.get(sql(2)) is None
+        assert cache.get(sql(3)) is not None
+        assert len(cache) == 2
+
+
+def test_torn_slot_is_a_miss(parser, path):
+    with SharedParseCache(path, size=1, slot_size=1024, ways=1) as cache:
+        cache.put(sql(1), parser(sql(1)))
+        offset = cache._data_offset
+        # 書き込み途中（seq が奇数）や壊れた payload は読まない
+        cache._mm[offset] += 1
+        assert cache.get(sql(1)) is None
+        cache._mm[offset] += 1
+        assert cache.get(sql(1)) is not None
+        cache._mm[offset + SLOT.size] ^= 0xFF
+        assert cache.get(sql(1)) is None
+
+
+def test_reopen_keeps_geometry(parser, path):
+    with SharedParseCache(path, size=1 << 20, slot_size=2048, ways=4) as cache:
+        cache.put(sql(1), parser(sql(1)))
+    with SharedParseCache(path, size=1 << 10) as cache:
+        assert (cache.slot_size, cache.ways) == (2048, 4)
+        assert cache.get(sql(1)) == parser(sql(1))
+
+
+def test_same_path_in_one_process(parser, path, tmp_path):
+    import fcntl
+
+    link = tmp_path / "link.cache"
+    first = SharedParseCache(path, size=1 << 20)
+    link.symlink_to(path)
+    second = SharedParseCache(str(link), size=1 << 20)
+    # 同じファイルは fd とスレッドのロックを共有する
+    assert first._fd == second._fd and first._lock is second._lock
+
+    code = (
+        "import fcntl, os, sys\n"
+        "fd = os.open(sys.argv[1], os.O_RDWR)\n"
+        "try:\n"
+        "    fcntl.lockf(fd, fcntl.LOCK_EX | fcntl.LOCK_NB, 1, 0)\n"
+        "except OSError:\n"
+        "    sys.exit(1)\n"
+    )
+    fcntl.lockf(first._fd, fcntl.LOCK_EX, 1, 0)
+    try:
+        # 一方を閉じても、もう一方が取ったロックは解除されない
+        second.close()
+        result = subprocess.run([sys.executable, "-c", code, path])
+        assert result.returncode == 1
+        assert first.put(sql(1), parser(sql(1)))
+        assert first.get(sql(1)) == parser(sql(1))
+    finally:
+        fcntl.lockf(first._fd, fcntl.LOCK_UN, 1, 0)
+        first.close()
+    result = subprocess.run([sys.executable, "-c", code, path])
+    assert result.returncode == 0
+
+
+def test_invalid_geometry(path):
+    with pytest.raises(ValueError):
+        SharedParseCache(path, slot_size=100)
+    with pytest.raises(ValueError):
+        SharedParseCache(path, ways=0)
+
+
+def test_cached_parser(parser, path):
+    calls = []
+
+    def parse(text):
+        calls.append(text)
+        return parser(text)
+
+    with SharedParseCache(path, size=1 << 20) as cache:
+        parse_cached = cached_parser(parse, cache, namespace="native")
+        assert parse_cached(sql(1)) == parse_cached(sql(1)) == parser(sql(1))
+        assert calls == [sql(1)]
+
+
+def test_other_process(parser, path):
+    # 別のプロセスが保存した木を読めること
+    code = (
+        "import sys\n"
+        "from sqlcommon import get_parser\n"
+        "from sqlcommon.shmcache import SharedParseCache\n"
+        "cache = SharedParseCache(sys.argv[1], size=1 << 20)\n"
+        "cache.put(sys.argv[2], get_parser(parser_type='native')(sys.argv[2]))\n"
+    )
+    subprocess.run([sys.executable, "-c", code, path, sql(7)], check=True)
+    with SharedParseCache(path, size=1 << 20) as cache:
+        assert cache.get(sql(7)) == parser(sql(7))
+
+
+def _worker(args):
+    path, worker, n = args
+    parse = get_parser(parser_type="native")
+    errors = 0
+    with SharedParseCache(path) as cache:
+        parse_cached = cached_parser(parse, cache)
+        for j in range(n):
+            i = (worker * 7 + j) % 40
+            if parse_cached(sql(i)) != parse(sql(i)):
+                errors += 1
+        return errors, cache.hits
+
+
+def test_concurrent_processes(path):
+    # 小さな cache に複数のプロセスが同時に読み書きし、追い出しを起こす
+    SharedParseCache(path, size=16 << 10, slot_size=1024, ways=4).close()
+    ctx = multiprocessing.get_context("fork")
+    with ctx.Pool(4) as pool:
+        results = pool.map(_worker, [(path, i, 200) for i in range(8)])
+    assert sum(errors for errors, hits in results) == 0
+    assert sum(hits for errors, hits in results) > 0
@@ -0,0 +1,133 @@
+import pytest
+
+from sqlcommon import get_parser
+from sqlcommon.splice import Rewriter, get_span, iter_nodes, rename_tables, splice
+from sqlcommon.tokens import Identifier
+
+SQL = """select u.id, u.name as n,  -- user
+       count(*) c
+  from public.users u
+  left join orders o on u.id = o.user_id
+ where u.id in (1, 2) and not o.total between 10 and 100
+ order by 1 desc
+ union all (select 1 from t)"""
+
+
+@pytest.fixture(scope="session")
+def parser():
+    return get_parser(parser_type="native")
+
+
+def text_of(node):
+    start, end = get_span(node)
+    return SQL[start:end]
+
+
+def test_spans(parser):
+    stmt = parser(SQL)
+    assert text_of(stmt) == SQL
+    assert [text_of(x) for x in stmt["returning"]] == ["u.id", "u.name", "count(*)"]
+    assert text_of(stmt["from_"][0]) == "public.users"
+    join = stmt["joins"][0]
+    assert text_of(join) == "left join orders o on u.id = o.user_id"
+    assert text_of(join["on"][0]) == "u.id = o.user_id"
+    where = stmt["where"]
+    assert text_of(where) == "u.id in (1, 2) and not o.total between 10 and 100"
+    assert text_of(where["expr"][0]) == "u.id in (1, 2)"
+    assert text_of(where["expr"][0]["expr"][1]) == "(1, 2)"
+    assert text_of(where["expr"][1]) == "not o.total between 10 and 100"
+    assert text_of(where["expr"][1]["expr"][0]) == "o.total between 10 and 100"
+    assert text_of(stmt["orderby"][0]) == "1"
+    assert text_of(stmt["unions"]) == "union all (select 1 from t)"
+    assert text_of(stmt["unions"]["select"][0]) == "select 1 from t"
+
+
+def test_all_nodes_have_spans(parser):
+    for node in iter_nodes(parser(SQL)):
+        assert get_span(node)
+
+
+def test_splice(parser):
+    stmt = parser(SQL)
+    result = (
+        Rewriter(SQL)
+        .replace(stmt["from_"][0], "accounts")
+        .replace(stmt["where"]["expr"][0], Identifier("TRUE"))
+        .to_sql()
+    )
+    assert "  -- user\n" in result
+    assert "  from accounts u\n" in result
+    assert " where TRUE and not o.total" in result
+
+
+def test_overlap(parser):
+    stmt = parser(SQL)
+    with pytest.raises(ValueError, match="Overlapping"):
+        splice(SQL, [(stmt["where"], "x"), (stmt["where"]["expr"][0], "y")])
+
+
+def test_rename_tables(parser):
+    sql = "select users.id, u2.x from users join users u2 on users.id = u2.id -- c"
+    stmt = parser(sql)
+    assert rename_tables(stmt, sql, {"users": "accounts"}) == (
+        "select accounts.id, u2.x from accounts join accounts u2"
+        " on accounts.id = u2.id -- c"
+    )
+
+
+def test_rename_tables_quoted(parser):
+    # 引用符で囲んだ列名と修飾子はそのまま残す
+    sql = 'select users."Id", "Users" . "x y", u.id from users, "Users", users u'
+    assert rename_tables(parser(sql), sql, {"users": "accounts", "Users": "B"}) == (
+        'select accounts."Id", B . "x y", u.id from accounts, B, accounts u'
+    )
+
+
+def test_no_span():
+    with pytest.raises(ValueError, match="no source span"):
+        get_span(get_parser()("select a"))
+
+
+@pytest.mark.parametrize(
+    "sql, expected",
+    [
+        (
+            # users は accounts の別名
+            "select users.id from accounts users where users.x = 1",
+            "select users.id from accounts users where users.x = 1",
+        ),
+        (
+            "select users.id from accounts users join users u on users.id = u.id",
+            "select users.id from accounts users join people u on users.id = u.id",
+        ),
+        (
+            # 派生表の中の users は表そのもの
+            "select users.id from (select users.id from users) users",
+            "select users.id from (select people.id from people) users",
+        ),
+        (
+            "select a from t where t.b in (select users.c from users)",
+            "select a from t where t.b in (select people.c from people)",
+        ),
+    ],
+)
+def test_rename_tables_aliases(parser, sql, expected):
+    assert rename_tables(parser(sql), sql, {"users": "people"}) == expected
+
+
+def test_with(parser):
+    sql = "with x as (select a from users), y as (select a from x) select x.a from x"
+    stmt = parser(sql)
+    first, second = stmt["with_"]["ctes"]
+    assert sql[slice(*get_span(stmt["with_"]))].endswith("from x)")
+    assert sql[slice(*get_span(second))] == "y as (select a from x)"
+    assert (
+        Rewriter(sql)
+        .replace(first, "x as (select 1 a)")
+        .to_sql()
+        .startswith("with x as (select 1 a), y")
+    )
+    # CTE の名前は表の名前として置き換えない
+    assert rename_tables(stmt, sql, {"users": "accounts", "x": "z"}) == (
+        "with x as (select a from accounts), y as (select a from x) select x.a from x"
+    )
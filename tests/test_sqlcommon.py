@@ -61,7 +61,7 @@ _args = (0,)
         ("FALSE", "false", *_args),
         ("'a'", "str", 1),
         ("''", "str", 1),
-        ("''''", "str", 2),
+        ("''''", "str", 1),  # '' は引用符のエスケープ
         ("''  ''", "str", 2),
         ("'' -- comment ''", "str", 1),
         ("'' \n -- comment ''", "str", 1),
@@ -0,0 +1,113 @@
+import pytest
+
+from sqlcommon import get_parser
+from sqlcommon.complexity import CostWeights, analyze
+from sqlcommon.references import get_references
+from sqlcommon.subqueries import SubqueryAnalyzer
+
+SQL = (
+    "with x as (select a from t where a in (select b from u)),"
+    " y as (select x.a from x join v on x.a = v.a)"
+    " select y.a, (select max(b) from u) m"
+    " from y join (select a from t where a in (select b from u)) s on s.a = y.a"
+    " where y.a in (select b from u) union select a from x limit 3"
+)
+
+
+@pytest.fixture(scope="session")
+def parser():
+    return get_parser(parser_type="native")
+
+
+@pytest.mark.parametrize(
+    "sql",
+    [
+        SQL,
+        "select 1",
+        "select a from t where b in (select c from u where u.d = t.e)",
+        "with recursive r(n) as (select 1 union all select n + 1 from r)"
+        " select n from r",
+    ],
+)
+def test_same_as_separate_analyses(parser, sql):
+    stmt = parser(sql)
+    result = SubqueryAnalyzer().analyze(stmt)
+    assert result.sql == stmt.to_sql()
+    assert result.references == get_references(stmt)
+    complexity = analyze(stmt)
+    assert result.complexity == complexity
+    assert result.cost == CostWeights().score(complexity)
+
+
+def test_units(parser):
+    result = SubqueryAnalyzer().analyze(parser(SQL))
+    assert list(result.ctes) == ["x", "y"]
+    x = result.ctes["x"]
+    assert x.sql == "SELECT a FROM t WHERE a IN (SELECT b FROM u)"
+    assert x.references == ({"t", "u"}, {"t.a", "u.b"})
+    assert x.complexity.subqueries == 1 and x.complexity.missing_limit
+    assert [s.sql for s in x.subqueries] == ["SELECT b FROM u"]
+    # y の x は CTE を指す
+    assert result.ctes["y"].references == ({"v"}, {"?.a", "v.a"})
+    assert result.subqueries[:2] == (x, result.ctes["y"])
+    assert {s.sql for s in result.subqueries[2:]} == {
+        "SELECT a FROM t WHERE a IN (SELECT b FROM u)",
+        "SELECT max(b) FROM u",
+        "SELECT b FROM u",
+    }
+
+
+def test_memoized(parser):
+    analyzer = SubqueryAnalyzer()
+    # 同じ副問合せは一度だけ計算する
+    analyzer.analyze(parser(SQL))
+    misses = analyzer.misses
+    assert misses == 5
+    assert analyzer.hits > 0
+
+    # 別の文の同じ副問合せも再利用する
+    other = parser(
+        "select a from t where a in (select b from u) and c = (select max(b) from u)"
+    )
+    result = analyzer.analyze(other)
+    assert analyzer.misses == misses + 1
+    assert result.sql == other.to_sql()
+    assert analyzer.analyze(parser(SQL)) is analyzer.analyze(parser(SQL))
+
+    analyzer.clear()
+    analyzer.analyze(parser(SQL))
+    assert analyzer.misses == misses * 2 + 1
+
+
+def test_max_size(parser):
+    analyzer = SubqueryAnalyzer(max_size=10)
+    analyzer.analyze(parser(SQL))
+    assert len(analyzer._table) > 10
+    misses = analyzer.misses
+    # 上限を超えた記憶は次の解析の前に捨てる
+    other = parser("select a from t where a in (select b from u)")
+    assert analyzer.analyze(other).sql == other.to_sql()
+    assert analyzer.misses == misses + 2
+    assert len(analyzer._table) < 20
+
+
+def test_context(parser):
+    # 同じ副問合せでも、外側の別名を参照すると見える名前ごとに解析する
+    analyzer = SubqueryAnalyzer()
+    sub = "(select c from u where u.d = t.e)"
+    result = analyzer.analyze(
+        parser(
+            f"select a from t where b in {sub} union select a from w t where b in {sub}"
+        )
+    )
+    assert result.references.columns >= {"t.e", "w.e"}
+    first, second = result.subqueries
+    assert first.sql == second.sql
+    assert first.references != second.references
+
+
+def test_weights(parser):
+    result = SubqueryAnalyzer(
+        CostWeights(missing_limit=0, subquery_depth=0, subqueries=1)
+    ).analyze(parser("select (select 1)"))
+    assert result.cost == 1
@@ -0,0 +1,208 @@
+import sqlite3
+
+import pytest
+
+from sqlcommon import get_parser
+from sqlcommon.template import Template, render_batches
+from sqlcommon.tokens import Value
+
+
+@pytest.fixture(scope="session")
+def parser():
+    return get_parser(start="stmt")
+
+
+@pytest.mark.parametrize(
+    "sql, style, name",
+    [
+        ("select ?", "qmark", None),
+        ("select %s", "format", None),
+        ("select :1", "numeric", "1"),
+        ("select $1", "dollar", "1"),
+        ("select :x", "named", "x"),
+        ("select %(x)s", "pyformat", "x"),
+    ],
+)
+def test_param(parser, sql, style, name):
+    param = parser(sql)["returning"][0]
+    assert param["type"] == "param"
+    assert param["style"] == style
+    assert param["name"] == name
+    assert parser(sql).to_sql() == "SELECT" + sql[6:]
+
+
+def test_fragments(parser):
+    template = Template(parser("select a from t where a = :a and b = :b limit 10"))
+    assert template.fragments == (
+        "SELECT a FROM t WHERE a = ",
+        " AND b = ",
+        " LIMIT 10",
+    )
+    assert template.keys == ("a", "b")
+
+
+def test_render(parser):
+    template = Template(parser("select a from t where a = ? and b = ? limit ?"))
+    assert template.render([1, "x", 5]) == (
+        "SELECT a FROM t WHERE a = 1 AND b = 'x' LIMIT 5"
+    )
+    assert template.render([2, None, 1]) == (
+        "SELECT a FROM t WHERE a = 2 AND b = NULL LIMIT 1"
+    )
+    assert template.render([3, "it's", 1]) == (
+        "SELECT a FROM t WHERE a = 3 AND b = 'it''s' LIMIT 1"
+    )
+
+
+@pytest.mark.parametrize("parser_type", ["earley", "native"])
+@pytest.mark.parametrize("value", ["it's", "''", "a\\'b", "'; drop table t; --"])
+def test_string_quoting(parser_type, value):
+    sql = Value(value).to_sql()
+    assert sql == "'" + value.replace("'", "''") + "'"
+    parse = get_parser(parser_type=parser_type)
+    assert parse("select " + sql)["returning"][0]["value"] == value
+
+
+@pytest.mark.parametrize(
+    "paramstyle, expect",
+    [
+        ("qmark", ("SELECT ?, ? FROM t WHERE a = ?", (1, 2, 1))),
+        ("format", ("SELECT %s, %s FROM t WHERE a = %s", (1, 2, 1))),
+        ("numeric", ("SELECT :1, :2 FROM t WHERE a = :1", (1, 2))),
+        ("dollar", ("SELECT $1, $2 FROM t WHERE a = $1", (1, 2))),
+        ("named", ("SELECT :x, :y FROM t WHERE a = :x", {"x": 1, "y": 2})),
+        (
+            "pyformat",
+            ("SELECT %(x)s, %(y)s FROM t WHERE a = %(x)s", {"x": 1, "y": 2}),
+        ),
+    ],
+)
+def test_bind(parser, paramstyle, expect):
+    template = Template(parser("select :x, :y from t where a = :x"))
+    assert template.bind({"x": 1, "y": 2}, paramstyle) == expect
+
+
+def test_bind_positional_to_named(parser):
+    template = Template(parser("select ? from t where a = ?"))
+    assert template.bind([1, 2], "named") == (
+        "SELECT :p1 FROM t WHERE a = :p2",
+        {"p1": 1, "p2": 2},
+    )
+
+
+def test_bind_escape_percent(parser):
+    template = Template(parser("select a from t where a like '%x' and b = ?"))
+    assert template.bind([1], "format") == (
+        "SELECT a FROM t WHERE a LIKE '%%x' AND b = %s",
+        (1,),
+    )
+
+
+def test_unknown_paramstyle(parser):
+    template = Template(parser("select ?"))
+    with pytest.raises(ValueError, match="Unknown paramstyle"):
+        template.bind([1], "unknown")
+
+
+def test_render_batches(parser):
+    stmts = [
+        parser(f"select a from t where a = {i} and b = 'x{i}' limit 10")
+        for i in range(3)
+    ]
+    stmts.insert(1, parser("select a from t where a = 1.5 and b is null"))
+    assert render_batches(stmts) == [
+        (
+            "SELECT a FROM t WHERE a = ? AND b = ? LIMIT ?",
+            [(0, "x0", 10), (1, "x1", 10), (2, "x2", 10)],
+        ),
+        ("SELECT a FROM t WHERE a = ? AND b IS NULL", [(1.5,)]),
+    ]
+
+
+@pytest.mark.parametrize(
+    "paramstyle, expect",
+    [
+        ("qmark", ("SELECT ? AS c FROM t WHERE a LIKE ?", (1, "%x"))),
+        ("format", ("SELECT %s AS c FROM t WHERE a LIKE %s", (1, "%x"))),
+        ("numeric", ("SELECT :1 AS c FROM t WHERE a LIKE :2", (1, "%x"))),
+        ("dollar", ("SELECT $1 AS c FROM t WHERE a LIKE $2", (1, "%x"))),
+        ("named", ("SELECT :p1 AS c FROM t WHERE a LIKE :p2", {"p1": 1, "p2": "%x"})),
+        (
+            "pyformat",
+            (
+                "SELECT %(p1)s AS c FROM t WHERE a LIKE %(p2)s",
+                {"p1": 1, "p2": "%x"},
+            ),
+        ),
+    ],
+)
+def test_render_batches_paramstyle(parser, paramstyle, expect):
+    stmt = parser("select 1 as c from t where a like '%x'")
+    [(sql, [params])] = render_batches([stmt], paramstyle)
+    assert (sql, params) == expect
+
+
+def test_render_batches_keeps_positions_and_keywords(parser):
+    stmt = parser(
+        "select a, count(*) from t group by 1 where b = true and c is null"
+        " order by 2 desc, a + 1"
+    )
+    assert render_batches([stmt]) == [
+        (
+            "SELECT a, count(*) FROM t GROUP BY 1 WHERE b = True AND c IS NULL"
+            " ORDER BY 2 DESC, a + 1",
+            [()],
+        )
+    ]
+
+
+def test_render_batches_keeps_grouped_expressions(parser):
+    # GROUP BY の式と一致する項目をパラメータにすると、別の式とみなされる
+    stmts = [
+        parser(
+            f"select substr(x, 1, 3) k, count(*) from t group by substr(x, 1, 3)"
+            f" where y = {i} having substr(x, 1, 3) <> 'a' order by f(x, 2)"
+        )
+        for i in range(2)
+    ]
+    assert render_batches(stmts, "dollar") == [
+        (
+            "SELECT substr(x, 1, 3) AS k, count(*) FROM t GROUP BY substr(x, 1, 3)"
+            " HAVING substr(x, 1, 3) <> $1 WHERE y = $2 ORDER BY f(x, 2)",
+            [("a", 0), ("a", 1)],
+        )
+    ]
+
+
+def test_render_batches_nul(parser):
+    # 区切りを含む文字列があっても slot と取り違えない
+    stmt = parser("select '\x000\x00' a, 'b' from t order by '\x001\x00'")
+    [(sql, [params])] = render_batches([stmt])
+    assert sql == "SELECT ? AS a, ? FROM t ORDER BY '\x001\x00'"
+    assert params == ("\x000\x00", "b")
+    template = Template(parser("select '\x000\x00', ? from t"))
+    assert template.render([1]) == "SELECT '\x000\x00', 1 FROM t"
+
+
+def test_render_batches_rejects_placeholders(parser):
+    with pytest.raises(ValueError, match="placeholders"):
+        render_batches([parser("select ?")])
+    with pytest.raises(ValueError, match="Unknown paramstyle"):
+        render_batches([], "unknown")
+
+
+def test_render_batches_sqlite(parser):
+    # 埋め込んだ SQL と同じ結果を、パラメータを渡した SQL で得られること
+    db = sqlite3.connect(":memory:")
+    db.execute("create table t (a integer, b text)")
+    db.executemany("insert into t values (?, ?)", [(i, f"it's {i}") for i in range(5)])
+
+    stmts = [
+        parser(f"select a, b from t where b = 'it''s {i}' or a > {i + 2} limit 3")
+        for i in range(5)
+    ]
+    [(sql, batch)] = render_batches(stmts)
+    for stmt, params in zip(stmts, batch):
+        assert db.execute(sql, params).fetchall() == (
+            db.execute(stmt.to_sql()).fetchall()
+        )